@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Quota Admission Controller for VM Automation Accelerator
+Decides which queued VM orders can deploy now by admitting them in priority
+order against one in-memory quota snapshot per subscription and region
+"""
+
+import sys
+import json
+import time
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ADMIT = 'admit'
+DEFER = 'defer'
+
+# Orders without a priority sort with ServiceNow's default (3 = Moderate)
+DEFAULT_PRIORITY = 3
+
+
+class QuotaSnapshot:
+    """Regional and per-family vCPU headroom for one subscription and region"""
+
+    def __init__(self, subscription_id: str, location: str, usage: Dict[str, Dict], vm_size_cores: Dict[str, int]):
+        """
+        Initialize snapshot
+
+        Args:
+            subscription_id: Azure subscription ID
+            location: Azure region
+            usage: QuotaManager.get_usage_snapshot() output
+            vm_size_cores: QuotaManager.get_vm_size_cores() output
+        """
+        self.subscription_id = subscription_id
+        self.location = location
+        self.vm_size_cores = vm_size_cores
+        self.headroom = {name: entry['limit'] - entry['current'] for name, entry in usage.items()}
+
+    def fits(self, family: str, cores: int) -> Optional[str]:
+        """
+        Check whether cores fit the regional and family headroom
+
+        Returns:
+            None if they fit, otherwise the name of the exhausted quota
+        """
+        if self.headroom.get('cores', 0) < cores:
+            return 'cores'
+        if self.headroom.get(family, 0) < cores:
+            return family
+        return None
+
+    def take(self, family: str, cores: int):
+        """Consume headroom for an admitted order"""
+        self.headroom['cores'] = self.headroom.get('cores', 0) - cores
+        self.headroom[family] = self.headroom.get(family, 0) - cores
+
+    def release(self, family: str, cores: int):
+        """Return headroom (e.g., a VM was deleted or resized down)"""
+        self.take(family, -cores)
+
+
+class AdmissionController:
+    """
+    Priority-ordered admission of VM orders against quota snapshots
+
+    Usage and VM sizes are fetched once per (subscription, region), in
+    parallel, and every decision after that is an in-memory headroom
+    update. Orders are taken by priority (1 = Critical first), then
+    submission time. With backfill, an order that does not fit is deferred
+    and smaller orders behind it may still use the remaining headroom;
+    without it, the first order that does not fit defers everything behind
+    it in the same region.
+    """
+
+    def __init__(
+        self,
+        quota_manager_factory: Optional[Callable[[str], object]] = None,
+        backfill: bool = True,
+        max_workers: int = 8
+    ):
+        """
+        Initialize admission controller
+
+        Args:
+            quota_manager_factory: Returns a QuotaManager for a subscription ID
+                (default: QuotaManager(subscription_id))
+            backfill: Let later orders use headroom a deferred order could not (default: True)
+            max_workers: Snapshots fetched concurrently (default: 8)
+        """
+        self.quota_manager_factory = quota_manager_factory or self._default_factory
+        self.backfill = backfill
+        self.max_workers = max_workers
+        self._managers: Dict[str, object] = {}
+
+    @staticmethod
+    def _default_factory(subscription_id: str):
+        from quota_manager import QuotaManager
+        return QuotaManager(subscription_id)
+
+    def _manager(self, subscription_id: str):
+        manager = self._managers.get(subscription_id)
+        if manager is None:
+            manager = self._managers.setdefault(subscription_id, self.quota_manager_factory(subscription_id))
+        return manager
+
+    def fetch_snapshots(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], QuotaSnapshot]:
+        """
+        Fetch one quota snapshot per (subscription, region)
+
+        Args:
+            keys: (subscription_id, location) pairs
+
+        Returns:
+            Snapshots by (subscription_id, location)
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        def fetch(key: Tuple[str, str]) -> QuotaSnapshot:
+            subscription_id, location = key
+            manager = self._manager(subscription_id)
+            return QuotaSnapshot(
+                subscription_id, location,
+                manager.get_usage_snapshot(location),
+                manager.get_vm_size_cores(location)
+            )
+
+        logger.info(f"Fetching {len(keys)} quota snapshots")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(keys)))) as executor:
+            return dict(zip(keys, executor.map(fetch, keys)))
+
+    def decide(
+        self,
+        orders: List[Dict],
+        snapshots: Optional[Dict[Tuple[str, str], QuotaSnapshot]] = None
+    ) -> Dict:
+        """
+        Decide admit/defer for a queue of orders
+
+        Args:
+            orders: Orders with id, subscription_id, location, vm_size,
+                quantity, priority (1-4) and submitted_at (ISO timestamp)
+            snapshots: Pre-fetched snapshots; missing ones are fetched.
+                Snapshots are consumed (their headroom is decremented).
+
+        Returns:
+            Decisions in admission order, counts, and remaining headroom per
+            subscription/region
+        """
+        started = time.perf_counter()
+        snapshots = dict(snapshots or {})
+        missing = [(order['subscription_id'], order['location']) for order in orders]
+        missing = [key for key in missing if key not in snapshots]
+        snapshots.update(self.fetch_snapshots(missing))
+        fetched = time.perf_counter()
+
+        from quota_manager import QuotaManager
+
+        queue = sorted(
+            enumerate(orders),
+            key=lambda item: (item[1].get('priority', DEFAULT_PRIORITY), item[1].get('submitted_at', ''), item[0])
+        )
+
+        decisions = []
+        blocked = set()
+        for _, order in queue:
+            key = (order['subscription_id'], order['location'])
+            snapshot = snapshots[key]
+            family = QuotaManager.get_vm_family(order['vm_size'])
+            size_cores = snapshot.vm_size_cores.get(order['vm_size'])
+            cores = size_cores * order.get('quantity', 1) if size_cores is not None else None
+
+            decision = {
+                'order_id': order.get('id'),
+                'priority': order.get('priority', DEFAULT_PRIORITY),
+                'subscription_id': key[0],
+                'location': key[1],
+                'vm_size': order['vm_size'],
+                'family': family,
+                'cores': cores
+            }
+
+            if cores is None:
+                decision.update(decision=DEFER, reason=f"VM size {order['vm_size']} not available in {key[1]}")
+            elif key in blocked:
+                decision.update(decision=DEFER, reason='Behind a deferred order (backfill disabled)')
+            else:
+                exhausted = snapshot.fits(family, cores)
+                if exhausted is None:
+                    snapshot.take(family, cores)
+                    decision.update(decision=ADMIT, reason=None)
+                else:
+                    decision.update(decision=DEFER, reason=f"Insufficient {exhausted} quota")
+                    if not self.backfill:
+                        blocked.add(key)
+            decisions.append(decision)
+
+        admitted = sum(1 for decision in decisions if decision['decision'] == ADMIT)
+        finished = time.perf_counter()
+        logger.info(
+            f"Admission: {admitted} admitted, {len(decisions) - admitted} deferred "
+            f"({(finished - fetched) * 1000:.1f} ms deciding)"
+        )
+
+        return {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'policy': 'greedy_backfill' if self.backfill else 'strict_priority',
+            'admitted': admitted,
+            'deferred': len(decisions) - admitted,
+            'fetch_ms': round((fetched - started) * 1000, 1),
+            'decide_ms': round((finished - fetched) * 1000, 3),
+            'decisions': decisions,
+            'remaining_headroom': {
+                f"{subscription_id}/{location}": {
+                    name: value for name, value in snapshot.headroom.items()
+                    if name == 'cores' or name.endswith('Family')
+                }
+                for (subscription_id, location), snapshot in snapshots.items()
+            }
+        }
+
+
+def load_snapshots(path: str) -> Dict[Tuple[str, str], QuotaSnapshot]:
+    """
+    Load snapshots saved as {"<subscription_id>/<location>": {"usage": ..., "vm_size_cores": ...}}
+
+    Args:
+        path: JSON file path
+
+    Returns:
+        Snapshots by (subscription_id, location)
+    """
+    with open(path) as f:
+        data = json.load(f)
+    snapshots = {}
+    for key, entry in data.items():
+        subscription_id, location = key.rsplit('/', 1)
+        snapshots[(subscription_id, location)] = QuotaSnapshot(
+            subscription_id, location, entry['usage'], entry['vm_size_cores']
+        )
+    return snapshots
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Admit queued VM orders against quota')
+    parser.add_argument('orders_file', help='JSON file with a list of orders')
+    parser.add_argument('--subscription-id', help='Subscription for orders that do not name one')
+    parser.add_argument('--snapshot-file', help='Decide offline against saved quota snapshots')
+    parser.add_argument('--no-backfill', action='store_true', help='Stop admitting in a region after the first deferral')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    with open(args.orders_file) as f:
+        orders = json.load(f)
+    for order in orders:
+        order.setdefault('subscription_id', args.subscription_id)
+        if not order['subscription_id']:
+            parser.error(f"Order {order.get('id')} has no subscription_id")
+
+    controller = AdmissionController(backfill=not args.no_backfill)
+    snapshots = load_snapshots(args.snapshot_file) if args.snapshot_file else None
+    result = controller.decide(orders, snapshots)
+
+    print("\n" + "="*80)
+    print("QUOTA ADMISSION")
+    print("="*80)
+    print(f"\nPolicy: {result['policy']}")
+    print(f"Orders: {len(result['decisions'])} ({result['admitted']} admitted, {result['deferred']} deferred)")
+    print(f"Snapshot fetch: {result['fetch_ms']} ms, decisions: {result['decide_ms']} ms")
+    print(f"\n{'Order':<16} {'Prio':>4} {'Size':<18} {'Cores':>6}  Decision")
+    for decision in result['decisions']:
+        status = "✓ admit" if decision['decision'] == ADMIT else f"✗ defer ({decision['reason']})"
+        print(f"{str(decision['order_id']):<16} {decision['priority']:>4} {decision['vm_size']:<18} "
+              f"{str(decision['cores']):>6}  {status}")
+    print("\nRemaining headroom:")
+    for key, headroom in result['remaining_headroom'].items():
+        print(f"  {key}: {', '.join(f'{name}={value}' for name, value in sorted(headroom.items()))}")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Admission decisions saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Unified CLI for VM Automation Accelerator Python scripts
+Dispatches cost, quota and ServiceNow subcommands, importing each
+script module only when its subcommand runs
+
+Usage:
+    python automation_cli.py cost --vm-size Standard_D4s_v3 --backup
+    python automation_cli.py quota --subscription-id <id> --location westeurope --vm-size Standard_D4s_v3
+    python automation_cli.py snow --ticket RITM0010001 --status Started --pipeline vm-deploy
+
+Startup cost can be checked with: python -X importtime automation_cli.py --help
+Profile a run with: python automation_cli.py --profile cost --vm-size Standard_D4s_v3
+(or AUTOMATION_PROFILE=1, see automation_profiler.py)
+Logging options (sampling, JSON output) are described in automation_logging.py
+"""
+
+import os
+import sys
+import importlib
+from typing import List, Optional
+
+# Subcommand -> (module name, description)
+# Modules are imported lazily so that --help and cost estimates do not pay
+# for the Azure SDK or requests imports.
+COMMANDS = {
+    'cost': ('cost_calculator', 'Estimate monthly Azure VM costs'),
+    'cost-rollup': ('cost_rollup', 'Roll up fleet cost by cost center, environment and SKU'),
+    'cost-uncertainty': ('cost_uncertainty', 'Monte Carlo P50/P90/P99 cost per VM and fleet'),
+    'cost-sweep': ('cost_sweep', 'Sweep a VM cost scenario grid across CPU cores'),
+    'quota': ('quota_manager', 'Check Azure compute and network quota'),
+    'policy': ('policy_evaluator', 'Validate VM requests against governance policies'),
+    'preflight': ('provisioning_preflight', 'Run cost, quota, policy and CMDB checks for a VM order'),
+    'admit': ('admission_controller', 'Admit queued VM orders against one quota snapshot'),
+    'capacity-sim': ('capacity_simulator', 'Replay VM requests through a capacity simulation'),
+    'snow': ('servicenow_client', 'Update ServiceNow tickets with pipeline status'),
+    'cmdb-sync': ('cmdb_sync', 'Incrementally sync Azure VMs into the CMDB'),
+    'spool': ('status_spool', 'Flush or inspect the ServiceNow status spool'),
+    'agent': ('status_agent', 'Run or talk to the local ServiceNow status agent'),
+    'bench': ('benchmark_suite', 'Run offline benchmarks and compare against a baseline'),
+}
+
+
+def build_parser():
+    """
+    Build the top-level argument parser
+
+    Returns:
+        ArgumentParser that captures the subcommand and its raw arguments
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='automation_cli.py',
+        description='VM Automation Accelerator CLI',
+        epilog='Run "<command> --help" for command options.'
+    )
+    parser.add_argument('--log-level', help='Log level (default: AUTOMATION_LOG_LEVEL or INFO)')
+    parser.add_argument('--log-format', choices=['text', 'json'], help='Log output format (default: AUTOMATION_LOG_FORMAT or text)')
+    parser.add_argument('--profile', action='store_true', help='Print a CostCalculator/QuotaManager profile at exit')
+    parser.add_argument('--profile-memory', action='store_true', help='Include tracemalloc peaks in the profile')
+    parser.add_argument('--profile-output', metavar='PREFIX', help='Write PREFIX.json and PREFIX.collapsed profiles')
+    parser.add_argument(
+        'command',
+        choices=list(COMMANDS),
+        metavar='command',
+        help='; '.join(f'{name}: {desc}' for name, (_, desc) in COMMANDS.items())
+    )
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+
+    return parser
+
+
+def run_command(command: str, argv: List[str]) -> int:
+    """
+    Import the subcommand module and run its main()
+
+    Args:
+        command: Subcommand name
+        argv: Arguments forwarded to the subcommand
+
+    Returns:
+        Process exit code
+    """
+    module_name, _ = COMMANDS[command]
+    module = importlib.import_module(module_name)
+
+    result = module.main(argv)
+    return result if isinstance(result, int) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """CLI interface"""
+    args = build_parser().parse_args(argv)
+
+    from automation_logging import configure_logging
+    configure_logging(level=args.log_level, json_format=args.log_format == 'json' if args.log_format else None)
+
+    if args.profile or args.profile_memory or args.profile_output:
+        from automation_profiler import enable_profiling
+        enable_profiling(memory=args.profile_memory, output=args.profile_output)
+    elif os.getenv('AUTOMATION_PROFILE'):
+        from automation_profiler import profiling_from_env
+        profiling_from_env()
+
+    return run_command(args.command, args.args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
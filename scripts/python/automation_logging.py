@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Shared Logging Setup for VM Automation Accelerator
+Routes all log records through a queue to a background writer thread, with
+per-logger sampling and rate limiting for hot-path messages and optional
+structured JSON output
+
+Library modules only create loggers; entry points call configure_logging().
+Settings come from arguments or the environment:
+    AUTOMATION_LOG_LEVEL   Root level (default: INFO)
+    AUTOMATION_LOG_FORMAT  text or json (default: text)
+    AUTOMATION_LOG_SAMPLE  Fraction of INFO/DEBUG records kept per logger,
+                           e.g. "cost_calculator=0.01,servicenow_client=0.1"
+    AUTOMATION_LOG_RATE    Max INFO/DEBUG records per second per logger,
+                           e.g. "servicenow_client=20"
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Dict, Optional
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+_sampled_loggers = []
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed with extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-logger sampling and rate limiting of INFO and DEBUG records
+
+    Warnings and errors always pass. Sampling keeps every Nth record of a
+    logger (deterministic, no random draws); rate limiting keeps at most
+    N records per second per logger with a token bucket. Rules match a
+    logger and its children ('servicenow_client' covers
+    'servicenow_client.batch'). Suppressed records are counted and reported
+    by summary().
+
+    Loggers named in the rules when logging is configured decide before a
+    record is even created; loggers created later are filtered at the
+    handler.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None, max_per_second: Optional[Dict[str, float]] = None):
+        """
+        Initialize filter
+
+        Args:
+            sample_rates: Logger name -> fraction of records kept (0-1)
+            max_per_second: Logger name -> records per second
+        """
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.max_per_second = max_per_second or {}
+        self.suppressed: Dict[str, int] = {}
+        self._seen: Dict[str, int] = {}
+        self._buckets: Dict[str, list] = {}
+        self._rules: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        # Loggers that sample before creating records (see _SampledLogger)
+        self.early = set()
+
+    def _rule(self, name: str) -> tuple:
+        """(sample every Nth or None, rate or None) for a logger, cached"""
+        rule = self._rules.get(name)
+        if rule is None:
+            def lookup(table: Dict[str, float]) -> Optional[float]:
+                parts = name.split('.')
+                for end in range(len(parts), 0, -1):
+                    value = table.get('.'.join(parts[:end]))
+                    if value is not None:
+                        return value
+                return None
+
+            rate = lookup(self.sample_rates)
+            if rate is None or rate >= 1:
+                every = None
+            elif rate <= 0:
+                every = 0
+            else:
+                every = max(1, round(1 / rate))
+            rule = self._rules[name] = (every, lookup(self.max_per_second))
+        return rule
+
+    def keep(self, name: str) -> bool:
+        """Decide whether the next INFO/DEBUG record of a logger is kept"""
+        every, rate = self._rule(name)
+        if every is None and rate is None:
+            return True
+
+        with self._lock:
+            keep = True
+            if every is not None:
+                seen = self._seen.get(name, 0)
+                self._seen[name] = seen + 1
+                keep = every > 0 and seen % every == 0
+            if keep and rate is not None:
+                now = time.monotonic()
+                bucket = self._buckets.get(name)
+                if bucket is None:
+                    bucket = self._buckets[name] = [rate, now]
+                bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                else:
+                    keep = False
+            if not keep:
+                self.suppressed[name] = self.suppressed.get(name, 0) + 1
+        return keep
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or record.name in self.early:
+            return True
+        return self.keep(record.name)
+
+    def summary(self) -> Optional[str]:
+        """One line listing suppressed record counts, None when nothing was dropped"""
+        with self._lock:
+            if not self.suppressed:
+                return None
+            counts = ', '.join(f"{name}={count}" for name, count in sorted(self.suppressed.items()))
+        return f"Suppressed INFO/DEBUG records by sampling/rate limits: {counts}"
+
+
+class _SampledLogger(logging.Logger):
+    """Logger that drops sampled-out INFO/DEBUG calls before building a record"""
+
+    sampler: SamplingFilter
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if level <= logging.INFO and not self.sampler.keep(self.name):
+            return
+        # One more frame to skip so the record points at the caller, not here
+        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+
+
+def _install_sampler(sampler: SamplingFilter):
+    """Switch the loggers the rules name (and their existing children) to _SampledLogger"""
+    for sampled in _sampled_loggers:
+        sampled.__class__ = logging.Logger
+    _sampled_loggers.clear()
+
+    names = set(sampler.sample_rates) | set(sampler.max_per_second)
+    for name in names:
+        logging.getLogger(name)
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and any(name == rule or name.startswith(rule + '.') for rule in names):
+            if type(logger) is logging.Logger:
+                logger.__class__ = _SampledLogger
+                logger.sampler = sampler
+                sampler.early.add(name)
+                _sampled_loggers.append(logger)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message formatting to the writer thread
+
+    QueueHandler.prepare() formats every record in the calling thread so it
+    can be pickled; records here stay in process, so the caller only pays
+    for creating the record and putting it on the queue. Log arguments
+    should therefore not be mutated after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _parse_rules(value: Optional[str]) -> Dict[str, float]:
+    """Parse "name=value,name=value" settings"""
+    rules = {}
+    for item in (value or '').split(','):
+        name, _, number = item.strip().partition('=')
+        if name and number:
+            rules[name.strip()] = float(number)
+    return rules
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    max_per_second: Optional[Dict[str, float]] = None,
+    stream=None
+) -> QueueListener:
+    """
+    Configure the root logger with a background writer thread
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level: Root level name (default: AUTOMATION_LOG_LEVEL or INFO)
+        json_format: JSON lines instead of text (default: AUTOMATION_LOG_FORMAT == 'json')
+        sample_rates: Logger -> fraction of INFO/DEBUG kept (default: AUTOMATION_LOG_SAMPLE)
+        max_per_second: Logger -> INFO/DEBUG per second (default: AUTOMATION_LOG_RATE)
+        stream: Output stream (default: stderr)
+
+    Returns:
+        Running QueueListener (stopped and flushed at exit)
+    """
+    global _listener
+
+    level = (level or os.getenv('AUTOMATION_LOG_LEVEL') or 'INFO').upper()
+    if json_format is None:
+        json_format = os.getenv('AUTOMATION_LOG_FORMAT', 'text').lower() == 'json'
+    if sample_rates is None:
+        sample_rates = _parse_rules(os.getenv('AUTOMATION_LOG_SAMPLE'))
+    if max_per_second is None:
+        max_per_second = _parse_rules(os.getenv('AUTOMATION_LOG_RATE'))
+
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    sampler = SamplingFilter(sample_rates, max_per_second)
+    if sample_rates or max_per_second:
+        # On the handler, so suppressed records never reach the queue
+        handler.addFilter(sampler)
+
+    with _lock:
+        _install_sampler(sampler)
+        if _listener is not None:
+            _listener.stop()
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+            existing.close()
+        root.addHandler(handler)
+        root.setLevel(level)
+
+        listener = QueueListener(records, writer, respect_handler_level=True)
+        listener.queue_handler = handler
+        listener.sampler = sampler
+        listener.start()
+        first = _listener is None
+        _listener = listener
+
+    if first:
+        atexit.register(_shutdown)
+    return listener
+
+
+def _shutdown():
+    """Report suppressed counts, then drain the queue and stop the writer thread"""
+    global _listener
+
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    summary = listener.sampler.summary()
+    if summary:
+        logging.getLogger(__name__).warning(summary)
+    listener.stop()
+
+    # Records logged by exit handlers that run after this one are written directly
+    root = logging.getLogger()
+    root.removeHandler(listener.queue_handler)
+    for handler in listener.handlers:
+        handler.flush()
+        root.addHandler(handler)
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Opt-in Profiling for CostCalculator and QuotaManager
+Records per-method call counts, cumulative and percentile timings, Azure
+Resource Manager (ARM) call time separately from local compute, optional
+tracemalloc peaks, and collapsed stacks for flame graphs
+
+Profiling is enabled with automation_cli.py --profile or AUTOMATION_PROFILE=1.
+Nothing is patched until it is enabled, so the disabled cost is zero.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import random
+import logging
+import functools
+import threading
+import tracemalloc
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Durations kept per method for percentiles (reservoir sample)
+RESERVOIR_SIZE = 10000
+
+# Classes profiled by enable_profiling(): module -> (class, ARM client attributes)
+PROFILED_CLASSES = {
+    'cost_calculator': ('CostCalculator', ()),
+    'quota_manager': ('QuotaManager', ('compute_client', 'network_client')),
+}
+
+ARM_PREFIX = 'ARM '
+
+# Results of these types are returned as-is by ARM client proxies
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), dict, list, tuple)
+
+
+class _MethodStats:
+    """Timings for one profiled method or ARM operation"""
+
+    __slots__ = ('calls', 'total', 'self_time', 'durations', 'peak_bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.durations: List[float] = []
+        self.peak_bytes = 0
+
+    def add(self, elapsed: float, self_time: float, rng: random.Random):
+        self.calls += 1
+        self.total += elapsed
+        self.self_time += self_time
+        if len(self.durations) < RESERVOIR_SIZE:
+            self.durations.append(elapsed)
+        else:
+            index = rng.randrange(self.calls)
+            if index < RESERVOIR_SIZE:
+                self.durations[index] = elapsed
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.durations)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Profiler:
+    """
+    Wall-clock profiler for instrumented classes
+
+    Each instrumented call is timed inclusively and exclusively (self time
+    excludes instrumented callees). Calls through ARM client proxies are
+    recorded under 'ARM <client>.<group>.<operation>', including the time
+    spent paging through their results, so the local compute share of a
+    run is the self time of everything else. Call stacks are tracked per
+    thread.
+    """
+
+    def __init__(self, memory: bool = False):
+        """
+        Initialize profiler
+
+        Args:
+            memory: Track peak traced memory per outermost call with tracemalloc
+        """
+        self.memory = memory
+        self.stats: Dict[str, _MethodStats] = {}
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._patched: List[Tuple[type, str, object]] = []
+        self._started = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # =========================================================================
+    # RECORDING
+    # =========================================================================
+
+    def _stack(self) -> List[list]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str) -> list:
+        """Push a frame: [name, child time, start, traced memory at entry]"""
+        stack = self._stack()
+        traced = None
+        if self.memory and not stack:
+            tracemalloc.reset_peak()
+            traced = tracemalloc.get_traced_memory()[0]
+        frame = [name, 0.0, time.perf_counter(), traced]
+        stack.append(frame)
+        return frame
+
+    def _exit(self, frame: list, extra: float = 0.0):
+        elapsed = time.perf_counter() - frame[2] + extra
+        stack = self._stack()
+        path = tuple(entry[0] for entry in stack)
+        stack.pop()
+        if stack:
+            stack[-1][1] += elapsed
+        peak = tracemalloc.get_traced_memory()[1] - frame[3] if frame[3] is not None else 0
+        self._record(frame[0], path, elapsed, elapsed - frame[1], peak)
+
+    def _record(self, name: str, path: Tuple[str, ...], elapsed: float, self_time: float, peak: int = 0):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = _MethodStats()
+            stats.add(elapsed, self_time, self._rng)
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+            self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+
+    def timed(self, name: str, func):
+        """
+        Wrap a callable so every call is recorded under name
+
+        Args:
+            name: Name shown in reports
+            func: Callable to wrap
+
+        Returns:
+            Wrapped callable
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            frame = self._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(frame)
+
+        return wrapper
+
+    def _timed_arm(self, name: str, func):
+        """Like timed(), but also times iteration of returned pagers"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            path = tuple(entry[0] for entry in stack) + (name,)
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                self._arm_done(name, path, time.perf_counter() - started)
+                raise
+            elapsed = time.perf_counter() - started
+            if isinstance(result, _PLAIN_TYPES) or not hasattr(result, '__iter__'):
+                self._arm_done(name, path, elapsed)
+                return result
+            return self._timed_pages(name, path, result, elapsed)
+
+        return wrapper
+
+    def _timed_pages(self, name: str, path: Tuple[str, ...], pager: Iterable, elapsed: float):
+        """Yield from an ARM pager, recording the call once it is exhausted"""
+        iterator = iter(pager)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - started
+                    return
+                elapsed += time.perf_counter() - started
+                yield item
+        finally:
+            self._arm_done(name, path, elapsed)
+
+    def _arm_done(self, name: str, path: Tuple[str, ...], elapsed: float):
+        stack = self._stack()
+        if stack:
+            stack[-1][1] += elapsed
+        self._record(name, path, elapsed, elapsed)
+
+    # =========================================================================
+    # INSTRUMENTATION
+    # =========================================================================
+
+    def instrument_class(self, cls: type, arm_clients: Tuple[str, ...] = ()):
+        """
+        Time every public method of a class (including class and static methods)
+
+        Args:
+            cls: Class to patch in place
+            arm_clients: Instance attributes holding Azure SDK clients, which
+                are replaced with timing proxies after __init__
+        """
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_'):
+                continue
+            name = f"{cls.__name__}.{attr}"
+            if isinstance(value, (classmethod, staticmethod)):
+                patched = type(value)(self.timed(name, value.__func__))
+            elif callable(value):
+                patched = self.timed(name, value)
+            else:
+                continue
+            self._patch(cls, attr, value, patched)
+
+        if arm_clients:
+            original_init = vars(cls)['__init__']
+
+            @functools.wraps(original_init)
+            def __init__(instance, *args, **kwargs):
+                original_init(instance, *args, **kwargs)
+                for attr in arm_clients:
+                    client = getattr(instance, attr, None)
+                    if client is not None:
+                        setattr(instance, attr, _ArmProxy(self, client, attr.replace('_client', '')))
+
+            self._patch(cls, '__init__', original_init, self.timed(f"{cls.__name__}.__init__", __init__))
+
+    def _patch(self, cls: type, attr: str, original, patched):
+        self._patched.append((cls, attr, original))
+        setattr(cls, attr, patched)
+
+    def uninstrument(self):
+        """Restore every patched method"""
+        for cls, attr, original in reversed(self._patched):
+            setattr(cls, attr, original)
+        self._patched.clear()
+
+    # =========================================================================
+    # REPORTING
+    # =========================================================================
+
+    def summary(self) -> Dict:
+        """
+        Summarize recorded timings
+
+        Returns:
+            Wall time, ARM vs. local compute split, traced memory peak and
+            per-method stats sorted by self time
+        """
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1].self_time)
+            methods = {
+                name: {
+                    'calls': stats.calls,
+                    'total_ms': round(stats.total * 1000, 3),
+                    'self_ms': round(stats.self_time * 1000, 3),
+                    'p50_ms': round(stats.percentile(0.5) * 1000, 3),
+                    'p95_ms': round(stats.percentile(0.95) * 1000, 3),
+                    'p99_ms': round(stats.percentile(0.99) * 1000, 3),
+                    **({'peak_kb': round(stats.peak_bytes / 1024, 1)} if self.memory else {})
+                }
+                for name, stats in items
+            }
+            arm = sum(stats.self_time for name, stats in items if name.startswith(ARM_PREFIX))
+            local = sum(stats.self_time for name, stats in items if not name.startswith(ARM_PREFIX))
+
+        summary = {
+            'wall_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'arm_ms': round(arm * 1000, 3),
+            'local_ms': round(local * 1000, 3),
+            'methods': methods
+        }
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            summary['traced_memory_kb'] = {'current': round(current / 1024, 1), 'peak': round(peak / 1024, 1)}
+            summary['top_allocations'] = [
+                {'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                for stat in tracemalloc.take_snapshot().statistics('lineno')[:10]
+            ]
+        return summary
+
+    def format_table(self, summary: Optional[Dict] = None) -> str:
+        """
+        Render a summary as a text table
+
+        Args:
+            summary: summary() output (default: current)
+
+        Returns:
+            Table text
+        """
+        summary = summary or self.summary()
+        memory = self.memory
+        lines = [
+            "=" * 100,
+            "PROFILE",
+            "=" * 100,
+            f"Wall: {summary['wall_ms']:.1f} ms  ARM: {summary['arm_ms']:.1f} ms  "
+            f"Local compute: {summary['local_ms']:.1f} ms",
+            "",
+            f"{'Method':<44} {'Calls':>8} {'Total ms':>10} {'Self ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            + (f" {'Peak KB':>9}" if memory else ""),
+        ]
+        for name, stats in summary['methods'].items():
+            lines.append(
+                f"{name[:44]:<44} {stats['calls']:>8} {stats['total_ms']:>10.2f} {stats['self_ms']:>10.2f} "
+                f"{stats['p50_ms']:>8.3f} {stats['p95_ms']:>8.3f} {stats['p99_ms']:>8.3f}"
+                + (f" {stats['peak_kb']:>9.1f}" if memory else "")
+            )
+        if 'traced_memory_kb' in summary:
+            lines.append("")
+            lines.append(f"Traced memory peak: {summary['traced_memory_kb']['peak']:,.1f} KB")
+            for allocation in summary['top_allocations'][:5]:
+                lines.append(f"  {allocation['size_kb']:>10,.1f} KB  {allocation['location']}")
+        lines.append("=" * 100)
+        return '\n'.join(lines)
+
+    def collapsed_stacks(self) -> str:
+        """
+        Self time per call stack in collapsed format ('a;b;c <microseconds>'),
+        as read by flamegraph.pl and speedscope
+
+        Returns:
+            Collapsed stack text
+        """
+        with self._lock:
+            items = sorted(self.stacks.items())
+        return ''.join(
+            f"{';'.join(path)} {round(seconds * 1e6)}\n"
+            for path, seconds in items if round(seconds * 1e6) > 0
+        )
+
+    def export(self, prefix: str):
+        """
+        Write <prefix>.json (summary) and <prefix>.collapsed (flame graph input)
+
+        Args:
+            prefix: Output path prefix
+        """
+        with open(f"{prefix}.json", 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(f"{prefix}.collapsed", 'w') as f:
+            f.write(self.collapsed_stacks())
+        logger.info(f"Profile saved to: {prefix}.json, {prefix}.collapsed")
+
+
+class _ArmProxy:
+    """Forwards to an Azure SDK client, timing every operation call"""
+
+    def __init__(self, profiler: Profiler, target, path: str):
+        self._profiler = profiler
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._target, attr)
+        path = f"{self._path}.{attr}"
+        if callable(value):
+            return self._profiler._timed_arm(ARM_PREFIX + path, value)
+        if isinstance(value, _PLAIN_TYPES) or attr.startswith('_'):
+            return value
+        # Operation groups (client.usage, client.virtual_machine_sizes, ...)
+        return _ArmProxy(self._profiler, value, path)
+
+
+_active_profiler: Optional[Profiler] = None
+_active_lock = threading.Lock()
+
+
+def active_profiler() -> Optional[Profiler]:
+    """Profiler installed by enable_profiling(), None when profiling is off"""
+    return _active_profiler
+
+
+def enable_profiling(memory: bool = False, output: Optional[str] = None, report: bool = True) -> Profiler:
+    """
+    Instrument CostCalculator and QuotaManager for the rest of the process
+
+    Calling it again returns the profiler already installed.
+
+    Args:
+        memory: Track peak memory with tracemalloc (slows allocation-heavy code)
+        output: Path prefix for the JSON summary and collapsed stacks written at exit
+        report: Print the summary table to stderr at exit
+
+    Returns:
+        Installed profiler
+    """
+    global _active_profiler
+
+    import importlib
+
+    with _active_lock:
+        if _active_profiler is not None:
+            return _active_profiler
+
+        profiler = Profiler(memory=memory)
+        for module_name, (class_name, arm_clients) in PROFILED_CLASSES.items():
+            cls = getattr(importlib.import_module(module_name), class_name)
+            profiler.instrument_class(cls, arm_clients)
+
+        def finish():
+            if not profiler.stats:
+                return
+            summary = profiler.summary()
+            if report:
+                print(profiler.format_table(summary), file=sys.stderr)
+            if output:
+                profiler.export(output)
+
+        atexit.register(finish)
+        _active_profiler = profiler
+        logger.info(f"Profiling enabled{' with tracemalloc' if memory else ''}")
+        return profiler
+
+
+def profiling_from_env() -> Optional[Profiler]:
+    """
+    Enable profiling when AUTOMATION_PROFILE is set
+
+    AUTOMATION_PROFILE=1 prints the summary at exit,
+    AUTOMATION_PROFILE_OUTPUT=<prefix> also writes <prefix>.json and
+    <prefix>.collapsed, and AUTOMATION_PROFILE_MEMORY=1 adds tracemalloc.
+
+    Returns:
+        Installed profiler, or None when profiling is off
+    """
+    if os.getenv('AUTOMATION_PROFILE', '').lower() in ('', '0', 'false', 'no'):
+        return None
+    return enable_profiling(
+        memory=os.getenv('AUTOMATION_PROFILE_MEMORY', '').lower() in ('1', 'true', 'yes'),
+        output=os.getenv('AUTOMATION_PROFILE_OUTPUT')
+    )
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for VM Automation Accelerator Python scripts
+Measures costing throughput, quota checks, ServiceNow request throughput,
+CLI startup time and peak memory offline (local fakes and the ServiceNow
+stand-in), saves versioned JSON baselines and flags regressions against them
+
+Usage:
+    python benchmark_suite.py run --output benchmarks/baselines/main.json
+    python benchmark_suite.py compare --baseline benchmarks/baselines/main.json
+
+benchmarks/baselines/main.json is the committed reference; its environment
+block records the machine it was measured on. Timings only compare on like
+hardware, so regenerate it with the run command when that changes.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+import tracemalloc
+import logging
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the result file layout changes; results of different schema
+# versions are not compared
+SCHEMA_VERSION = 1
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, 'benchmarks', 'fixtures')
+BASELINE_DIR = os.path.join(SCRIPT_DIR, 'benchmarks', 'baselines')
+
+DEFAULT_THRESHOLD = 0.10
+
+# name -> {'setup', 'version', 'description', 'child_process'}
+BENCHMARKS: Dict[str, Dict] = {}
+
+
+def benchmark(name: str, version: int = 1, description: str = '', child_process: bool = False):
+    """
+    Register a benchmark
+
+    The decorated function is a generator taking a scale factor. It
+    prepares its fakes, yields (run, ops) where run() performs ops
+    operations, and cleans up after the yield. Bump version whenever the
+    workload changes so stale baselines are not compared against it.
+
+    Args:
+        name: Benchmark name (area.case)
+        version: Workload version
+        description: One-line description
+        child_process: run() runs a child interpreter (see _run_python) and returns its
+            peak RSS in KB, which is the benchmark's peak memory
+    """
+    def register(func):
+        BENCHMARKS[name] = {
+            'setup': contextmanager(func),
+            'version': version,
+            'description': description,
+            'child_process': child_process
+        }
+        return func
+    return register
+
+
+# =============================================================================
+# FAKES
+# =============================================================================
+
+def _namespace(entry: Dict) -> SimpleNamespace:
+    return SimpleNamespace(**{key: _namespace(value) if isinstance(value, dict) else value for key, value in entry.items()})
+
+
+class RecordedComputeClient:
+    """Azure compute client fake answering from a recorded fixture"""
+
+    def __init__(self, fixture: Dict):
+        usage = [
+            _namespace({'name': {'value': entry['name'], 'localized_value': entry['localized_name']},
+                        'current_value': entry['current_value'], 'limit': entry['limit'], 'unit': entry['unit']})
+            for entry in fixture['compute_usage']
+        ]
+        sizes = [_namespace(entry) for entry in fixture['vm_sizes']]
+        self.usage = SimpleNamespace(list=lambda location: iter(usage))
+        self.virtual_machine_sizes = SimpleNamespace(list=lambda location: iter(sizes))
+
+
+class RecordedNetworkClient:
+    """Azure network client fake answering from a recorded fixture"""
+
+    def __init__(self, fixture: Dict):
+        usages = [
+            _namespace({'name': {'value': entry['name'], 'localized_value': entry['localized_name']},
+                        'current_value': entry['current_value'], 'limit': entry['limit'], 'unit': entry['unit']})
+            for entry in fixture['network_usage']
+        ]
+        self.usages = SimpleNamespace(list=lambda location: iter(usages))
+
+
+def load_fixture(name: str) -> Dict:
+    with open(os.path.join(FIXTURE_DIR, name)) as f:
+        return json.load(f)
+
+
+def recorded_quota_manager(fixture: Dict):
+    """
+    QuotaManager wired to recorded ARM payloads (no Azure SDK or credentials)
+
+    Args:
+        fixture: Fixture with compute_usage, network_usage and vm_sizes
+
+    Returns:
+        QuotaManager
+    """
+    from quota_manager import QuotaManager
+
+    manager = QuotaManager.__new__(QuotaManager)
+    manager.subscription_id = '00000000-0000-0000-0000-000000000000'
+    manager.policy_evaluator = None
+    manager.credential = None
+    manager.compute_client = RecordedComputeClient(fixture)
+    manager.network_client = RecordedNetworkClient(fixture)
+    return manager
+
+
+def _inventory(count: int) -> List[Dict]:
+    from cost_calculator import CostCalculator
+
+    sizes = list(CostCalculator.VM_PRICING)
+    storage = list(CostCalculator.STORAGE_PRICING)
+    return [
+        {
+            'name': f'vm-{i:06d}',
+            'vm_size': sizes[i % len(sizes)],
+            'cost_center': f'CC-{1000 + i % 40}',
+            'environment': ('dev', 'uat', 'prod')[i % 3],
+            'storage_type': storage[i % len(storage)],
+            'data_disk_size_gb': (0, 128, 256, 512)[i % 4],
+            'enable_backup': i % 3 == 2,
+            'outbound_data_gb': (50, 100, 500)[i % 3],
+        }
+        for i in range(count)
+    ]
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+
+@benchmark('cost.scalar', description='CostCalculator.calculate_total_cost, one VM per call')
+def bench_cost_scalar(scale: float):
+    from cost_calculator import CostCalculator
+
+    calculator = CostCalculator()
+    records = _inventory(max(1, int(5000 * scale)))
+
+    def run():
+        for record in records:
+            calculator.calculate_total_cost(
+                record['vm_size'], data_disk_size_gb=record['data_disk_size_gb'],
+                storage_type=record['storage_type'], enable_backup=record['enable_backup'],
+                outbound_data_gb=record['outbound_data_gb']
+            )
+
+    yield run, len(records)
+
+
+@benchmark('cost.batch', description='CostRollup over a generated inventory (memoized pricing)')
+def bench_cost_batch(scale: float):
+    from cost_rollup import CostRollup
+
+    records = _inventory(max(1, int(50000 * scale)))
+
+    def run():
+        CostRollup().add_many(records)
+
+    yield run, len(records)
+
+
+@benchmark('cost.compare_vm_sizes', description='compare_vm_sizes over a large SKU list')
+def bench_compare_vm_sizes(scale: float):
+    from cost_calculator import CostCalculator
+
+    calculator = CostCalculator()
+    known = list(CostCalculator.VM_PRICING)
+    # Known sizes plus unpriced ones (default rate path)
+    vm_sizes = [
+        known[i % len(known)] if i % 4 else f'Standard_X{i}s_v9'
+        for i in range(max(1, int(5000 * scale)))
+    ]
+
+    def run():
+        calculator.compare_vm_sizes(vm_sizes, data_disk_size_gb=256, enable_backup=True)
+
+    yield run, len(vm_sizes)
+
+
+@benchmark('quota.check', description='generate_quota_report against recorded usage payloads')
+def bench_quota_check(scale: float):
+    fixture = load_fixture('quota_westeurope.json')
+    manager = recorded_quota_manager(fixture)
+    sizes = [entry['name'] for entry in fixture['vm_sizes']]
+    checks = max(1, int(2000 * scale))
+
+    def run():
+        for i in range(checks):
+            manager.generate_quota_report(fixture['location'], sizes[i % len(sizes)], quantity=1 + i % 4)
+
+    yield run, checks
+
+
+@benchmark('servicenow.update', description='Pooled ServiceNowClient CI updates against the local stand-in')
+def bench_servicenow_update(scale: float):
+    from servicenow_client import ServiceNowClient
+    from servicenow_metrics import Instrumentation
+    from servicenow_standin import StandInServer
+
+    server = StandInServer().start()
+    sys_ids = [record['sys_id'] for record in server.seed('cmdb_ci_vm_instance', max(1, int(500 * scale)))]
+    client = ServiceNowClient(
+        server.url, 'benchmark', 'benchmark', instrumentation=Instrumentation(),
+        response_fields=['sys_id', 'name']
+    )
+
+    def run():
+        for index, sys_id in enumerate(sys_ids):
+            client.update_vm_ci(sys_id, comments=f'benchmark {index}')
+
+    try:
+        yield run, len(sys_ids)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+# Runs a Python script, then writes the process's own peak RSS in KB to the
+# file descriptor passed as the first argument. VmHWM starts over at exec;
+# getrusage()/wait4() ru_maxrss does not, so for a child it reports at least
+# the RSS the parent had when it forked.
+_PEAK_RSS_LAUNCHER = """
+import os, sys, atexit, runpy
+fd = int(sys.argv.pop(1))
+def report():
+    try:
+        with open('/proc/self/status') as f:
+            peak = next((line.split()[1] for line in f if line.startswith('VmHWM:')), '')
+    except OSError:
+        peak = ''
+    os.write(fd, peak.encode())
+atexit.register(report)
+sys.argv.pop(0)
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def _run_python(args: List[str], **popen_options) -> Optional[int]:
+    """
+    Run a Python script in a fresh interpreter and measure that process alone
+
+    Args:
+        args: Script path and arguments
+        **popen_options: subprocess.Popen options (stdout, stderr, ...)
+
+    Returns:
+        Peak RSS of the child in KB (None where /proc is unavailable)
+
+    Raises:
+        CalledProcessError: If the script fails
+    """
+    read_fd, write_fd = os.pipe()
+    try:
+        command = [sys.executable, '-c', _PEAK_RSS_LAUNCHER, str(write_fd), *args]
+        process = subprocess.Popen(command, pass_fds=(write_fd,), **popen_options)
+    finally:
+        os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as reader:
+        peak = reader.read()
+    if process.wait():
+        raise subprocess.CalledProcessError(process.returncode, args)
+    return int(peak) if peak else None
+
+
+@benchmark('cli.startup', version=2, description='automation_cli.py --help in a fresh interpreter', child_process=True)
+def bench_cli_startup(scale: float):
+    args = [os.path.join(SCRIPT_DIR, 'automation_cli.py'), '--help']
+
+    def run():
+        return _run_python(args, stdout=subprocess.DEVNULL)
+
+    yield run, 1
+
+
+@benchmark('cli.cost', version=2, description='automation_cli.py cost estimate in a fresh interpreter', child_process=True)
+def bench_cli_cost(scale: float):
+    args = [os.path.join(SCRIPT_DIR, 'automation_cli.py'), 'cost', '--vm-size', 'Standard_D4s_v3']
+
+    def run():
+        return _run_python(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    yield run, 1
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+# Metrics where a higher value is better; all others regress upwards
+HIGHER_IS_BETTER = ('ops_per_s',)
+
+
+def run_benchmark(name: str, repeats: int = 5, warmup: int = 1, scale: float = 1.0) -> Dict:
+    """
+    Run one benchmark
+
+    Timing runs are median-of-repeats without tracing; peak memory comes
+    from one extra run under tracemalloc (the child's own peak RSS for subprocess
+    benchmarks).
+
+    Args:
+        name: Registered benchmark name
+        repeats: Timed runs
+        warmup: Untimed runs first
+        scale: Workload size factor
+
+    Returns:
+        Result with ops, median/min seconds, ops_per_s and peak_kb
+    """
+    spec = BENCHMARKS[name]
+    with spec['setup'](scale) as (run, ops):
+        for _ in range(warmup):
+            run()
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+
+        if spec['child_process']:
+            peak_kb = run()
+        else:
+            tracemalloc.start()
+            try:
+                run()
+                peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            finally:
+                tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        'version': spec['version'],
+        'ops': ops,
+        'repeats': repeats,
+        'median_s': round(median, 6),
+        'min_s': round(min(timings), 6),
+        'ops_per_s': round(ops / median, 1) if median else None,
+        'peak_kb': peak_kb
+    }
+
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit
+    }
+
+
+def run_suite(
+    names: Optional[List[str]] = None,
+    repeats: int = 5,
+    warmup: int = 1,
+    scale: float = 1.0,
+    progress: Optional[Callable[[str, Dict], None]] = None
+) -> Dict:
+    """
+    Run benchmarks and build a result document
+
+    Args:
+        names: Benchmarks to run (default: all)
+        repeats: Timed runs per benchmark
+        warmup: Untimed runs per benchmark
+        scale: Workload size factor (e.g., 0.1 for a quick run)
+        progress: Called with (name, result) after each benchmark
+
+    Returns:
+        Versioned result document (save it to use as a baseline)
+    """
+    names = names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    # Hot paths log at INFO per call; measure the code, not the log handler
+    logging.disable(logging.INFO)
+    try:
+        results = {}
+        for name in names:
+            results[name] = run_benchmark(name, repeats, warmup, scale)
+            if progress:
+                progress(name, results[name])
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'created': datetime.utcnow().isoformat() + 'Z',
+        'scale': scale,
+        'environment': _environment(),
+        'results': results
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare a result document against a baseline
+
+    Args:
+        baseline: Baseline document
+        current: Current document
+        threshold: Relative change treated as a regression (0.10 = 10%)
+
+    Returns:
+        One row per (benchmark, metric) with baseline, current, change and
+        status (ok, improved, regressed, skipped)
+    """
+    if baseline.get('schema_version') != current.get('schema_version'):
+        raise ValueError(
+            f"Schema version mismatch: baseline {baseline.get('schema_version')}, "
+            f"current {current.get('schema_version')}"
+        )
+    if baseline.get('scale') != current.get('scale'):
+        logger.warning(f"Comparing scale {current.get('scale')} against baseline scale {baseline.get('scale')}")
+    # Timings only compare on like hardware and interpreters
+    for key in ('python', 'implementation', 'machine', 'cpu_count'):
+        before = baseline.get('environment', {}).get(key)
+        after = current.get('environment', {}).get(key)
+        if before != after:
+            logger.warning(f"Baseline environment differs: {key} {before} -> {after}")
+
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append({'benchmark': name, 'metric': None, 'status': 'skipped', 'reason': 'not in baseline'})
+            continue
+        if base.get('version') != result.get('version'):
+            rows.append({'benchmark': name, 'metric': None, 'status': 'skipped', 'reason': 'workload version changed'})
+            continue
+        for metric in ('ops_per_s', 'peak_kb'):
+            before, after = base.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            status = 'regressed' if worse > threshold else 'improved' if worse < -threshold else 'ok'
+            rows.append({
+                'benchmark': name,
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'change_pct': round(change * 100, 1),
+                'status': status
+            })
+    return rows
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='VM Automation Accelerator benchmark suite')
+    parser.add_argument('action', choices=['run', 'compare', 'list'], help='Run benchmarks, compare against a baseline, or list them')
+    parser.add_argument('--only', help='Comma-separated benchmark names')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per benchmark')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per benchmark')
+    parser.add_argument('--scale', type=float, default=1.0, help='Workload size factor')
+    parser.add_argument('--output', help='Save results (e.g., as a new baseline)')
+    parser.add_argument('--baseline', help='Baseline file (name in benchmarks/baselines or path)')
+    parser.add_argument('--results', help='Compare saved results instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Regression threshold (0.10 = 10%%)')
+
+    args = parser.parse_args(argv)
+
+    if args.action == 'list':
+        for name, spec in BENCHMARKS.items():
+            print(f"{name:<24} v{spec['version']}  {spec['description']}")
+        return 0
+
+    baseline = None
+    if args.action == 'compare':
+        if not args.baseline:
+            parser.error('compare needs --baseline')
+        path = args.baseline
+        if not os.path.exists(path):
+            path = os.path.join(BASELINE_DIR, path if path.endswith('.json') else f"{path}.json")
+        baseline = _load(path)
+
+    if args.results:
+        current = _load(args.results)
+    else:
+        def progress(name: str, result: Dict):
+            logger.info(f"{name}: {result['ops_per_s']} ops/s, median {result['median_s'] * 1000:.2f} ms")
+
+        names = args.only.split(',') if args.only else None
+        if names is None and baseline is not None:
+            names = [name for name in baseline['results'] if name in BENCHMARKS]
+        current = run_suite(names, args.repeats, args.warmup, baseline['scale'] if baseline else args.scale, progress)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        logger.info(f"Benchmark results saved to: {args.output}")
+
+    print("\n" + "="*80)
+    print("BENCHMARK RESULTS")
+    print("="*80)
+    environment = current['environment']
+    print(f"\nPython {environment['python']} on {environment['platform']} ({environment['cpu_count']} CPUs)")
+    print(f"\n{'Benchmark':<24} {'Ops':>7} {'Median ms':>11} {'Ops/s':>12} {'Peak KB':>10}")
+    for name, result in current['results'].items():
+        peak = f"{result['peak_kb']:,.1f}" if result['peak_kb'] is not None else '-'
+        print(f"{name:<24} {result['ops']:>7} {result['median_s'] * 1000:>11.2f} {result['ops_per_s']:>12,.1f} {peak:>10}")
+
+    exit_code = 0
+    if baseline is not None:
+        rows = compare_results(baseline, current, args.threshold)
+        print(f"\nAgainst baseline from {baseline['created']} (threshold {args.threshold:.0%}):")
+        for row in rows:
+            if row['metric'] is None:
+                print(f"  - {row['benchmark']}: skipped ({row['reason']})")
+                continue
+            mark = {'regressed': '✗', 'improved': '↑', 'ok': '✓'}[row['status']]
+            print(
+                f"  {mark} {row['benchmark']:<24} {row['metric']:<10} {row['baseline']:>12,.1f} -> "
+                f"{row['current']:>12,.1f} ({row['change_pct']:+.1f}%)"
+            )
+        regressions = [row for row in rows if row['status'] == 'regressed']
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            exit_code = 1
+        else:
+            print("\n✓ No regressions")
+    print("="*80 + "\n")
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,892 @@
+#!/usr/bin/env python3
+"""
+Discrete-Event Capacity Simulator for VM Automation Accelerator
+Replays a stream of ServiceNow catalog requests (new VMs, SKU changes, disk
+modifications, restores) through approvals, quota admission, the
+provisioning pipeline and ServiceNow status updates on an event heap, and
+reports queueing delay, rejection rate and cost curves for what-if settings
+such as quota limits, pipeline concurrency and approval delays
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import logging
+import itertools
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime, timedelta, timezone
+
+from admission_controller import QuotaSnapshot
+from cost_calculator import CostCalculator
+from quota_manager import QuotaManager
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'servicenow', 'catalog-items')
+
+ORDER = 'order'
+SKU_CHANGE = 'sku_change'
+DISK_MODIFY = 'disk_modify'
+RESTORE = 'restore'
+
+# Catalog item sys_id -> request kind
+CATALOG_KINDS = {
+    'vm_order_catalog_item_001': ORDER,
+    'vm_sku_change_catalog_item_001': SKU_CHANGE,
+    'vm_disk_modify_catalog_item_001': DISK_MODIFY,
+    'vm_restore_catalog_item_001': RESTORE,
+}
+
+# Share of each request kind in generated streams
+DEFAULT_MIX = {ORDER: 0.6, SKU_CHANGE: 0.2, DISK_MODIFY: 0.15, RESTORE: 0.05}
+
+# Mean pipeline run time per request kind, minutes
+DEFAULT_PIPELINE_MINUTES = {ORDER: 45, SKU_CHANGE: 15, DISK_MODIFY: 10, RESTORE: 30}
+
+# VM sizes that need the L2 cloud team approval (vm-provisioning-workflow.xml)
+L2_APPROVAL_SIZES = ('D16', 'E16')
+
+# ServiceNow calls the pipeline makes per request (work notes, state
+# changes, CMDB update, closing the RITM)
+DEFAULT_SNOW_CALLS = 6
+
+# Illustrative per-region limits used when no quota file is given
+DEFAULT_LIMITS = {
+    'cores': 2000,
+    'standardBSFamily': 1000,
+    'standardDSv3Family': 1000,
+    'standardESv3Family': 1000,
+    'standardFSv2Family': 1000,
+}
+
+# Relative arrival rate outside business hours (weekdays 08:00-18:00)
+OFF_HOURS_WEIGHT = 0.1
+
+HOURS_PER_MONTH = 730
+
+# Event kinds, in tie-break order for events at the same time
+_SAMPLE, _DECOMMISSION, _DONE, _APPROVED, _ARRIVE = range(5)
+
+
+# ============================================================================
+# Request streams
+# ============================================================================
+
+def load_catalog(directory: str = CATALOG_DIR) -> Dict[str, Dict]:
+    """
+    Load catalog item definitions
+
+    Args:
+        directory: Directory with ServiceNow catalog item XML exports
+
+    Returns:
+        Mapping of sys_id to {'name', 'kind', 'variables'}, where variables
+        maps each variable name to {'default', 'choices'}
+    """
+    catalog = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.xml'):
+            continue
+        root = ET.parse(os.path.join(directory, filename)).getroot()
+        item = root.find('sc_cat_item')
+        if item is None:
+            continue
+        sys_id = item.findtext('sys_id')
+        variables = {}
+        for option in root.iter('item_option_new'):
+            choices = option.findtext('choice_list')
+            variables[option.findtext('name')] = {
+                'default': option.findtext('default_value') or None,
+                'choices': choices.split(',') if choices else None,
+            }
+        catalog[sys_id] = {
+            'name': item.findtext('name'),
+            'kind': CATALOG_KINDS.get(sys_id),
+            'variables': variables,
+        }
+    logger.info(f"Loaded {len(catalog)} catalog items from {directory}")
+    return catalog
+
+
+def _hour_weights(start: datetime) -> List[float]:
+    """Arrival weight for each hour of the week, starting at start's hour"""
+    weights = []
+    for hour in range(168):
+        moment = start + timedelta(hours=hour)
+        business = moment.weekday() < 5 and 8 <= moment.hour < 18
+        weights.append(1.0 if business else OFF_HOURS_WEIGHT)
+    return weights
+
+
+def generate_orders(
+    catalog: Dict[str, Dict],
+    days: int = 365,
+    orders_per_day: float = 20,
+    mix: Optional[Dict[str, float]] = None,
+    start: Optional[datetime] = None,
+    seed: Optional[int] = None
+) -> Iterator[Dict]:
+    """
+    Generate a synthetic request stream from catalog item choices
+
+    Arrivals follow a Poisson process that is ten times busier during
+    weekday business hours. Variables with a choice list are drawn
+    uniformly from it, others take their catalog default; SKU changes, disk
+    modifications and restores name a VM ordered earlier in the stream.
+
+    Args:
+        catalog: load_catalog() output
+        days: Days to generate
+        orders_per_day: Mean requests per day
+        mix: Request kind -> share (default: DEFAULT_MIX)
+        start: Timestamp of the first day (default: 2025-01-01 UTC)
+        seed: Random seed
+
+    Yields:
+        {'number', 'timestamp', 'catalog_item', 'variables'} in timestamp order
+    """
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mix = mix or DEFAULT_MIX
+    items = {item['kind']: (sys_id, item['variables']) for sys_id, item in catalog.items() if item['kind']}
+    kinds = [kind for kind in mix if kind in items and mix[kind] > 0]
+    if ORDER not in kinds:
+        raise ValueError("The request mix needs new VM orders and the catalog must define them")
+    cumulative = list(itertools.accumulate(mix[kind] for kind in kinds))
+
+    # Thinning: draw at the peak rate, keep each arrival with its hour's weight
+    weights = _hour_weights(start)
+    peak_per_hour = orders_per_day * 7 / sum(weights)
+    horizon = days * 24.0
+    vm_names: List[str] = []
+    t = 0.0
+    number = 0
+    while True:
+        t += rng.expovariate(peak_per_hour)
+        if t >= horizon:
+            return
+        if rng.random() >= weights[int(t) % 168]:
+            continue
+
+        kind = kinds[0] if not vm_names else rng.choices(kinds, cum_weights=cumulative)[0]
+        sys_id, definitions = items[kind]
+        variables = {}
+        for name, definition in definitions.items():
+            if definition['choices']:
+                variables[name] = rng.choice(definition['choices'])
+            elif definition['default'] is not None:
+                variables[name] = definition['default']
+        if kind == ORDER:
+            variables['vm_name'] = f"vm-sim-{len(vm_names):07d}"
+            vm_names.append(variables['vm_name'])
+        else:
+            variables['vm_name'] = rng.choice(vm_names)
+
+        number += 1
+        yield {
+            'number': f"RITM{number:07d}",
+            'timestamp': (start + timedelta(hours=t)).isoformat(),
+            'catalog_item': sys_id,
+            'variables': variables,
+        }
+
+
+def read_orders(path: str) -> Iterator[Dict]:
+    """
+    Stream recorded requests from a JSON lines file
+
+    Each line is {"timestamp", "catalog_item", "variables"} with an ISO 8601
+    timestamp, in timestamp order; catalog_item is a sys_id or catalog name.
+
+    Args:
+        path: JSON lines file path
+
+    Yields:
+        Request dicts
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _as_int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_bool(value, default: bool) -> bool:
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('true', '1', 'yes')
+
+
+def _percentiles(values: List[float]) -> Dict:
+    """Mean, p50, p90, p99 and max, rounded to hundredths"""
+    if not values:
+        return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 2),
+        'p50': round(ordered[int(last * 0.50)], 2),
+        'p90': round(ordered[int(last * 0.90)], 2),
+        'p99': round(ordered[int(last * 0.99)], 2),
+        'max': round(ordered[last], 2),
+    }
+
+
+# ============================================================================
+# Simulator
+# ============================================================================
+
+class _Request:
+    """One catalog request as it moves through the workflow"""
+
+    __slots__ = ('number', 'kind', 'arrived', 'vm_name', 'location', 'vm_size', 'cores', 'family', 'variables', 'ready', 'parked')
+
+    def __init__(self, number, kind, arrived, vm_name, location, vm_size, variables):
+        self.number = number
+        self.kind = kind
+        self.arrived = arrived
+        self.vm_name = vm_name
+        self.location = location
+        self.vm_size = vm_size
+        self.cores = 0
+        self.family = None
+        self.variables = variables
+        self.ready = arrived
+        self.parked = False
+
+
+class _VM:
+    """A VM created during the replay; busy holds the request changing it"""
+
+    __slots__ = (
+        'location', 'vm_size', 'family', 'cores', 'os_disk', 'data_disk', 'storage_type', 'backup',
+        'monthly_cost', 'busy', 'retiring'
+    )
+
+    def __init__(self, location, vm_size, family, cores, os_disk, data_disk, storage_type, backup):
+        self.location = location
+        self.vm_size = vm_size
+        self.family = family
+        self.cores = cores
+        self.os_disk = os_disk
+        self.data_disk = data_disk
+        self.storage_type = storage_type
+        self.backup = backup
+        self.monthly_cost = 0.0
+        self.busy = None
+        self.retiring = False
+
+
+class CapacitySimulator:
+    """
+    Discrete-event simulation of the VM request workflow
+
+    Each request is approved (L1, plus L2 for large sizes), admitted against
+    the region's quota headroom, waits for a free pipeline slot, runs the
+    pipeline including its ServiceNow API calls and then takes effect: new
+    VMs start accruing cost and hold their cores until decommissioned, SKU
+    changes release the old size and disk changes reprice the VM. A SKU
+    change reserves the new size in full until the old one is released.
+    Requests against VMs the replay did not create only load the pipeline.
+
+    Time is in hours from the first request. Arrivals are pulled from the
+    request stream one at a time, so the heap only holds work in flight.
+    """
+
+    def __init__(
+        self,
+        catalog: Dict[str, Dict],
+        quotas: Optional[Dict[str, QuotaSnapshot]] = None,
+        pipeline_concurrency: int = 4,
+        approval_hours: float = 4.0,
+        l2_approval_hours: float = 24.0,
+        pipeline_minutes: Optional[Dict[str, float]] = None,
+        snow_latency_ms: float = 300.0,
+        snow_calls: int = DEFAULT_SNOW_CALLS,
+        vm_lifetime_days: float = 180.0,
+        quota_wait: bool = False,
+        calculator: Optional[CostCalculator] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize simulator
+
+        Args:
+            catalog: load_catalog() output
+            quotas: Quota snapshot per region (default: DEFAULT_LIMITS for every region)
+            pipeline_concurrency: Pipeline runs at the same time
+            approval_hours: Mean L1 approval delay (exponential; 0 = instant)
+            l2_approval_hours: Mean additional L2 approval delay for large sizes
+            pipeline_minutes: Request kind -> mean pipeline run time (default: DEFAULT_PIPELINE_MINUTES)
+            snow_latency_ms: Mean ServiceNow API latency per call
+            snow_calls: ServiceNow API calls per pipeline run
+            vm_lifetime_days: Mean VM lifetime before decommissioning (0 = never)
+            quota_wait: Hold requests until quota frees up instead of rejecting them
+            calculator: CostCalculator used for prices
+            seed: Random seed
+        """
+        self.catalog = catalog
+        self.names = {item['name']: sys_id for sys_id, item in catalog.items()}
+        self.quotas = quotas if quotas is not None else {}
+        self.default_quotas = quotas is None
+        self.pipeline_concurrency = max(1, pipeline_concurrency)
+        self.approval_hours = approval_hours
+        self.l2_approval_hours = l2_approval_hours
+        self.pipeline_minutes = {**DEFAULT_PIPELINE_MINUTES, **(pipeline_minutes or {})}
+        self.snow_latency_hours = snow_latency_ms / 3_600_000
+        self.snow_calls = snow_calls
+        self.vm_lifetime_hours = vm_lifetime_days * 24
+        self.quota_wait = quota_wait
+        self.calculator = calculator or CostCalculator()
+        self.seed = seed
+        self.vm_size_cores = {size: spec[0] for size, spec in CostCalculator.VM_SPECS.items()}
+        self._families: Dict[str, str] = {}
+        self._prices: Dict[tuple, float] = {}
+
+    def _defaults(self, kind: str) -> Dict:
+        for item in self.catalog.values():
+            if item['kind'] == kind:
+                return {name: definition['default'] for name, definition in item['variables'].items()}
+        return {}
+
+    def _quota(self, location: str) -> QuotaSnapshot:
+        snapshot = self.quotas.get(location)
+        if snapshot is None:
+            if not self.default_quotas:
+                logger.warning(f"No quota given for {location}; using default limits")
+            usage = {name: {'current': 0, 'limit': limit} for name, limit in DEFAULT_LIMITS.items()}
+            snapshot = self.quotas[location] = QuotaSnapshot('simulated', location, usage, self.vm_size_cores)
+        return snapshot
+
+    def _family(self, vm_size: str) -> str:
+        family = self._families.get(vm_size)
+        if family is None:
+            family = self._families[vm_size] = QuotaManager.get_vm_family(vm_size)
+        return family
+
+    def _price(self, vm: _VM) -> float:
+        """Monthly cost of a VM configuration, priced once per configuration"""
+        key = (vm.vm_size, vm.os_disk, vm.data_disk, vm.storage_type, vm.backup)
+        price = self._prices.get(key)
+        if price is None:
+            price = self._prices[key] = self.calculator.calculate_total_cost(
+                vm_size=vm.vm_size,
+                os_disk_size_gb=vm.os_disk,
+                data_disk_size_gb=vm.data_disk,
+                storage_type=vm.storage_type,
+                enable_backup=vm.backup
+            )['total_monthly_cost']
+        return price
+
+    def run(self, orders: Iterable[Dict], start: Optional[datetime] = None) -> Dict:
+        """
+        Replay a request stream
+
+        Args:
+            orders: Requests in timestamp order (read_orders() or generate_orders())
+            start: Time zero (default: timestamp of the first request)
+
+        Returns:
+            Simulation results with delay percentiles, rejections, daily
+            cost/queue curves and event throughput
+        """
+        rng = random.Random(self.seed)
+        order_defaults = self._defaults(ORDER)
+        started = time.perf_counter()
+
+        heap: List[tuple] = []
+        sequence = itertools.count()
+        push = heapq.heappush
+        pop = heapq.heappop
+
+        stream = iter(orders)
+        vms: Dict[str, _VM] = {}
+        pipeline_queue: deque = deque()
+        waiting: Dict[str, deque] = {}
+        running = 0
+        in_flight = 0
+
+        requests = 0
+        by_kind: Dict[str, int] = {}
+        completed = 0
+        rejections: Dict[str, int] = {}
+        approval_delays: List[float] = []
+        quota_delays: List[float] = []
+        queue_delays: List[float] = []
+        lead_times: List[float] = []
+        busy_hours = 0.0
+        peak_queue = 0
+        events = 0
+
+        run_rate = 0.0
+        peak_run_rate = 0.0
+        accrued = 0.0
+        accrued_at = 0.0
+
+        daily: List[Dict] = []
+        day_counts = {'arrivals': 0, 'approvals': 0, 'rejected': 0, 'completed': 0, 'snow_calls': 0}
+        min_headroom: Dict[str, Dict[str, int]] = {}
+
+        last_arrival = [None]
+
+        def next_arrival():
+            for order in stream:
+                moment = _parse_timestamp(order['timestamp'])
+                if last_arrival[0] is not None and moment < last_arrival[0]:
+                    raise ValueError(f"Requests are not in timestamp order at {order['timestamp']}")
+                last_arrival[0] = moment
+                push(heap, ((moment - origin).total_seconds() / 3600, next(sequence), _ARRIVE, order))
+                return True
+            return False
+
+        def admit(request: _Request, now: float) -> bool:
+            """Reserve quota; False when the request is rejected or parked"""
+            if not request.cores:
+                return True
+            snapshot = self._quota(request.location)
+            exhausted = snapshot.fits(request.family, request.cores)
+            if exhausted is None:
+                snapshot.take(request.family, request.cores)
+                lowest = min_headroom.setdefault(request.location, {})
+                for name in ('cores', request.family):
+                    value = snapshot.headroom[name]
+                    if value < lowest.get(name, value + 1):
+                        lowest[name] = value
+                return True
+            if self.quota_wait:
+                request.parked = True
+                waiting.setdefault(request.location, deque()).append(request)
+            else:
+                reject(request, f"quota:{exhausted}")
+                if request.kind == SKU_CHANGE:
+                    vms[request.vm_name].busy = None
+            return False
+
+        def reject(request: _Request, reason: str):
+            nonlocal in_flight
+            rejections[reason] = rejections.get(reason, 0) + 1
+            day_counts['rejected'] += 1
+            in_flight -= 1
+
+        def start_pipeline(request: _Request, now: float):
+            nonlocal running, busy_hours
+            running += 1
+            queue_delays.append(now - request.ready)
+            duration = self.pipeline_minutes.get(request.kind, 30) / 60 * rng.uniform(0.5, 1.5)
+            if self.snow_calls > 0 and self.snow_latency_hours > 0:
+                duration += rng.gammavariate(self.snow_calls, self.snow_latency_hours)
+            day_counts['snow_calls'] += self.snow_calls
+            busy_hours += duration
+            push(heap, (now + duration, next(sequence), _DONE, request))
+
+        def enqueue(request: _Request, now: float):
+            nonlocal peak_queue
+            request.ready = now
+            if running < self.pipeline_concurrency:
+                start_pipeline(request, now)
+            else:
+                pipeline_queue.append(request)
+                if len(pipeline_queue) > peak_queue:
+                    peak_queue = len(pipeline_queue)
+
+        def release(location: str, family: str, cores: int, now: float):
+            self._quota(location).release(family, cores)
+            parked = waiting.get(location)
+            if not parked:
+                return
+            # Backfill: later requests may use headroom an earlier one cannot
+            snapshot = self._quota(location)
+            for request in list(parked):
+                if snapshot.fits(request.family, request.cores) is None:
+                    parked.remove(request)
+                    request.parked = False
+                    admit(request, now)
+                    quota_delays.append(now - request.ready)
+                    enqueue(request, now)
+
+        def retire(vm_name: str, vm: _VM, now: float):
+            nonlocal accrued, accrued_at, run_rate
+            del vms[vm_name]
+            accrued += run_rate * (now - accrued_at) / HOURS_PER_MONTH
+            accrued_at = now
+            run_rate -= vm.monthly_cost
+            release(vm.location, vm.family, vm.cores, now)
+
+        origin = start
+        if origin is None:
+            first = next(stream, None)
+            if first is None:
+                raise ValueError("The request stream is empty")
+            origin = _parse_timestamp(first['timestamp'])
+            stream = itertools.chain([first], stream)
+        arrivals_left = next_arrival()
+        push(heap, (24.0, next(sequence), _SAMPLE, None))
+
+        now = 0.0
+        while heap:
+            at, _, kind, payload = pop(heap)
+            if kind == _DECOMMISSION and not arrivals_left and in_flight == 0:
+                # Only retirements of idle VMs are left
+                break
+            now = at
+            events += 1
+
+            if kind == _ARRIVE:
+                arrivals_left = next_arrival()
+                requests += 1
+                in_flight += 1
+                day_counts['arrivals'] += 1
+                order = payload
+                sys_id = order['catalog_item']
+                item = self.catalog.get(sys_id) or self.catalog.get(self.names.get(sys_id))
+                request_kind = item['kind'] if item else None
+                if request_kind is None:
+                    by_kind['unknown'] = by_kind.get('unknown', 0) + 1
+                    reject(_Request(order.get('number'), None, now, None, None, None, {}), 'unknown_catalog_item')
+                    continue
+                by_kind[request_kind] = by_kind.get(request_kind, 0) + 1
+
+                variables = order.get('variables') or {}
+                vm_name = variables.get('vm_name')
+                location = vm_size = None
+                if request_kind == ORDER:
+                    location = variables.get('azure_region') or order_defaults.get('azure_region')
+                    vm_size = variables.get('vm_size') or order_defaults.get('vm_size')
+                elif request_kind == SKU_CHANGE:
+                    vm_size = variables.get('new_vm_size')
+                request = _Request(order.get('number'), request_kind, now, vm_name, location, vm_size, variables)
+
+                delay = 0.0
+                if self.approval_hours > 0:
+                    delay += rng.expovariate(1 / self.approval_hours)
+                day_counts['approvals'] += 1
+                if vm_size and self.l2_approval_hours > 0 and any(size in vm_size for size in L2_APPROVAL_SIZES):
+                    delay += rng.expovariate(1 / self.l2_approval_hours)
+                    day_counts['approvals'] += 1
+                approval_delays.append(delay)
+                push(heap, (now + delay, next(sequence), _APPROVED, request))
+
+            elif kind == _APPROVED:
+                request = payload
+                request.ready = now
+                vm = vms.get(request.vm_name) if request.kind != ORDER else None
+                if vm is not None and vm.busy is not None:
+                    reject(request, 'vm_busy')
+                    continue
+                if request.kind == ORDER or (request.kind == SKU_CHANGE and vm is not None):
+                    cores = self.vm_size_cores.get(request.vm_size)
+                    if not cores:
+                        reject(request, 'unknown_vm_size')
+                        continue
+                    request.cores = cores
+                    request.family = self._family(request.vm_size)
+                    if vm is not None:
+                        request.location = vm.location
+                if vm is not None:
+                    vm.busy = request
+                if admit(request, now):
+                    enqueue(request, now)
+
+            elif kind == _DONE:
+                request = payload
+                running -= 1
+                in_flight -= 1
+                completed += 1
+                day_counts['completed'] += 1
+                lead_times.append(now - request.arrived)
+                if pipeline_queue:
+                    start_pipeline(pipeline_queue.popleft(), now)
+
+                vm = vms.get(request.vm_name)
+                if request.kind == ORDER or vm is not None:
+                    accrued += run_rate * (now - accrued_at) / HOURS_PER_MONTH
+                    accrued_at = now
+                if request.kind == ORDER:
+                    variables = request.variables
+                    vm = _VM(
+                        request.location, request.vm_size, request.family, request.cores,
+                        _as_int(variables.get('os_disk_size_gb'), 128),
+                        _as_int(variables.get('data_disk_size_gb'), 0),
+                        'Premium_LRS',
+                        _as_bool(variables.get('enable_backup'), True)
+                    )
+                    vms[request.vm_name] = vm
+                    vm.monthly_cost = self._price(vm)
+                    run_rate += vm.monthly_cost
+                    if self.vm_lifetime_hours > 0:
+                        lifetime = rng.expovariate(1 / self.vm_lifetime_hours)
+                        push(heap, (now + lifetime, next(sequence), _DECOMMISSION, request.vm_name))
+                elif vm is not None:
+                    vm.busy = None
+                    variables = request.variables
+                    if request.kind == SKU_CHANGE and request.cores:
+                        release(vm.location, vm.family, vm.cores, now)
+                        vm.vm_size, vm.family, vm.cores = request.vm_size, request.family, request.cores
+                    elif request.kind == DISK_MODIFY:
+                        operation = variables.get('operation', 'add')
+                        size = _as_int(variables.get('disk_size_gb'), 256)
+                        if operation == 'add':
+                            vm.data_disk += size
+                        elif operation == 'resize':
+                            vm.data_disk = size
+                        elif operation == 'delete':
+                            vm.data_disk = 0
+                        vm.storage_type = variables.get('storage_type') or vm.storage_type
+                    run_rate -= vm.monthly_cost
+                    vm.monthly_cost = self._price(vm)
+                    run_rate += vm.monthly_cost
+                if run_rate > peak_run_rate:
+                    peak_run_rate = run_rate
+                if vm is not None and vm.retiring:
+                    retire(request.vm_name, vm, now)
+
+            elif kind == _DECOMMISSION:
+                vm = vms.get(payload)
+                if vm is None:
+                    continue
+                holder = vm.busy
+                if holder is not None and not holder.parked:
+                    # Retire it once the running change has finished
+                    vm.retiring = True
+                    continue
+                if holder is not None:
+                    waiting[holder.location].remove(holder)
+                    holder.parked = False
+                    reject(holder, 'vm_retired')
+                retire(payload, vm, now)
+
+            else:
+                accrued += run_rate * (now - accrued_at) / HOURS_PER_MONTH
+                accrued_at = now
+                daily.append({
+                    'day': int(round(now / 24)),
+                    'date': (origin + timedelta(hours=now)).date().isoformat(),
+                    'live_vms': len(vms),
+                    'run_rate_monthly': round(run_rate, 2),
+                    'cumulative_cost': round(accrued, 2),
+                    'pipeline_queue': len(pipeline_queue),
+                    'pipelines_running': running,
+                    'quota_waiting': sum(len(parked) for parked in waiting.values()),
+                    'headroom_cores': {location: snapshot.headroom.get('cores', 0) for location, snapshot in sorted(self.quotas.items())},
+                    **day_counts,
+                })
+                day_counts = dict.fromkeys(day_counts, 0)
+                if arrivals_left or in_flight and (running or pipeline_queue or any(
+                    other[2] != _SAMPLE for other in heap
+                )):
+                    push(heap, (now + 24.0, next(sequence), _SAMPLE, None))
+
+        accrued += run_rate * (now - accrued_at) / HOURS_PER_MONTH
+        elapsed = time.perf_counter() - started
+        still_waiting = sum(len(parked) for parked in waiting.values())
+        rejected = sum(rejections.values())
+
+        result = {
+            'requests': requests,
+            'by_kind': by_kind,
+            'completed': completed,
+            'rejected': rejected,
+            'still_waiting': still_waiting,
+            'rejection_rate': round(rejected / requests, 4) if requests else 0.0,
+            'rejections': rejections,
+            'approval_hours': _percentiles(approval_delays),
+            'quota_wait_hours': _percentiles(quota_delays),
+            'queue_delay_hours': _percentiles(queue_delays),
+            'lead_time_hours': _percentiles(lead_times),
+            'peak_pipeline_queue': peak_queue,
+            'pipeline_utilization': round(busy_hours / (self.pipeline_concurrency * now), 4) if now else 0.0,
+            'snow_api_calls': sum(day['snow_calls'] for day in daily),
+            'peak_snow_calls_per_day': max((day['snow_calls'] for day in daily), default=0),
+            'peak_approvals_per_day': max((day['approvals'] for day in daily), default=0),
+            'cost': {
+                'cumulative': round(accrued, 2),
+                'final_run_rate_monthly': round(run_rate, 2),
+                'peak_run_rate_monthly': round(peak_run_rate, 2),
+                'live_vms': len(vms),
+                'priced_configurations': len(self._prices),
+            },
+            'min_headroom': min_headroom,
+            'daily': daily,
+            'simulated_days': round(now / 24, 1),
+            'start': origin.isoformat(),
+            'events': events,
+            'elapsed_s': round(elapsed, 2),
+            'events_per_s': round(events / elapsed) if elapsed else 0,
+            'settings': {
+                'pipeline_concurrency': self.pipeline_concurrency,
+                'approval_hours': self.approval_hours,
+                'l2_approval_hours': self.l2_approval_hours,
+                'pipeline_minutes': self.pipeline_minutes,
+                'snow_latency_ms': self.snow_latency_hours * 3_600_000,
+                'snow_calls': self.snow_calls,
+                'vm_lifetime_days': self.vm_lifetime_hours / 24,
+                'quota_wait': self.quota_wait,
+                'seed': self.seed,
+            },
+        }
+        logger.info(f"Simulated {events} events ({requests} requests) in {elapsed:.2f}s")
+        return result
+
+
+def load_quotas(path: str, scale: float = 1.0) -> Dict[str, QuotaSnapshot]:
+    """
+    Load per-region quotas saved as {"<subscription_id>/<location>": {"usage": ...}}
+
+    This is the admission controller's snapshot format; only the region
+    part of the key is used.
+
+    Args:
+        path: JSON file path
+        scale: Multiplier applied to every limit (what-if quota increases)
+
+    Returns:
+        Quota snapshots by location
+    """
+    with open(path) as f:
+        data = json.load(f)
+    quotas = {}
+    for key, entry in data.items():
+        subscription_id, location = key.rsplit('/', 1)
+        usage = {
+            name: {'current': quota['current'], 'limit': quota['limit'] * scale}
+            for name, quota in entry['usage'].items()
+        }
+        quotas[location] = QuotaSnapshot(subscription_id, location, usage, entry.get('vm_size_cores', {}))
+    return quotas
+
+
+def _parse_pairs(value: Optional[str]) -> Dict[str, float]:
+    """Parse "name=value,name=value" settings"""
+    pairs = {}
+    for item in (value or '').split(','):
+        name, _, number = item.strip().partition('=')
+        if name and number:
+            pairs[name.strip()] = float(number)
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay VM requests through a capacity simulation')
+    parser.add_argument('--orders', help='JSON lines file with recorded requests (default: generate a stream)')
+    parser.add_argument('--catalog-dir', default=CATALOG_DIR, help='Catalog item XML directory')
+    parser.add_argument('--days', type=int, default=365, help='Days to generate (default: 365)')
+    parser.add_argument('--orders-per-day', type=float, default=20, help='Mean generated requests per day (default: 20)')
+    parser.add_argument('--mix', help='Generated request mix, e.g. "order=0.6,sku_change=0.2,disk_modify=0.15,restore=0.05"')
+    parser.add_argument('--start', help='Start date of the generated stream (default: 2025-01-01)')
+    parser.add_argument('--export-orders', help='Write the generated stream to a JSON lines file and exit')
+    parser.add_argument('--quota-file', help='Per-region quotas in the admission controller snapshot format')
+    parser.add_argument('--quota-scale', type=float, default=1.0, help='Multiply every quota limit (default: 1.0)')
+    parser.add_argument('--quota-wait', action='store_true', help='Hold requests until quota frees up instead of rejecting them')
+    parser.add_argument('--pipeline-concurrency', type=int, default=4, help='Concurrent pipeline runs (default: 4)')
+    parser.add_argument('--pipeline-minutes', help='Mean pipeline minutes per kind, e.g. "order=45,sku_change=15"')
+    parser.add_argument('--approval-hours', type=float, default=4.0, help='Mean L1 approval delay (default: 4)')
+    parser.add_argument('--l2-approval-hours', type=float, default=24.0, help='Mean extra L2 approval delay for D16/E16 sizes (default: 24)')
+    parser.add_argument('--snow-latency-ms', type=float, default=300.0, help='Mean ServiceNow API latency (default: 300)')
+    parser.add_argument('--snow-calls', type=int, default=DEFAULT_SNOW_CALLS, help=f'ServiceNow calls per pipeline run (default: {DEFAULT_SNOW_CALLS})')
+    parser.add_argument('--vm-lifetime-days', type=float, default=180.0, help='Mean VM lifetime, 0 = never deleted (default: 180)')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(args.catalog_dir)
+    if args.orders:
+        orders = read_orders(args.orders)
+        start = None
+    else:
+        start = _parse_timestamp(args.start) if args.start else None
+        orders = generate_orders(
+            catalog, args.days, args.orders_per_day,
+            _parse_pairs(args.mix) or None, start, args.seed
+        )
+
+    if args.export_orders:
+        count = 0
+        with open(args.export_orders, 'w') as f:
+            for order in orders:
+                f.write(json.dumps(order) + '\n')
+                count += 1
+        logger.info(f"Wrote {count} requests to: {args.export_orders}")
+        return 0
+
+    quotas = load_quotas(args.quota_file, args.quota_scale) if args.quota_file else None
+    if quotas is None and args.quota_scale != 1.0:
+        parser.error("--quota-scale needs --quota-file")
+
+    simulator = CapacitySimulator(
+        catalog,
+        quotas=quotas,
+        pipeline_concurrency=args.pipeline_concurrency,
+        approval_hours=args.approval_hours,
+        l2_approval_hours=args.l2_approval_hours,
+        pipeline_minutes=_parse_pairs(args.pipeline_minutes) or None,
+        snow_latency_ms=args.snow_latency_ms,
+        snow_calls=args.snow_calls,
+        vm_lifetime_days=args.vm_lifetime_days,
+        quota_wait=args.quota_wait,
+        seed=args.seed
+    )
+    result = simulator.run(orders, start)
+
+    print("\n" + "="*80)
+    print("CAPACITY SIMULATION")
+    print("="*80)
+    print(f"\nRequests: {result['requests']} over {result['simulated_days']} days "
+          f"({', '.join(f'{kind}={count}' for kind, count in sorted(result['by_kind'].items()))})")
+    print(f"Completed: {result['completed']}, rejected: {result['rejected']} "
+          f"({result['rejection_rate']:.1%}), still waiting for quota: {result['still_waiting']}")
+    for reason, count in sorted(result['rejections'].items()):
+        print(f"  {reason}: {count}")
+    print(f"\n{'Delay (hours)':<20} {'Mean':>8} {'P50':>8} {'P90':>8} {'P99':>8} {'Max':>8}")
+    for label, key in (('Approval', 'approval_hours'), ('Quota wait', 'quota_wait_hours'),
+                       ('Pipeline queue', 'queue_delay_hours'), ('Lead time', 'lead_time_hours')):
+        stats = result[key]
+        print(f"{label:<20} {stats['mean']:>8} {stats['p50']:>8} {stats['p90']:>8} {stats['p99']:>8} {stats['max']:>8}")
+    print(f"\nPipeline utilization: {result['pipeline_utilization']:.1%}, peak queue: {result['peak_pipeline_queue']}")
+    print(f"ServiceNow API calls: {result['snow_api_calls']} (peak {result['peak_snow_calls_per_day']}/day), "
+          f"peak approvals: {result['peak_approvals_per_day']}/day")
+    cost = result['cost']
+    print(f"\nCumulative cost: ${cost['cumulative']:,.2f}")
+    print(f"Run rate: ${cost['final_run_rate_monthly']:,.2f}/month at end, "
+          f"${cost['peak_run_rate_monthly']:,.2f}/month peak ({cost['live_vms']} live VMs)")
+    print(f"\n{'Date':<12} {'Live VMs':>9} {'Run rate/mo':>14} {'Cumulative':>16} {'Queue':>6}")
+    for day in result['daily'][29::30]:
+        print(f"{day['date']:<12} {day['live_vms']:>9} {day['run_rate_monthly']:>14,.2f} "
+              f"{day['cumulative_cost']:>16,.2f} {day['pipeline_queue']:>6}")
+    print(f"\nEvents: {result['events']} in {result['elapsed_s']}s ({result['events_per_s']}/s)")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Simulation results saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
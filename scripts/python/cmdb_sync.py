@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Incremental CMDB sync for VM Automation Accelerator
+Reconciles Azure VM inventory against cmdb_ci_vm_instance, sending only the
+creates and updates whose content actually changed
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CI_TABLE = 'cmdb_ci_vm_instance'
+
+# CI fields owned by the sync; only these take part in change detection
+SYNC_FIELDS = (
+    'vm_inst_id',
+    'environment',
+    'os',
+    'cpu_count',
+    'ram',
+    'disk_space',
+    'location',
+    'cost_center',
+    'owned_by',
+)
+
+
+def content_hash(record: Dict) -> str:
+    """
+    Hash the synced fields of a CI record
+
+    Values are compared as strings because the Table API returns every
+    field as a string regardless of the type that was written.
+
+    Args:
+        record: CI or inventory record
+
+    Returns:
+        Hex digest of the normalized synced fields
+    """
+    normalized = {
+        field: '' if record.get(field) is None else str(record.get(field))
+        for field in SYNC_FIELDS
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CIIndex:
+    """
+    Local SQLite index of CI content hashes and the sync watermark
+
+    Next to each hash the index keeps the sys_mod_count of the sync's own
+    last write, so a refresh can tell that write apart from edits made
+    outside the sync.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize index
+
+        Args:
+            path: SQLite database file path (':memory:' for a throwaway index)
+        """
+        import sqlite3
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ci_index ("
+            " name TEXT PRIMARY KEY,"
+            " sys_id TEXT NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " mod_count TEXT)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(ci_index)")}
+        if 'mod_count' not in columns:
+            self.conn.execute("ALTER TABLE ci_index ADD COLUMN mod_count TEXT")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def load(self) -> Dict[str, Tuple[str, str, Optional[str]]]:
+        """
+        Load the whole index
+
+        Returns:
+            Mapping of CI name to (sys_id, content_hash, mod_count), where
+            mod_count is None unless the sync wrote the CI itself
+        """
+        rows = self.conn.execute("SELECT name, sys_id, content_hash, mod_count FROM ci_index")
+        return {name: (sys_id, digest, mod_count) for name, sys_id, digest, mod_count in rows}
+
+    def upsert_many(self, entries: Iterable[Tuple[str, str, str, Optional[str]]]):
+        """
+        Insert or replace entries
+
+        Args:
+            entries: (name, sys_id, content_hash, mod_count) tuples
+        """
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO ci_index (name, sys_id, content_hash, mod_count) VALUES (?, ?, ?, ?)",
+            entries
+        )
+        self.conn.commit()
+
+    def get_watermark(self) -> Optional[str]:
+        """Get the last seen sys_updated_on, None before the first sync"""
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = 'watermark'").fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, watermark: str):
+        """Store the last seen sys_updated_on"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('watermark', ?)", (watermark,)
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+class CMDBSync:
+    """
+    Incremental reconciliation of Azure VMs against the CMDB
+
+    Each run first pulls only the CIs changed since the stored
+    sys_updated_on watermark to refresh the local hash index, then diffs
+    the inventory against the index and writes only new or changed CIs.
+    Writes go through the Batch API, with several envelopes in flight at
+    once.
+    """
+
+    # Only the sys_id and sys_mod_count of a written CI are kept, in the index
+    RESPONSE_FIELDS = ['sys_id', 'name', 'sys_mod_count']
+
+    def __init__(
+        self,
+        client,
+        index: CIIndex,
+        batch_size: int = 50,
+        concurrency: int = 4,
+        use_batch_api: bool = True
+    ):
+        """
+        Initialize sync engine
+
+        Args:
+            client: ServiceNowClient
+            index: Local CI index
+            batch_size: Operations per batch envelope (default: 50)
+            concurrency: Envelopes or requests in flight at once (default: 4)
+            use_batch_api: Send writes through the Batch API instead of one
+                request per CI (default: True)
+        """
+        self.client = client
+        self.index = index
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.use_batch_api = use_batch_api
+
+        if getattr(client, 'suppress_auto_sys_field', False):
+            logger.warning(
+                "Client suppresses sys_updated_on on writes; CIs written by this sync "
+                "will not be picked up by later index refreshes"
+            )
+
+    def refresh_index(self) -> int:
+        """
+        Pull CIs changed since the watermark into the local index
+
+        A CI whose sys_mod_count still matches the sync's own last write
+        keeps the hash of the values that were written. Reference fields
+        such as location or owned_by read back as sys_ids, so hashing the
+        read-back record would never match the inventory again. Any other
+        change comes from outside the sync and replaces the hash with one
+        of the read-back record, which the next plan sends as an update.
+
+        Returns:
+            Number of CIs refreshed
+        """
+        watermark = self.index.get_watermark()
+        query = 'vcenter_name=Azure'
+        if watermark:
+            # >= so records updated within the watermark second are not missed
+            query += f'^sys_updated_on>={watermark}'
+
+        logger.info(f"Refreshing CI index since {watermark or 'the beginning'}")
+
+        fields = ['name', 'sys_id', 'sys_updated_on', 'sys_mod_count', *SYNC_FIELDS]
+        known = self.index.load()
+        newest = watermark
+        refreshed = 0
+        entries = []
+        for record in self.client.iter_table(CI_TABLE, query=query, fields=fields, keyset=True):
+            refreshed += 1
+            updated_on = record.get('sys_updated_on')
+            if updated_on and (newest is None or updated_on > newest):
+                newest = updated_on
+
+            entry = known.get(record['name'])
+            if (entry and entry[0] == record['sys_id'] and entry[2] is not None
+                    and entry[2] == record.get('sys_mod_count')):
+                continue
+            entries.append((record['name'], record['sys_id'], content_hash(record), None))
+            if len(entries) >= 1000:
+                self.index.upsert_many(entries)
+                entries = []
+
+        self.index.upsert_many(entries)
+        if newest and newest != watermark:
+            self.index.set_watermark(newest)
+
+        return refreshed
+
+    def plan(self, inventory: Iterable[Dict]) -> Dict:
+        """
+        Diff the inventory against the local index
+
+        Args:
+            inventory: Azure VM records with 'name' and the SYNC_FIELDS
+
+        Returns:
+            Plan with 'create' and 'update' record lists, 'unchanged' count
+            and 'orphaned' CI names that are not in the inventory
+        """
+        known = self.index.load()
+        seen = set()
+        plan = {'create': [], 'update': [], 'unchanged': 0, 'orphaned': []}
+
+        for record in inventory:
+            name = record['name']
+            seen.add(name)
+            digest = content_hash(record)
+            entry = known.get(name)
+
+            if entry is None:
+                plan['create'].append((record, digest))
+            elif entry[1] != digest:
+                plan['update'].append((record, digest, entry[0]))
+            else:
+                plan['unchanged'] += 1
+
+        plan['orphaned'] = sorted(set(known) - seen)
+        return plan
+
+    def apply(self, plan: Dict) -> Dict:
+        """
+        Send the planned writes
+
+        Args:
+            plan: Output of plan()
+
+        Returns:
+            Counts of created/updated CIs and the names that failed
+        """
+        operations = []
+        for record, digest in plan['create']:
+            fields = {**self.client.VM_CI_DEFAULTS, **record}
+            operations.append(('POST', f"table/{CI_TABLE}", fields, record['name'], digest, None))
+        for record, digest, sys_id in plan['update']:
+            fields = {field: record.get(field) for field in SYNC_FIELDS if field in record}
+            operations.append(('PATCH', f"table/{CI_TABLE}/{sys_id}", fields, record['name'], digest, sys_id))
+
+        if not operations:
+            return {'created': 0, 'updated': 0, 'failed': []}
+
+        send = self._send_batch if self.use_batch_api else self._send_single
+        chunk = self.batch_size if self.use_batch_api else 1
+        chunks = [operations[start:start + chunk] for start in range(0, len(operations), chunk)]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            outcomes = [outcome for chunk_outcomes in executor.map(send, chunks) for outcome in chunk_outcomes]
+
+        summary = {'created': 0, 'updated': 0, 'failed': []}
+        entries = []
+        for (method, _, _, name, digest, sys_id), (ok, result) in zip(operations, outcomes):
+            if not ok:
+                summary['failed'].append({'name': name, 'error': result})
+                continue
+            summary['created' if method == 'POST' else 'updated'] += 1
+            entries.append((name, sys_id or result.get('sys_id', ''), digest, result.get('sys_mod_count')))
+
+        self.index.upsert_many(entries)
+        return summary
+
+    def _send_batch(self, operations: List[Tuple]) -> List[Tuple[bool, object]]:
+        """Send one chunk of operations as a batch envelope"""
+        batch = self.client.batch(max_batch_size=len(operations))
+        params = self.client._write_params(self.RESPONSE_FIELDS)
+        handles = [batch.add(method, endpoint, data=fields, params=params)
+                   for method, endpoint, fields, *_ in operations]
+        batch.flush()
+        return [(True, handle.result()) if handle.succeeded() else (False, str(handle.error))
+                for handle in handles]
+
+    def _send_single(self, operations: List[Tuple]) -> List[Tuple[bool, object]]:
+        """Send operations as individual requests"""
+        outcomes = []
+        params = self.client._write_params(self.RESPONSE_FIELDS)
+        for method, endpoint, fields, *_ in operations:
+            try:
+                response = self.client._make_request(method, endpoint, data=fields, params=params)
+                outcomes.append((True, response.get('result', {})))
+            except Exception as e:
+                outcomes.append((False, str(e)))
+        return outcomes
+
+    def run(self, inventory: Iterable[Dict], dry_run: bool = False) -> Dict:
+        """
+        Refresh the index, diff the inventory and send the changes
+
+        Args:
+            inventory: Azure VM records
+            dry_run: Plan only, do not write to the CMDB
+
+        Returns:
+            Sync report
+        """
+        refreshed = self.refresh_index()
+        plan = self.plan(inventory)
+
+        logger.info(
+            f"Sync plan: {len(plan['create'])} create, {len(plan['update'])} update, "
+            f"{plan['unchanged']} unchanged, {len(plan['orphaned'])} orphaned"
+        )
+
+        report = {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'refreshed_from_cmdb': refreshed,
+            'planned_creates': len(plan['create']),
+            'planned_updates': len(plan['update']),
+            'unchanged': plan['unchanged'],
+            'orphaned': plan['orphaned'],
+            'watermark': self.index.get_watermark(),
+            'dry_run': dry_run
+        }
+
+        if not dry_run:
+            report.update(self.apply(plan))
+
+        return report
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+    from servicenow_client import ServiceNowClient
+
+    parser = argparse.ArgumentParser(description='Incremental CMDB sync of Azure VMs')
+    parser.add_argument('--inventory', required=True, help='Azure VM inventory JSON file (list of CI records)')
+    parser.add_argument('--index', default='.cmdb_sync/index.db', help='Local CI index path')
+    parser.add_argument('--batch-size', type=int, default=50, help='Operations per batch envelope')
+    parser.add_argument('--concurrency', type=int, default=4, help='Envelopes in flight at once')
+    parser.add_argument('--no-batch-api', action='store_true', help='Send one request per CI')
+    parser.add_argument('--dry-run', action='store_true', help='Plan only, do not write')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    with open(args.inventory) as f:
+        inventory = json.load(f)
+
+    index = CIIndex(args.index)
+    try:
+        with ServiceNowClient(pool_size=args.concurrency) as client:
+            sync = CMDBSync(
+                client,
+                index,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                use_batch_api=not args.no_batch_api
+            )
+            report = sync.run(inventory, dry_run=args.dry_run)
+    finally:
+        index.close()
+
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Sync report saved to: {args.output}")
+
+    return 1 if report.get('failed') else 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -4,16 +4,12 @@ Azure Cost Calculator for VM Provisioning
 Estimates monthly costs for Azure VMs and associated resources
 """
 
+import sys
 import json
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -49,6 +45,30 @@ class CostCalculator:
         'Standard_F16s_v2': 0.792,
     }
     
+    # VM specifications (vCPUs, memory GiB)
+    VM_SPECS = {
+        'Standard_B2s': (2, 4),
+        'Standard_B2ms': (2, 8),
+        'Standard_B4ms': (4, 16),
+        
+        'Standard_D2s_v3': (2, 8),
+        'Standard_D4s_v3': (4, 16),
+        'Standard_D8s_v3': (8, 32),
+        'Standard_D16s_v3': (16, 64),
+        'Standard_D32s_v3': (32, 128),
+        
+        'Standard_E2s_v3': (2, 16),
+        'Standard_E4s_v3': (4, 32),
+        'Standard_E8s_v3': (8, 64),
+        'Standard_E16s_v3': (16, 128),
+        'Standard_E32s_v3': (32, 256),
+        
+        'Standard_F2s_v2': (2, 4),
+        'Standard_F4s_v2': (4, 8),
+        'Standard_F8s_v2': (8, 16),
+        'Standard_F16s_v2': (16, 32),
+    }
+    
     # Storage pricing (per GB per month)
     STORAGE_PRICING = {
         'Standard_LRS': 0.05,
@@ -71,8 +91,15 @@ class CostCalculator:
         'outbound_data_gb': 0.087,    # Per GB (first 5GB free)
     }
     
-    def __init__(self):
-        """Initialize cost calculator"""
+    def __init__(self, policy_evaluator=None):
+        """
+        Initialize cost calculator
+        
+        Args:
+            policy_evaluator: Optional PolicyEvaluator; VM sizes it rejects
+                are left out of comparisons
+        """
+        self.policy_evaluator = policy_evaluator
         logger.info("Initialized cost calculator")
     
     def calculate_vm_cost(
@@ -210,7 +237,7 @@ class CostCalculator:
         Returns:
             Complete cost breakdown
         """
-        logger.info(f"Calculating total cost for {vm_size}")
+        logger.info("Calculating total cost for %s", vm_size)
         
         # VM compute cost
         vm_cost = self.calculate_vm_cost(vm_size, hours_per_month)
@@ -270,7 +297,7 @@ class CostCalculator:
             'region': 'West Europe'
         }
         
-        logger.info(f"Total monthly cost: ${total_monthly_cost:.2f}")
+        logger.info("Total monthly cost: $%.2f", total_monthly_cost)
         
         return breakdown
     
@@ -282,6 +309,9 @@ class CostCalculator:
         """
         Compare costs for multiple VM sizes
         
+        Sizes not allowed by the governance policies are dropped before any
+        cost is calculated when a policy evaluator is configured.
+        
         Args:
             vm_sizes: List of VM sizes to compare
             **config: Configuration parameters
@@ -291,6 +321,9 @@ class CostCalculator:
         """
         comparisons = []
         
+        if self.policy_evaluator:
+            vm_sizes = self.policy_evaluator.filter_vm_sizes(vm_sizes)
+        
         for vm_size in vm_sizes:
             cost = self.calculate_total_cost(vm_size, **config)
             comparisons.append(cost)
@@ -318,7 +351,7 @@ class CostCalculator:
         logger.info(f"Cost report exported to: {output_file}")
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """CLI interface"""
     import argparse
     
@@ -330,11 +363,22 @@ def main():
     parser.add_argument('--backup', action='store_true', help='Enable backup')
     parser.add_argument('--public-ip', action='store_true', help='Include public IP')
     parser.add_argument('--hours', type=int, default=730, help='Hours per month')
+    parser.add_argument('--enforce-policies', action='store_true', help='Reject VM sizes not allowed by governance policies')
     parser.add_argument('--output', help='Output file path')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    
+    policy_evaluator = None
+    if args.enforce_policies:
+        from policy_evaluator import PolicyEvaluator
+        policy_evaluator = PolicyEvaluator()
+        violations = policy_evaluator.sku_violations(args.vm_size)
+        if violations:
+            for violation in violations:
+                logger.error(f"{args.vm_size} violates policy: {violation['display_name']} ({violation['effect']})")
+            sys.exit(1)
     
-    calculator = CostCalculator()
+    calculator = CostCalculator(policy_evaluator)
     
     cost_data = calculator.calculate_total_cost(
         vm_size=args.vm_size,
@@ -374,4 +418,6 @@ def main():
 
 
 if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
     main()
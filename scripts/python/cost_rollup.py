@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Streaming Cost Rollups for VM Automation Accelerator
+Prices a VM inventory in one pass and keeps hierarchical running totals
+(cost center -> environment -> SKU by default) that can be saved per shard
+and merged
+"""
+
+import sys
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cost_calculator import CostCalculator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEVELS = ('cost_center', 'environment', 'vm_size')
+
+# Tag names used when a record has no top-level field for a level
+LEVEL_TAGS = {
+    'cost_center': 'CostCenter',
+    'environment': 'Environment',
+    'owned_by': 'Owner',
+    'application': 'Application',
+}
+
+# Groups beyond the per-node limit are folded into this bucket
+OTHER = '(other)'
+UNSET = '(unset)'
+
+# calculate_total_cost options read from inventory records
+PRICING_FIELDS = (
+    'os_disk_size_gb', 'data_disk_size_gb', 'storage_type', 'enable_backup',
+    'public_ip', 'outbound_data_gb', 'hours_per_month'
+)
+
+COMPONENTS = ('compute', 'os_disk', 'data_disk', 'backup', 'network')
+
+
+class RollupNode:
+    """Running totals for one group and its sub-groups"""
+
+    __slots__ = ('count', 'monthly_cost', 'components', 'children')
+
+    def __init__(self):
+        self.count = 0
+        self.monthly_cost = 0.0
+        self.components = dict.fromkeys(COMPONENTS, 0.0)
+        self.children: Dict[str, 'RollupNode'] = {}
+
+    def add(self, monthly_cost: float, components: Dict[str, float], count: int = 1):
+        self.count += count
+        self.monthly_cost += monthly_cost
+        for name, value in components.items():
+            self.components[name] = self.components.get(name, 0.0) + value
+
+    def merge(self, other: 'RollupNode', max_groups: int):
+        """Add another node's totals and children into this one"""
+        self.add(other.monthly_cost, other.components, other.count)
+        for key, child in other.children.items():
+            if key not in self.children and len(self.children) >= max_groups:
+                key = OTHER
+            self.children.setdefault(key, RollupNode()).merge(child, max_groups)
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'monthly_cost': round(self.monthly_cost, 6),
+            'components': {name: round(value, 6) for name, value in self.components.items()},
+            'children': {
+                key: child.to_dict()
+                for key, child in sorted(self.children.items(), key=lambda item: -item[1].monthly_cost)
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RollupNode':
+        node = cls()
+        node.count = data['count']
+        node.monthly_cost = data['monthly_cost']
+        node.components.update(data.get('components', {}))
+        node.children = {key: cls.from_dict(child) for key, child in data.get('children', {}).items()}
+        return node
+
+
+class CostRollup:
+    """
+    One-pass hierarchical cost aggregation
+
+    Memory grows with the number of distinct groups, not with the number
+    of VMs: each node keeps at most ``max_groups`` children and folds the
+    rest into an '(other)' bucket. Identical VM configurations are priced
+    once. Rollups over the same levels merge by adding totals, so shards
+    can be priced separately and combined.
+    """
+
+    def __init__(
+        self,
+        levels: Tuple[str, ...] = DEFAULT_LEVELS,
+        calculator: Optional[CostCalculator] = None,
+        max_groups: int = 10000,
+        price_cache_size: int = 4096
+    ):
+        """
+        Initialize rollup
+
+        Args:
+            levels: Record fields to group by, outermost first
+                (default: cost_center, environment, vm_size)
+            calculator: CostCalculator used for pricing
+            max_groups: Maximum children kept per node (default: 10000)
+            price_cache_size: Distinct VM configurations priced and cached (default: 4096)
+        """
+        self.levels = tuple(levels)
+        self.calculator = calculator or CostCalculator()
+        self.max_groups = max_groups
+        self.price_cache_size = price_cache_size
+        self.root = RollupNode()
+        self.errors = 0
+        self._prices: Dict[Tuple, Tuple[float, Dict[str, float]]] = {}
+
+    def _group_key(self, record: Dict, level: str) -> str:
+        value = record.get(level)
+        if value in (None, ''):
+            tag = LEVEL_TAGS.get(level)
+            value = (record.get('tags') or {}).get(tag) if tag else None
+        if isinstance(value, dict):
+            # CMDB reference fields ({'link', 'value'})
+            value = value.get('value')
+        return str(value) if value not in (None, '') else UNSET
+
+    def price(self, record: Dict) -> Tuple[float, Dict[str, float]]:
+        """
+        Price one VM record (memoized per configuration)
+
+        Args:
+            record: Inventory record with vm_size and optional pricing fields
+
+        Returns:
+            (total monthly cost, cost per component)
+        """
+        options = tuple((field, record[field]) for field in PRICING_FIELDS if record.get(field) is not None)
+        key = (record['vm_size'], options)
+        price = self._prices.get(key)
+        if price is None:
+            estimate = self.calculator.calculate_total_cost(record['vm_size'], **dict(options))
+            price = (estimate['total_monthly_cost'], estimate['cost_breakdown'])
+            if len(self._prices) < self.price_cache_size:
+                self._prices[key] = price
+        return price
+
+    def add(self, record: Dict):
+        """
+        Price a record and add it to every level of its group path
+
+        Args:
+            record: Inventory record
+        """
+        monthly_cost, components = self.price(record)
+        node = self.root
+        node.add(monthly_cost, components)
+        for level in self.levels:
+            key = self._group_key(record, level)
+            child = node.children.get(key)
+            if child is None:
+                if len(node.children) >= self.max_groups:
+                    key = OTHER
+                child = node.children.setdefault(key, RollupNode())
+            child.add(monthly_cost, components)
+            node = child
+
+    def add_many(self, records: Iterable[Dict]) -> int:
+        """
+        Stream records into the rollup
+
+        Records that cannot be priced are counted in ``errors`` and skipped.
+
+        Args:
+            records: Inventory records
+
+        Returns:
+            Number of records added
+        """
+        added = 0
+        for record in records:
+            try:
+                self.add(record)
+                added += 1
+            except (KeyError, TypeError, ValueError) as e:
+                self.errors += 1
+                logger.warning(f"Skipping record {record.get('name', '?')}: {e}")
+        return added
+
+    def merge(self, other: 'CostRollup') -> 'CostRollup':
+        """
+        Merge another rollup (e.g., from another shard) into this one
+
+        Args:
+            other: Rollup over the same levels
+
+        Returns:
+            This rollup
+        """
+        if other.levels != self.levels:
+            raise ValueError(f"Cannot merge rollups over {other.levels} into {self.levels}")
+        self.root.merge(other.root, self.max_groups)
+        self.errors += other.errors
+        return self
+
+    def to_dict(self) -> Dict:
+        """Serializable rollup (saved shards are merged with from_dict)"""
+        return {'levels': list(self.levels), 'errors': self.errors, 'rollup': self.root.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict, **kwargs) -> 'CostRollup':
+        """
+        Restore a rollup saved with to_dict()
+
+        Args:
+            data: Saved rollup
+            **kwargs: CostRollup options
+
+        Returns:
+            Rollup
+        """
+        rollup = cls(levels=tuple(data['levels']), **kwargs)
+        rollup.root = RollupNode.from_dict(data['rollup'])
+        rollup.errors = data.get('errors', 0)
+        return rollup
+
+    def rows(self, depth: Optional[int] = None) -> Iterator[Tuple[Tuple[str, ...], RollupNode]]:
+        """
+        Walk the rollup depth-first, most expensive groups first
+
+        Args:
+            depth: Maximum depth (default: all levels)
+
+        Yields:
+            (group path, node)
+        """
+        depth = len(self.levels) if depth is None else depth
+
+        def walk(node: RollupNode, path: Tuple[str, ...]):
+            yield path, node
+            if len(path) < depth:
+                for key, child in sorted(node.children.items(), key=lambda item: -item[1].monthly_cost):
+                    yield from walk(child, path + (key,))
+
+        yield from walk(self.root, ())
+
+
+def read_inventory(path: str) -> Iterator[Dict]:
+    """
+    Stream inventory records from a JSON lines file ('-' for stdin)
+
+    Args:
+        path: File path
+
+    Yields:
+        Records
+    """
+    stream = sys.stdin if path == '-' else open(path)
+    try:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Hierarchical VM cost rollup')
+    parser.add_argument('inventory', nargs='*', help='JSON lines inventory files (- for stdin)')
+    parser.add_argument('--levels', default=','.join(DEFAULT_LEVELS), help='Comma-separated group-by fields')
+    parser.add_argument('--merge', nargs='+', default=[], help='Saved rollups to merge in')
+    parser.add_argument('--depth', type=int, help='Levels to print (default: all)')
+    parser.add_argument('--max-groups', type=int, default=10000, help='Children kept per group')
+    parser.add_argument('--output', help='Save the rollup (for later --merge)')
+
+    args = parser.parse_args(argv)
+
+    if not args.inventory and not args.merge:
+        parser.error('Provide inventory files and/or --merge rollups')
+
+    # Pricing logs every distinct configuration at INFO; keep the report readable
+    logging.getLogger('cost_calculator').setLevel(logging.WARNING)
+
+    rollup = CostRollup(levels=tuple(args.levels.split(',')), max_groups=args.max_groups)
+    for path in args.inventory:
+        added = rollup.add_many(read_inventory(path))
+        logger.info(f"Priced {added} VMs from {path}")
+    for path in args.merge:
+        with open(path) as f:
+            rollup.merge(CostRollup.from_dict(json.load(f), max_groups=args.max_groups))
+        logger.info(f"Merged rollup from {path}")
+
+    print("\n" + "="*80)
+    print("VM COST ROLLUP (Monthly, USD)")
+    print("="*80)
+    print(f"\nGroup by: {' -> '.join(rollup.levels)}")
+    print(f"\n{'Group':<50} {'VMs':>8} {'Monthly':>14}")
+    for path, node in rollup.rows(args.depth):
+        label = '  ' * (len(path) - 1) + path[-1] if path else 'TOTAL'
+        print(f"{label[:50]:<50} {node.count:>8} {node.monthly_cost:>14,.2f}")
+    if rollup.errors:
+        print(f"\nSkipped records: {rollup.errors}")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(rollup.to_dict(), f, indent=2)
+        logger.info(f"Rollup saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
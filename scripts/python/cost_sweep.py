@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Scenario Sweep Engine for VM Automation Accelerator
+Prices every combination of a declarative scenario grid (VM size, storage
+type, disk sizes, hours, backup, outbound data, region) across a process
+pool and streams back per-group totals and the cost vs. vCPU/memory Pareto
+front without materializing the grid
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from cost_calculator import CostCalculator
+
+logger = logging.getLogger(__name__)
+
+# Grid axes in index order (the last axis varies fastest)
+AXES = (
+    'vm_size', 'region', 'storage_type', 'os_disk_size_gb', 'data_disk_size_gb',
+    'hours_per_month', 'enable_backup', 'public_ip', 'outbound_data_gb'
+)
+
+# Mirrors CostCalculator.calculate_network_cost
+FREE_OUTBOUND_GB = 5
+
+DEFAULT_GRID = {
+    'vm_size': sorted(CostCalculator.VM_PRICING),
+    # Region -> price multiplier relative to the West Europe price tables
+    'region': {'westeurope': 1.0},
+    'storage_type': sorted(CostCalculator.STORAGE_PRICING),
+    'os_disk_size_gb': [64, 128, 256],
+    'data_disk_size_gb': [0, 128, 256, 512, 1024, 2048],
+    'hours_per_month': [160, 360, 730],
+    'enable_backup': [False, True],
+    'public_ip': [False, True],
+    'outbound_data_gb': [10, 100, 500],
+}
+
+# Pricing tables as laid out in shared memory; set in each worker by _attach()
+_tables: Dict[str, np.ndarray] = {}
+_shm: Optional[shared_memory.SharedMemory] = None
+
+
+class ScenarioGrid:
+    """
+    Declarative scenario grid
+
+    Each axis is a list of values; 'region' may also be a mapping of region
+    to price multiplier. Cells are addressed by a flat index, so any index
+    range can be priced without building the other cells.
+    """
+
+    def __init__(self, spec: Optional[Dict] = None, calculator: Optional[CostCalculator] = None):
+        """
+        Initialize grid
+
+        Args:
+            spec: Axis values, keyed by AXES names (missing axes use DEFAULT_GRID)
+            calculator: CostCalculator whose price tables are used
+        """
+        spec = {**DEFAULT_GRID, **(spec or {})}
+        unknown = sorted(set(spec) - set(AXES))
+        if unknown:
+            raise ValueError(f"Unknown grid axes: {', '.join(unknown)}")
+
+        self.calculator = calculator or CostCalculator()
+        regions = spec['region']
+        if not isinstance(regions, dict):
+            regions = {region: 1.0 for region in regions}
+        self.region_multipliers = regions
+        self.axes = {axis: list(regions) if axis == 'region' else list(spec[axis]) for axis in AXES}
+        empty = [axis for axis, values in self.axes.items() if not values]
+        if empty:
+            raise ValueError(f"Empty grid axes: {', '.join(empty)}")
+        self.shape = tuple(len(self.axes[axis]) for axis in AXES)
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+    def tables(self) -> Dict[str, np.ndarray]:
+        """
+        Numeric lookup tables indexed by axis position
+
+        Returns:
+            float64 arrays: per-size rate, vCPUs and memory, per-region
+            multiplier, per-storage-type price and the numeric axis values
+        """
+        calc = self.calculator
+        sizes = self.axes['vm_size']
+        missing = [size for size in sizes if size not in calc.VM_SPECS]
+        if missing:
+            raise ValueError(f"No vCPU/memory spec for: {', '.join(missing)}")
+        return {
+            'vm_rate': np.array([calc.VM_PRICING.get(size, 0.10) for size in sizes]),
+            'vcpus': np.array([calc.VM_SPECS[size][0] for size in sizes], dtype=np.float64),
+            'memory_gb': np.array([calc.VM_SPECS[size][1] for size in sizes], dtype=np.float64),
+            'region_multiplier': np.array([self.region_multipliers[region] for region in self.axes['region']]),
+            'storage_price': np.array([calc.STORAGE_PRICING.get(kind, 0.15) for kind in self.axes['storage_type']]),
+            'os_disk_size_gb': np.array(self.axes['os_disk_size_gb'], dtype=np.float64),
+            'data_disk_size_gb': np.array(self.axes['data_disk_size_gb'], dtype=np.float64),
+            'hours_per_month': np.array(self.axes['hours_per_month'], dtype=np.float64),
+            'enable_backup': np.array(self.axes['enable_backup'], dtype=np.float64),
+            'public_ip': np.array(self.axes['public_ip'], dtype=np.float64),
+            'outbound_data_gb': np.array(self.axes['outbound_data_gb'], dtype=np.float64),
+            'constants': np.array([
+                calc.BACKUP_PRICING['protected_instance'],
+                calc.BACKUP_PRICING['storage_per_gb'],
+                calc.NETWORK_PRICING['public_ip'],
+                calc.NETWORK_PRICING['outbound_data_gb'],
+            ]),
+        }
+
+    def cell(self, index: int) -> Dict:
+        """Axis values of one cell"""
+        coords = np.unravel_index(index, self.shape)
+        return {axis: self.axes[axis][int(position)] for axis, position in zip(AXES, coords)}
+
+
+# =============================================================================
+# SHARED MEMORY
+# =============================================================================
+
+def _share(tables: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Dict[str, Tuple[int, int]]]:
+    """Copy tables into one shared memory block; returns (block, name -> (offset, length))"""
+    layout = {}
+    offset = 0
+    for name, values in tables.items():
+        layout[name] = (offset, len(values))
+        offset += len(values)
+    block = shared_memory.SharedMemory(create=True, size=max(1, offset) * 8)
+    buffer = np.ndarray((offset,), dtype=np.float64, buffer=block.buf)
+    for name, values in tables.items():
+        start, length = layout[name]
+        buffer[start:start + length] = values
+    return block, layout
+
+
+def _attach(name: str, layout: Dict[str, Tuple[int, int]], shape: Tuple[int, ...], group_axes: Tuple[int, ...]):
+    """Pool initializer: map the shared tables without copying them"""
+    global _shm
+    # Track=False: the parent owns (and unlinks) the block
+    try:
+        _shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        _shm = shared_memory.SharedMemory(name=name)
+    total = sum(length for _, length in layout.values())
+    buffer = np.ndarray((total,), dtype=np.float64, buffer=_shm.buf)
+    _tables.clear()
+    _tables.update({key: buffer[start:start + length] for key, (start, length) in layout.items()})
+    _tables['_shape'] = shape
+    _tables['_group_axes'] = group_axes
+
+
+# =============================================================================
+# PRICING
+# =============================================================================
+
+def price_cells(tables: Dict[str, np.ndarray], coords: Tuple[np.ndarray, ...]) -> np.ndarray:
+    """
+    Monthly cost of grid cells, mirroring CostCalculator.calculate_total_cost
+
+    Args:
+        tables: ScenarioGrid.tables() (or their shared-memory views)
+        coords: Per-axis position arrays, in AXES order
+
+    Returns:
+        float64 monthly cost per cell (scaled by the region multiplier)
+    """
+    size, region, storage, os_disk, data_disk, hours, backup, public_ip, outbound = coords
+    protected_instance, backup_per_gb, ip_price, outbound_price = tables['constants']
+
+    disk_gb = tables['os_disk_size_gb'][os_disk] + tables['data_disk_size_gb'][data_disk]
+    cost = tables['vm_rate'][size] * tables['hours_per_month'][hours]
+    cost += disk_gb * tables['storage_price'][storage]
+    cost += tables['enable_backup'][backup] * (protected_instance + disk_gb * backup_per_gb)
+    cost += tables['public_ip'][public_ip] * ip_price
+    cost += np.maximum(tables['outbound_data_gb'][outbound] - FREE_OUTBOUND_GB, 0) * outbound_price
+    cost *= tables['region_multiplier'][region]
+    return cost
+
+
+def _detach():
+    global _shm
+    _tables.clear()
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+
+def _sweep_block(block: Tuple[int, int]) -> Dict:
+    """
+    Price one index range and reduce it
+
+    Returns:
+        {'groups': (count, sum, min, max) arrays per group, 'cheapest':
+        (cost, cell index) of the cheapest cell per VM size}
+    """
+    start, stop = block
+    shape, group_axes = _tables['_shape'], _tables['_group_axes']
+    indexes = np.arange(start, stop, dtype=np.int64)
+    coords = np.unravel_index(indexes, shape)
+    cost = price_cells(_tables, coords)
+
+    group_shape = tuple(shape[axis] for axis in group_axes)
+    groups = np.ravel_multi_index(tuple(coords[axis] for axis in group_axes), group_shape) if group_axes else 0
+    size = int(np.prod(group_shape, dtype=np.int64))
+    if group_axes:
+        count = np.bincount(groups, minlength=size)
+        total = np.bincount(groups, weights=cost, minlength=size)
+        low = np.full(size, np.inf)
+        high = np.full(size, -np.inf)
+        np.minimum.at(low, groups, cost)
+        np.maximum.at(high, groups, cost)
+    else:
+        count = np.array([len(cost)])
+        total = np.array([cost.sum()])
+        low, high = np.array([cost.min()]), np.array([cost.max()])
+
+    # Cheapest cell per VM size: the only Pareto candidates for cost vs. vCPU/memory
+    sizes = coords[0]
+    cheapest_cost = np.full(shape[0], np.inf)
+    np.minimum.at(cheapest_cost, sizes, cost)
+    present = np.isfinite(cheapest_cost)
+    cheapest_index = np.full(shape[0], -1, dtype=np.int64)
+    is_min = cost == cheapest_cost[sizes]
+    # Reversed so the lowest index wins among equal-cost cells (deterministic ties)
+    cheapest_index[sizes[is_min][::-1]] = indexes[is_min][::-1]
+
+    return {
+        'groups': (count, total, low, high),
+        'cheapest': (np.where(present, cheapest_cost, np.inf), cheapest_index)
+    }
+
+
+def pareto_front(points: List[Dict]) -> List[Dict]:
+    """
+    Points not dominated on (lower monthly_cost, more vcpus, more memory_gb)
+
+    Args:
+        points: Dicts with monthly_cost, vcpus and memory_gb
+
+    Returns:
+        Non-dominated points sorted by cost
+    """
+    front = []
+    for point in sorted(points, key=lambda p: (p['monthly_cost'], -p['vcpus'], -p['memory_gb'])):
+        dominated = any(
+            other['vcpus'] >= point['vcpus'] and other['memory_gb'] >= point['memory_gb']
+            for other in front
+        )
+        if not dominated:
+            front.append(point)
+    return front
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class CostSweep:
+    """
+    Parallel grid sweep with shared-memory price tables
+
+    The pricing tables are written once to a shared memory block that every
+    worker maps read-only, so nothing but (start, stop) ranges goes to the
+    workers and only per-group reductions come back. Blocks are priced with
+    vectorized numpy and merged as they complete, so memory stays bounded
+    by the block size regardless of grid size.
+    """
+
+    def __init__(
+        self,
+        grid: ScenarioGrid,
+        group_by: Tuple[str, ...] = ('vm_size', 'region'),
+        workers: Optional[int] = None,
+        block_size: int = 1000000
+    ):
+        """
+        Initialize sweep
+
+        Args:
+            grid: Scenario grid
+            group_by: Axes to total by (default: vm_size, region)
+            workers: Worker processes (default: CPU count; 1 runs in-process)
+            block_size: Cells priced per task (default: 1,000,000)
+        """
+        unknown = [axis for axis in group_by if axis not in AXES]
+        if unknown:
+            raise ValueError(f"Unknown group-by axes: {', '.join(unknown)}")
+        self.grid = grid
+        self.group_by = tuple(group_by)
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+
+    def _blocks(self) -> Iterator[Tuple[int, int]]:
+        for start in range(0, self.grid.size, self.block_size):
+            yield start, min(start + self.block_size, self.grid.size)
+
+    def _results(self, block, layout) -> Iterator[Dict]:
+        group_axes = tuple(AXES.index(axis) for axis in self.group_by)
+        initargs = (block.name, layout, self.grid.shape, group_axes)
+        if self.workers == 1:
+            _attach(*initargs)
+            yield from map(_sweep_block, self._blocks())
+            return
+        with Pool(self.workers, initializer=_attach, initargs=initargs) as pool:
+            yield from pool.imap_unordered(_sweep_block, self._blocks())
+
+    def run(self) -> Dict:
+        """
+        Sweep the whole grid
+
+        Returns:
+            Cell count, timings, per-group totals (count, mean, min, max) and
+            the Pareto front with the cheapest configuration for each point
+        """
+        grid = self.grid
+        tables = grid.tables()
+        logger.info(f"Sweeping {grid.size:,} scenarios on {self.workers} workers")
+        started = time.perf_counter()
+
+        group_shape = tuple(len(grid.axes[axis]) for axis in self.group_by)
+        group_count = int(np.prod(group_shape, dtype=np.int64))
+        count = np.zeros(group_count, dtype=np.int64)
+        total = np.zeros(group_count)
+        low = np.full(group_count, np.inf)
+        high = np.full(group_count, -np.inf)
+        cheapest_cost = np.full(grid.shape[0], np.inf)
+        cheapest_index = np.full(grid.shape[0], -1, dtype=np.int64)
+
+        block, layout = _share(tables)
+        try:
+            for result in self._results(block, layout):
+                block_count, block_total, block_low, block_high = result['groups']
+                count += block_count
+                total += block_total
+                np.minimum(low, block_low, out=low)
+                np.maximum(high, block_high, out=high)
+                costs, indexes = result['cheapest']
+                better = (costs < cheapest_cost) | (
+                    (costs == cheapest_cost) & (indexes >= 0) & (indexes < cheapest_index)
+                )
+                cheapest_cost[better] = costs[better]
+                cheapest_index[better] = indexes[better]
+        finally:
+            _detach()
+            block.close()
+            block.unlink()
+
+        elapsed = time.perf_counter() - started
+
+        groups = []
+        for flat in np.flatnonzero(count):
+            key = np.unravel_index(flat, group_shape)
+            groups.append({
+                **{axis: grid.axes[axis][int(position)] for axis, position in zip(self.group_by, key)},
+                'scenarios': int(count[flat]),
+                'mean_monthly_cost': round(float(total[flat] / count[flat]), 2),
+                'min_monthly_cost': round(float(low[flat]), 2),
+                'max_monthly_cost': round(float(high[flat]), 2),
+            })
+
+        candidates = [
+            {
+                'vm_size': grid.axes['vm_size'][position],
+                'vcpus': int(tables['vcpus'][position]),
+                'memory_gb': float(tables['memory_gb'][position]),
+                'monthly_cost': round(float(cheapest_cost[position]), 2),
+                'configuration': grid.cell(int(cheapest_index[position])),
+            }
+            for position in np.flatnonzero(cheapest_index >= 0)
+        ]
+
+        logger.info(f"Swept {grid.size:,} scenarios in {elapsed:.2f}s")
+        return {
+            'scenarios': grid.size,
+            'workers': self.workers,
+            'elapsed_s': round(elapsed, 3),
+            'scenarios_per_s': round(grid.size / elapsed) if elapsed else None,
+            'group_by': list(self.group_by),
+            'groups': groups,
+            'pareto_front': pareto_front(candidates)
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Sweep VM cost scenarios across a process pool')
+    parser.add_argument('--grid', help='JSON file with axis values (missing axes use the default grid)')
+    parser.add_argument('--group-by', default='vm_size,region', help='Comma-separated axes to total by')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--block-size', type=int, default=1000000, help='Scenarios priced per task')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    spec = None
+    if args.grid:
+        with open(args.grid) as f:
+            spec = json.load(f)
+
+    grid = ScenarioGrid(spec)
+    sweep = CostSweep(
+        grid,
+        group_by=tuple(axis for axis in args.group_by.split(',') if axis),
+        workers=args.workers,
+        block_size=args.block_size
+    )
+    result = sweep.run()
+
+    print("\n" + "="*80)
+    print("VM COST SCENARIO SWEEP (Monthly, USD)")
+    print("="*80)
+    print(f"\nScenarios: {result['scenarios']:,} on {result['workers']} workers in {result['elapsed_s']}s "
+          f"({result['scenarios_per_s']:,}/s)")
+    print(f"\n{'Group':<40} {'Scenarios':>10} {'Min':>10} {'Mean':>10} {'Max':>10}")
+    for group in sorted(result['groups'], key=lambda g: g['mean_monthly_cost']):
+        label = ' / '.join(str(group[axis]) for axis in result['group_by']) or 'all'
+        print(f"{label[:40]:<40} {group['scenarios']:>10,} {group['min_monthly_cost']:>10,.2f} "
+              f"{group['mean_monthly_cost']:>10,.2f} {group['max_monthly_cost']:>10,.2f}")
+    print("\nPareto front (cost vs. vCPU/memory):")
+    for point in result['pareto_front']:
+        print(f"  {point['vm_size']:<18} {point['vcpus']:>3} vCPU {point['memory_gb']:>6g} GiB  "
+              f"${point['monthly_cost']:,.2f}")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=str)
+        logger.info(f"Sweep results saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Cost Uncertainty for VM Automation Accelerator
+Samples outbound data, running hours and backup growth for a whole fleet
+with vectorized numpy operations and reports P50/P90/P99 monthly cost per
+VM and for the fleet, in bounded memory
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cost_calculator import CostCalculator
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Mirrors CostCalculator.calculate_network_cost
+FREE_OUTBOUND_GB = 5
+MAX_HOURS_PER_MONTH = 744
+
+# Multipliers applied to each VM's point estimate
+DEFAULT_DISTRIBUTIONS = {
+    'outbound_data_gb': {'dist': 'lognormal', 'mean': 0.0, 'sigma': 0.6},
+    'hours_per_month': {'dist': 'fixed', 'value': 1.0},
+    'backup_growth': {'dist': 'triangular', 'low': 1.0, 'mode': 1.2, 'high': 2.0},
+}
+
+
+class Distribution:
+    """
+    Multiplier distribution applied to a VM's point estimate
+
+    Supported specs:
+        {'dist': 'fixed', 'value': v}
+        {'dist': 'uniform', 'low': a, 'high': b}
+        {'dist': 'triangular', 'low': a, 'mode': m, 'high': b}
+        {'dist': 'normal', 'mean': mu, 'std': s}      (clipped at 0)
+        {'dist': 'lognormal', 'mean': mu, 'sigma': s} (of the underlying normal)
+    """
+
+    KINDS = {
+        'fixed': ('value',),
+        'uniform': ('low', 'high'),
+        'triangular': ('low', 'mode', 'high'),
+        'normal': ('mean', 'std'),
+        'lognormal': ('mean', 'sigma'),
+    }
+
+    def __init__(self, spec: Dict):
+        """
+        Initialize distribution
+
+        Args:
+            spec: Distribution spec (see class docstring)
+        """
+        kind = spec.get('dist')
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution '{kind}', expected one of {sorted(self.KINDS)}")
+        missing = [name for name in self.KINDS[kind] if name not in spec]
+        if missing:
+            raise ValueError(f"{kind} distribution needs {', '.join(missing)}")
+        self.kind = kind
+        self.params = {name: float(spec[name]) for name in self.KINDS[kind]}
+
+    def sample(self, rng: np.random.Generator, shape: tuple):
+        """
+        Draw float32 multipliers
+
+        Returns:
+            Array of the given shape, or a scalar for fixed distributions
+            (it broadcasts the same way)
+        """
+        p = self.params
+        if self.kind == 'fixed':
+            return np.float32(p['value'])
+        if self.kind == 'triangular':
+            return rng.triangular(p['low'], p['mode'], p['high'], shape).astype(np.float32)
+        if self.kind == 'uniform':
+            values = rng.random(shape, dtype=np.float32)
+            values *= p['high'] - p['low']
+            values += p['low']
+            return values
+        # float32 normals in place: no float64 temporaries
+        values = rng.standard_normal(shape, dtype=np.float32)
+        values *= p['std'] if self.kind == 'normal' else p['sigma']
+        values += p['mean']
+        if self.kind == 'normal':
+            return np.maximum(values, 0.0, out=values)
+        return np.exp(values, out=values)
+
+
+class MonteCarloCostModel:
+    """
+    Vectorized Monte Carlo monthly cost model for a VM fleet
+
+    Per-VM quantiles depend only on a VM's configuration, so they are
+    sampled once per distinct configuration. The fleet total draws
+    independent samples for every VM: VMs are processed in chunks sized
+    so one (VMs x samples) float32 array stays under ``max_chunk_bytes``,
+    each chunk is reduced to a per-sample sum, and chunks run on a thread
+    pool (numpy releases the GIL while sampling and in array arithmetic).
+    Every chunk draws from its own seed sequence, so results are
+    reproducible for a seed regardless of the number of workers.
+    """
+
+    def __init__(
+        self,
+        samples: int = 10000,
+        distributions: Optional[Dict[str, Dict]] = None,
+        calculator: Optional[CostCalculator] = None,
+        seed: Optional[int] = None,
+        max_chunk_bytes: int = 64 * 1024 * 1024,
+        workers: Optional[int] = None
+    ):
+        """
+        Initialize model
+
+        Args:
+            samples: Samples per VM (default: 10000)
+            distributions: Multiplier specs for outbound_data_gb,
+                hours_per_month and backup_growth (missing ones use
+                DEFAULT_DISTRIBUTIONS)
+            calculator: CostCalculator whose price tables are used
+            seed: Random seed for reproducible runs
+            max_chunk_bytes: Size limit of one chunk array (default: 64 MiB)
+            workers: Chunks simulated concurrently (default: CPU count)
+        """
+        self.samples = samples
+        specs = {**DEFAULT_DISTRIBUTIONS, **(distributions or {})}
+        self.distributions = {name: Distribution(spec) for name, spec in specs.items()}
+        self.calculator = calculator or CostCalculator()
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.chunk_size = max(1, max_chunk_bytes // (samples * np.dtype(np.float32).itemsize))
+        self.workers = workers or os.cpu_count() or 1
+        self.fleet_totals = np.zeros(samples, dtype=np.float64)
+        self.vm_count = 0
+        self._config_rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        self._config_stats: Dict[tuple, Dict] = {}
+
+    def _config(self, record: Dict) -> tuple:
+        """
+        Point estimates and deterministic cost of one VM
+
+        Returns:
+            (hourly_rate, hours, fixed_cost, backup_enabled, backup_gb, outbound_gb)
+        """
+        calc = self.calculator
+        disk_gb = record.get('os_disk_size_gb', 128) + record.get('data_disk_size_gb', 0)
+        storage_price = calc.STORAGE_PRICING.get(record.get('storage_type', 'Premium_LRS'), 0.15)
+        ip_cost = calc.NETWORK_PRICING['public_ip'] if record.get('public_ip', True) else 0.0
+        return (
+            calc.VM_PRICING.get(record['vm_size'], 0.10),
+            record.get('hours_per_month', 730),
+            disk_gb * storage_price + ip_cost,
+            1.0 if record.get('enable_backup', True) else 0.0,
+            disk_gb,
+            record.get('outbound_data_gb', 100),
+        )
+
+    def _sample_costs(self, configs: List[tuple], rng: np.random.Generator) -> np.ndarray:
+        """
+        Sample monthly costs
+
+        Args:
+            configs: Per-VM _config() tuples
+            rng: Random generator
+
+        Returns:
+            (VMs x samples) float32 monthly cost array
+        """
+        calc = self.calculator
+        columns = np.asarray(configs, dtype=np.float32).T[:, :, None]
+        hourly_rate, hours, fixed_cost, backup_enabled, backup_gb, outbound_gb = columns
+        shape = (len(configs), self.samples)
+
+        # Network: billable outbound GB above the free allowance
+        cost = outbound_gb * self.distributions['outbound_data_gb'].sample(rng, shape)
+        if cost.shape != shape:
+            cost = np.broadcast_to(cost, shape).copy()
+        cost -= FREE_OUTBOUND_GB
+        np.maximum(cost, 0.0, out=cost)
+        cost *= np.float32(calc.NETWORK_PRICING['outbound_data_gb'])
+
+        # Compute: running hours capped at a full month
+        hours = np.minimum(hours * self.distributions['hours_per_month'].sample(rng, shape), MAX_HOURS_PER_MONTH)
+        hours *= hourly_rate
+        cost += hours
+        del hours
+
+        # Backup: protected instance plus grown backup storage
+        backup = backup_gb * self.distributions['backup_growth'].sample(rng, shape)
+        backup *= np.float32(calc.BACKUP_PRICING['storage_per_gb'])
+        backup += np.float32(calc.BACKUP_PRICING['protected_instance'])
+        backup *= backup_enabled
+        cost += backup
+        del backup
+
+        cost += fixed_cost
+        return cost
+
+    def _chunk_totals(self, configs: List[tuple], seed: np.random.SeedSequence) -> np.ndarray:
+        """Fleet cost per sample contributed by one chunk"""
+        costs = self._sample_costs(configs, np.random.default_rng(seed))
+        return costs.sum(axis=0, dtype=np.float64)
+
+    def _config_quantiles(self, config: tuple) -> Dict:
+        stats = self._config_stats.get(config)
+        if stats is None:
+            costs = self._sample_costs([config], self._config_rng)[0]
+            p50, p90, p99 = np.quantile(costs, QUANTILES)
+            stats = {
+                'mean': round(float(costs.mean(dtype=np.float64)), 2),
+                'p50': round(float(p50), 2),
+                'p90': round(float(p90), 2),
+                'p99': round(float(p99), 2),
+            }
+            self._config_stats[config] = stats
+        return stats
+
+    def simulate(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Simulate a fleet
+
+        The fleet totals behind aggregate() are complete once the iterator
+        is exhausted.
+
+        Args:
+            records: VM records (vm_size and the calculate_total_cost
+                fields; outbound_data_gb, hours_per_month and the disk sizes
+                are the point estimates the multipliers apply to)
+
+        Yields:
+            Per-VM {'name', 'vm_size', 'mean', 'p50', 'p90', 'p99'} monthly cost
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = deque()
+            chunk: List[tuple] = []
+
+            def submit():
+                in_flight.append(executor.submit(self._chunk_totals, chunk, self.seed_sequence.spawn(1)[0]))
+                # Bound memory: at most two chunks per worker in flight
+                while len(in_flight) > 2 * self.workers:
+                    self.fleet_totals += in_flight.popleft().result()
+
+            for record in records:
+                config = self._config(record)
+                chunk.append(config)
+                self.vm_count += 1
+                yield {'name': record.get('name'), 'vm_size': record['vm_size'], **self._config_quantiles(config)}
+                if len(chunk) >= self.chunk_size:
+                    submit()
+                    chunk = []
+            if chunk:
+                submit()
+            while in_flight:
+                self.fleet_totals += in_flight.popleft().result()
+
+    def run(self, records: Iterable[Dict]) -> Dict:
+        """
+        Simulate a fleet and return only the fleet quantiles
+
+        Args:
+            records: VM records
+
+        Returns:
+            aggregate() result
+        """
+        for _ in self.simulate(records):
+            pass
+        return self.aggregate()
+
+    def aggregate(self) -> Dict:
+        """
+        Fleet monthly cost quantiles over the VMs simulated so far
+
+        Returns:
+            {'vms', 'samples', 'mean', 'p50', 'p90', 'p99'}
+        """
+        p50, p90, p99 = np.quantile(self.fleet_totals, QUANTILES)
+        return {
+            'vms': self.vm_count,
+            'samples': self.samples,
+            'mean': round(float(self.fleet_totals.mean()), 2),
+            'p50': round(float(p50), 2),
+            'p90': round(float(p90), 2),
+            'p99': round(float(p99), 2),
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+    from cost_rollup import read_inventory
+
+    parser = argparse.ArgumentParser(description='Monte Carlo VM cost uncertainty')
+    parser.add_argument('inventory', help='JSON lines inventory file (- for stdin)')
+    parser.add_argument('--samples', type=int, default=10000, help='Samples per VM')
+    parser.add_argument('--distributions', help='JSON file with multiplier distribution specs')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--workers', type=int, help='Chunks simulated concurrently (default: CPU count)')
+    parser.add_argument('--output', help='Per-VM results as JSON lines')
+
+    args = parser.parse_args(argv)
+
+    distributions = None
+    if args.distributions:
+        with open(args.distributions) as f:
+            distributions = json.load(f)
+
+    model = MonteCarloCostModel(
+        samples=args.samples, distributions=distributions, seed=args.seed, workers=args.workers
+    )
+
+    started = time.perf_counter()
+    if args.output:
+        with open(args.output, 'w') as f:
+            for result in model.simulate(read_inventory(args.inventory)):
+                f.write(json.dumps(result) + '\n')
+    else:
+        model.run(read_inventory(args.inventory))
+    elapsed = time.perf_counter() - started
+
+    fleet = model.aggregate()
+
+    print("\n" + "="*80)
+    print("VM COST UNCERTAINTY (Monthly, USD)")
+    print("="*80)
+    print(f"\nVMs: {fleet['vms']:,}  Samples per VM: {fleet['samples']:,}  Time: {elapsed:.2f}s")
+    print("\nDistributions (multipliers of each VM's estimate):")
+    for name, distribution in model.distributions.items():
+        params = ', '.join(f"{key}={value:g}" for key, value in distribution.params.items())
+        print(f"  {name}: {distribution.kind}({params})")
+    print("\nFleet Total:")
+    for key in ('mean', 'p50', 'p90', 'p99'):
+        print(f"  {key.upper()}: ${fleet[key]:,.2f}")
+    print("="*80 + "\n")
+
+    if args.output:
+        logger.info(f"Per-VM results saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Offline Governance Policy Evaluator for VM Automation Accelerator
+Compiles the Azure Policy definitions in governance/policies into in-memory
+predicates and validates VM requests before any ARM call is made
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import time
+import fnmatch
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'governance', 'policies')
+
+VM_RESOURCE_TYPE = 'Microsoft.Compute/virtualMachines'
+SKU_FIELD = 'microsoft.compute/virtualmachines/sku.name'
+
+# Policy aliases -> VM request keys (the Terraform variable names)
+FIELD_ALIASES = {
+    'name': 'vm_name',
+    'location': 'location',
+    SKU_FIELD: 'vm_size',
+    'microsoft.compute/virtualmachines/securityprofile.encryptionathost': 'encryption_at_host_enabled',
+}
+
+# Resources a request deploys alongside the VM when a flag is set, for
+# AuditIfNotExists/DeployIfNotExists policies
+RELATED_RESOURCES = {
+    'enable_backup': 'microsoft.recoveryservices/backupprotecteditems',
+}
+
+EFFECT_DISABLED = 'disabled'
+
+_TAG_FIELD = re.compile(r"^tags(?:\[\s*'?(?P<bracket>[^\]']+)'?\s*\]|\.(?P<dot>.+))$", re.IGNORECASE)
+
+Predicate = Callable[[Dict], bool]
+
+
+class PolicyCompileError(ValueError):
+    """Raised when a policy definition uses an unsupported construct"""
+
+
+# =============================================================================
+# ARM TEMPLATE EXPRESSIONS
+# =============================================================================
+
+_TOKEN = re.compile(r"\s*(?:(?P<string>'(?:[^']|'')*')|(?P<number>-?\d+)|(?P<name>[A-Za-z_][A-Za-z0-9_]*)|(?P<punct>[(),\[\]]))")
+
+
+def _tokenize(text: str) -> List[tuple]:
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise PolicyCompileError(f"Cannot parse expression near: {text[position:]}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = value[1:-1].replace("''", "'")
+        elif kind == 'number':
+            value = int(value)
+        tokens.append((kind, value))
+    return tokens
+
+
+class _ExpressionParser:
+    """Recursive-descent evaluator for the ARM functions used in policy rules"""
+
+    def __init__(self, tokens: List[tuple], parameters: Dict[str, Any]):
+        self.tokens = tokens
+        self.position = 0
+        self.parameters = parameters
+
+    def _next(self) -> tuple:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, value: str):
+        kind, actual = self._next()
+        if actual != value:
+            raise PolicyCompileError(f"Expected '{value}', found '{actual}'")
+
+    def _peek(self) -> Optional[tuple]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def parse(self) -> Any:
+        value = self._value()
+        if self._peek() is not None:
+            raise PolicyCompileError(f"Unexpected token: {self._peek()[1]}")
+        return value
+
+    def _value(self) -> Any:
+        kind, token = self._next()
+        if kind in ('string', 'number'):
+            value = token
+        elif kind == 'name':
+            value = self._call(token)
+        else:
+            raise PolicyCompileError(f"Unexpected token: {token}")
+
+        while self._peek() == ('punct', '['):
+            self._next()
+            index = self._value()
+            self._expect(']')
+            value = value[index]
+        return value
+
+    def _call(self, function: str) -> Any:
+        self._expect('(')
+        args = []
+        if self._peek() != ('punct', ')'):
+            args.append(self._value())
+            while self._peek() == ('punct', ','):
+                self._next()
+                args.append(self._value())
+        self._expect(')')
+
+        function = function.lower()
+        if function == 'parameters':
+            if args[0] not in self.parameters:
+                raise PolicyCompileError(f"Parameter '{args[0]}' has no value")
+            return self.parameters[args[0]]
+        if function == 'concat':
+            if args and all(isinstance(arg, list) for arg in args):
+                return [item for arg in args for item in arg]
+            return ''.join(str(arg) for arg in args)
+        if function == 'tolower':
+            return str(args[0]).lower()
+        if function == 'toupper':
+            return str(args[0]).upper()
+        raise PolicyCompileError(f"Unsupported function in policy expression: {function}()")
+
+
+def resolve_expression(value: Any, parameters: Dict[str, Any]) -> Any:
+    """
+    Resolve an ARM template expression ("[parameters('x')]") at compile time
+
+    Args:
+        value: Literal or expression string
+        parameters: Policy parameter values
+
+    Returns:
+        Resolved value (literals are returned unchanged)
+    """
+    if isinstance(value, str) and value.startswith('[') and value.endswith(']') and not value.startswith('[['):
+        return _ExpressionParser(_tokenize(value[1:-1]), parameters).parse()
+    if isinstance(value, list):
+        return [resolve_expression(item, parameters) for item in value]
+    return value
+
+
+# =============================================================================
+# COMPILATION
+# =============================================================================
+
+def to_resource(request: Dict) -> Dict:
+    """
+    Flatten a VM request into the field view the compiled predicates read
+
+    Values are lower-cased strings, as Azure Policy compares case-insensitively,
+    and tags are indexed by lower-cased key.
+
+    Args:
+        request: VM request (vm_name, vm_size, location, tags,
+            encryption_at_host_enabled, enable_backup, ...)
+
+    Returns:
+        Resource view with 'fields', 'tags' and 'related' entries
+    """
+    fields = {'type': VM_RESOURCE_TYPE.lower()}
+    for alias, key in FIELD_ALIASES.items():
+        value = request.get(key)
+        if value is not None:
+            fields[alias] = _normalize(value)
+
+    tags = {str(key).lower(): _normalize(value) for key, value in (request.get('tags') or {}).items()}
+    related = {resource_type for flag, resource_type in RELATED_RESOURCES.items() if request.get(flag)}
+    return {'fields': fields, 'tags': tags, 'related': related, 'raw_name': request.get('vm_name') or ''}
+
+
+def _normalize(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).lower()
+
+
+def _azure_match_regex(pattern: str) -> str:
+    """Translate an Azure Policy match pattern (# digit, ? letter, . any) to a regex"""
+    translated = []
+    for char in pattern:
+        if char == '#':
+            translated.append('[0-9]')
+        elif char == '?':
+            translated.append('[A-Za-z]')
+        elif char == '.':
+            translated.append('.')
+        else:
+            translated.append(re.escape(char))
+    return '^' + ''.join(translated) + '$'
+
+
+def _compile_getter(field: str) -> tuple:
+    """
+    Compile a field reference
+
+    Returns:
+        (getter(resource) -> Optional[str], normalized field name)
+    """
+    tag = _TAG_FIELD.match(field)
+    if tag:
+        key = (tag.group('bracket') or tag.group('dot')).strip().lower()
+        return (lambda resource: resource['tags'].get(key)), f'tags[{key}]'
+
+    name = field.lower()
+    return (lambda resource: resource['fields'].get(name)), name
+
+
+def _compile_condition(condition: Dict, parameters: Dict[str, Any], fields: set) -> Predicate:
+    """Compile one leaf condition to a predicate"""
+    if 'field' not in condition:
+        raise PolicyCompileError(f"Unsupported condition: {condition}")
+
+    getter, field_name = _compile_getter(str(resolve_expression(condition['field'], parameters)))
+    fields.add(field_name)
+
+    operators = [key for key in condition if key != 'field']
+    if len(operators) != 1:
+        raise PolicyCompileError(f"Condition must have exactly one operator: {condition}")
+    operator = operators[0]
+    value = resolve_expression(condition[operator], parameters)
+    op = operator.lower()
+
+    if op == 'exists':
+        expected = _normalize(value) == 'true'
+        return lambda resource: (getter(resource) is not None) == expected
+
+    if op in ('equals', 'notequals'):
+        target = _normalize(value)
+        if op == 'equals':
+            return lambda resource: getter(resource) == target
+        return lambda resource: getter(resource) != target
+
+    if op in ('in', 'notin'):
+        allowed = frozenset(_normalize(item) for item in value)
+        if op == 'in':
+            return lambda resource: getter(resource) in allowed
+        return lambda resource: getter(resource) not in allowed
+
+    if op in ('match', 'notmatch', 'matchinsensitively', 'notmatchinsensitively'):
+        pattern = str(value)
+        # The repo's naming policy documents its pattern as a regex; other
+        # patterns use Azure's #/?/. match syntax
+        regex = pattern if pattern.startswith('^') else _azure_match_regex(pattern)
+        compiled = re.compile(regex, re.IGNORECASE if 'insensitively' in op else 0)
+        negate = op.startswith('not')
+        # Raw (case-preserving) name for name matches, normalized value otherwise
+        if field_name == 'name':
+            return lambda resource: (compiled.match(resource['raw_name']) is None) == negate
+        return lambda resource: (compiled.match(getter(resource) or '') is None) == negate
+
+    if op in ('like', 'notlike'):
+        compiled = re.compile(fnmatch.translate(_normalize(value)))
+        negate = op == 'notlike'
+        return lambda resource: (compiled.match(getter(resource) or '') is None) == negate
+
+    if op in ('contains', 'notcontains'):
+        needle = _normalize(value)
+        negate = op == 'notcontains'
+        return lambda resource: (needle in (getter(resource) or '')) != negate
+
+    raise PolicyCompileError(f"Unsupported operator: {operator}")
+
+
+def compile_rule(rule: Dict, parameters: Dict[str, Any], fields: Optional[set] = None) -> Predicate:
+    """
+    Compile a policy rule expression (allOf/anyOf/not/conditions) to a predicate
+
+    Args:
+        rule: 'if' block or nested expression
+        parameters: Policy parameter values
+        fields: Set collecting the normalized fields the rule reads
+
+    Returns:
+        Predicate(resource) -> True when the rule matches
+    """
+    fields = fields if fields is not None else set()
+
+    if 'allOf' in rule:
+        parts = tuple(compile_rule(part, parameters, fields) for part in rule['allOf'])
+        return lambda resource: all(part(resource) for part in parts)
+    if 'anyOf' in rule:
+        parts = tuple(compile_rule(part, parameters, fields) for part in rule['anyOf'])
+        return lambda resource: any(part(resource) for part in parts)
+    if 'not' in rule:
+        inner = compile_rule(rule['not'], parameters, fields)
+        return lambda resource: not inner(resource)
+    return _compile_condition(rule, parameters, fields)
+
+
+class CompiledPolicy:
+    """One policy definition compiled to a predicate"""
+
+    def __init__(self, name: str, definition: Dict, parameters: Optional[Dict[str, Any]] = None):
+        """
+        Compile a policy definition
+
+        Args:
+            name: Policy name (file name without extension)
+            definition: Policy definition JSON
+            parameters: Assignment parameter values overriding the defaults
+        """
+        properties = definition.get('properties', definition)
+        self.name = name
+        self.display_name = properties.get('displayName', name)
+
+        values = {
+            key: spec['defaultValue']
+            for key, spec in properties.get('parameters', {}).items()
+            if 'defaultValue' in spec
+        }
+        values.update(parameters or {})
+
+        rule = properties['policyRule']
+        self.fields: set = set()
+        self.matches = compile_rule(rule['if'], values, self.fields)
+        self.effect = str(resolve_expression(rule['then']['effect'], values))
+
+        # *IfNotExists policies are satisfied when the request deploys the
+        # related resource; its existenceCondition cannot be checked before deployment
+        details = rule['then'].get('details') or {}
+        self.requires_related = None
+        if self.effect.lower().endswith('ifnotexists') and details.get('type'):
+            self.requires_related = details['type'].lower()
+
+    @property
+    def enabled(self) -> bool:
+        return self.effect.lower() != EFFECT_DISABLED
+
+    def violated_by(self, resource: Dict) -> bool:
+        """True if the resource does not comply"""
+        if not self.matches(resource):
+            return False
+        if self.requires_related is not None:
+            return self.requires_related not in resource['related']
+        return True
+
+
+class PolicyEvaluator:
+    """
+    Validate VM requests against the governance policies offline
+
+    Definitions are compiled once: allow-lists become frozensets, naming
+    patterns precompiled regexes and tag checks dictionary lookups on a
+    lower-cased tag index, so a request is checked in microseconds.
+    """
+
+    def __init__(
+        self,
+        policy_dir: Optional[str] = None,
+        parameters: Optional[Dict[str, Dict[str, Any]]] = None,
+        effects: Optional[Dict[str, str]] = None
+    ):
+        """
+        Load and compile policy definitions
+
+        Args:
+            policy_dir: Directory of policy definition JSON files
+                (default: governance/policies in this repository)
+            parameters: Assignment parameter values per policy name,
+                e.g. {'restrict-vm-sku-sizes': {'allowedSKUs': [...]}}
+            effects: Effect override per policy name (e.g. 'Disabled')
+        """
+        self.policy_dir = os.path.abspath(policy_dir or DEFAULT_POLICY_DIR)
+        self.policies: List[CompiledPolicy] = []
+        self._sku_cache: Dict[str, List[Dict]] = {}
+
+        parameters = parameters or {}
+        effects = effects or {}
+
+        for path in sorted(glob.glob(os.path.join(self.policy_dir, '*.json'))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            with open(path) as f:
+                definition = json.load(f)
+            if 'policyRule' not in definition.get('properties', definition):
+                # Initiatives only bundle the definitions loaded here
+                continue
+
+            overrides = dict(parameters.get(name, {}))
+            if name in effects:
+                overrides['effect'] = effects[name]
+            self.policies.append(CompiledPolicy(name, definition, overrides))
+
+        self._active = [policy for policy in self.policies if policy.enabled]
+        self._sku_policies = [policy for policy in self._active if SKU_FIELD in policy.fields]
+
+        logger.info(
+            f"Compiled {len(self.policies)} policies from {self.policy_dir} "
+            f"({len(self._active)} enabled)"
+        )
+
+    @staticmethod
+    def _violation(policy: CompiledPolicy) -> Dict:
+        return {'policy': policy.name, 'display_name': policy.display_name, 'effect': policy.effect}
+
+    def evaluate(self, request: Dict) -> Dict:
+        """
+        Validate one VM request
+
+        Args:
+            request: VM request (vm_name, vm_size, location, tags,
+                encryption_at_host_enabled, enable_backup, ...)
+
+        Returns:
+            {'compliant': bool, 'violations': [{'policy', 'display_name', 'effect'}]}
+        """
+        resource = to_resource(request)
+        violations = [self._violation(policy) for policy in self._active if policy.violated_by(resource)]
+        return {'compliant': not violations, 'violations': violations}
+
+    def evaluate_many(self, requests: Iterable[Dict]) -> List[Dict]:
+        """
+        Validate many VM requests
+
+        Args:
+            requests: VM requests
+
+        Returns:
+            One result per request, in order, with the request's vm_name
+        """
+        results = []
+        for request in requests:
+            result = self.evaluate(request)
+            result['vm_name'] = request.get('vm_name')
+            results.append(result)
+        return results
+
+    def sku_violations(self, vm_size: str) -> List[Dict]:
+        """
+        Check a VM size against the policies that read the SKU
+
+        Results are cached per size.
+
+        Args:
+            vm_size: VM size (e.g., Standard_D4s_v3)
+
+        Returns:
+            Violations, empty if the size is allowed
+        """
+        cached = self._sku_cache.get(vm_size)
+        if cached is None:
+            resource = to_resource({'vm_size': vm_size})
+            cached = [self._violation(policy) for policy in self._sku_policies if policy.violated_by(resource)]
+            self._sku_cache[vm_size] = cached
+        return cached
+
+    def is_sku_allowed(self, vm_size: str) -> bool:
+        """True if no enabled policy rejects the VM size"""
+        return not self.sku_violations(vm_size)
+
+    def filter_vm_sizes(self, vm_sizes: Iterable[str]) -> List[str]:
+        """
+        Drop VM sizes that violate a policy
+
+        Args:
+            vm_sizes: Candidate VM sizes
+
+        Returns:
+            Allowed VM sizes, in input order
+        """
+        allowed = []
+        for vm_size in vm_sizes:
+            if self.is_sku_allowed(vm_size):
+                allowed.append(vm_size)
+            else:
+                logger.info(f"Excluding {vm_size}: not allowed by governance policy")
+        return allowed
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate VM requests against governance policies')
+    parser.add_argument('requests_file', help='JSON file with a VM request or a list of requests')
+    parser.add_argument('--policy-dir', help='Policy definition directory')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    with open(args.requests_file) as f:
+        requests = json.load(f)
+    if isinstance(requests, dict):
+        requests = [requests]
+
+    evaluator = PolicyEvaluator(args.policy_dir)
+
+    started = time.perf_counter()
+    results = evaluator.evaluate_many(requests)
+    elapsed = time.perf_counter() - started
+
+    non_compliant = [result for result in results if not result['compliant']]
+
+    print("\n" + "="*80)
+    print("GOVERNANCE POLICY CHECK")
+    print("="*80)
+    print(f"\nRequests: {len(results)}")
+    print(f"Compliant: {len(results) - len(non_compliant)}")
+    print(f"Non-compliant: {len(non_compliant)}")
+    if elapsed > 0:
+        print(f"Throughput: {len(results) / elapsed:,.0f} requests/s")
+
+    for result in non_compliant[:20]:
+        policies = ', '.join(f"{v['policy']} ({v['effect']})" for v in result['violations'])
+        print(f"  ✗ {result['vm_name']}: {policies}")
+    if len(non_compliant) > 20:
+        print(f"  ... {len(non_compliant) - 20} more")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Policy check results saved to: {args.output}")
+
+    return 1 if non_compliant else 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
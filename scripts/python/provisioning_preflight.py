@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Provisioning Preflight for VM Automation Accelerator
+Runs the cost estimate, quota check, governance policy check and CMDB name
+uniqueness lookup for a VM order concurrently, within one latency budget,
+and returns a single combined verdict
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+logger = logging.getLogger(__name__)
+
+# Check statuses
+PASSED = 'passed'
+FAILED = 'failed'
+ERROR = 'error'
+SKIPPED = 'skipped'
+TIMEOUT = 'timeout'
+CANCELLED = 'cancelled'
+
+# Verdicts
+APPROVED = 'approved'
+REJECTED = 'rejected'
+INCOMPLETE = 'incomplete'
+
+
+class ProvisioningPreflight:
+    """
+    Concurrent preflight checks for a VM order
+
+    All checks start at once, each on its own daemon thread. As soon as a
+    blocking check fails the verdict is 'rejected' and the other checks are
+    abandoned and their results discarded. Checks still running when the
+    latency budget runs out are reported as timed out and the verdict is
+    'incomplete'. Abandoned checks never hold up the verdict or process
+    exit; the clients passed in should still use request timeouts within
+    the budget so that they do not keep working in the background.
+    """
+
+    def __init__(
+        self,
+        cost_calculator=None,
+        quota_manager=None,
+        servicenow_client=None,
+        policy_evaluator=None,
+        budget_seconds: float = 10.0
+    ):
+        """
+        Initialize preflight
+
+        Args:
+            cost_calculator: CostCalculator (cost check is skipped when None)
+            quota_manager: QuotaManager (quota check is skipped when None)
+            servicenow_client: ServiceNowClient (CMDB check is skipped when None)
+            policy_evaluator: PolicyEvaluator (policy check is skipped when None)
+            budget_seconds: Overall latency budget (default: 10)
+        """
+        self.cost_calculator = cost_calculator
+        self.quota_manager = quota_manager
+        self.servicenow_client = servicenow_client
+        self.policy_evaluator = policy_evaluator
+        self.budget_seconds = budget_seconds
+
+    # =========================================================================
+    # CHECKS
+    # =========================================================================
+    # Each check returns (passed, details) and is blocking unless noted.
+
+    def _check_policy(self, order: Dict) -> Tuple[bool, Dict]:
+        result = self.policy_evaluator.evaluate(order)
+        return result['compliant'], result
+
+    def _check_quota(self, order: Dict) -> Tuple[bool, Dict]:
+        result = self.quota_manager.check_compute_quota(
+            order['location'], order['vm_size'], order.get('quantity', 1)
+        )
+        if not result.get('success'):
+            # Policy rejections are a definite failure; anything else is an error
+            if result.get('policy_violations'):
+                return False, result
+            raise RuntimeError(result.get('error', 'Quota check failed'))
+        return result['sufficient'], result
+
+    def _check_cmdb(self, order: Dict) -> Tuple[bool, Dict]:
+        names = order.get('vm_names') or [order['vm_name']]
+        existing = self.servicenow_client.get_vm_cis_by_names(names, fields=['sys_id', 'name'])
+        return not existing, {'names': names, 'existing': sorted(existing)}
+
+    def _check_cost(self, order: Dict) -> Tuple[bool, Dict]:
+        estimate = self.cost_calculator.calculate_total_cost(order['vm_size'], **order.get('cost_options', {}))
+        quantity = order.get('quantity', 1)
+        monthly = round(estimate['total_monthly_cost'] * quantity, 2)
+        limit = order.get('max_monthly_cost')
+        details = {'monthly_cost': monthly, 'max_monthly_cost': limit, 'estimate': estimate}
+        return limit is None or monthly <= limit, details
+
+    def _checks(self, order: Dict) -> List[Tuple[str, Optional[Callable], bool]]:
+        """(name, check or None when its component is missing, blocking)"""
+        return [
+            ('policy', self._check_policy if self.policy_evaluator else None, True),
+            ('quota', self._check_quota if self.quota_manager else None, True),
+            ('cmdb', self._check_cmdb if self.servicenow_client else None, True),
+            # Cost only blocks when the order carries a budget
+            ('cost', self._check_cost if self.cost_calculator else None, order.get('max_monthly_cost') is not None),
+        ]
+
+    @classmethod
+    def _start_check(cls, name: str, check: Callable, order: Dict) -> Future:
+        """Run a check on a daemon thread, so an abandoned check cannot delay exit"""
+        future = Future()
+        future.set_running_or_notify_cancel()
+        threading.Thread(
+            target=lambda: future.set_result(cls._run_check(name, check, order)),
+            name=f'preflight-{name}',
+            daemon=True
+        ).start()
+        return future
+
+    @staticmethod
+    def _run_check(name: str, check: Callable, order: Dict) -> Dict:
+        started = time.perf_counter()
+        try:
+            passed, details = check(order)
+            status, error = (PASSED if passed else FAILED), None
+        except Exception as e:
+            logger.error(f"Preflight check {name} failed with error: {e}")
+            status, details, error = ERROR, None, str(e)
+        return {
+            'status': status,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'details': details,
+            'error': error
+        }
+
+    # =========================================================================
+    # ORCHESTRATION
+    # =========================================================================
+
+    def run(self, order: Dict) -> Dict:
+        """
+        Run all checks for an order concurrently
+
+        Args:
+            order: VM order with vm_name (or vm_names), vm_size, location,
+                quantity, tags, encryption_at_host_enabled, enable_backup,
+                and optionally cost_options (calculate_total_cost arguments)
+                and max_monthly_cost
+
+        Returns:
+            Combined verdict (approved, rejected, incomplete) with per-check
+            status, timings and details
+        """
+        logger.info(f"Running preflight for {order.get('vm_name')} ({order.get('vm_size')} in {order.get('location')})")
+        started = time.perf_counter()
+        deadline = started + self.budget_seconds
+
+        checks = {}
+        runnable = []
+        for name, check, blocking in self._checks(order):
+            checks[name] = {'blocking': blocking, 'status': SKIPPED, 'elapsed_ms': None, 'details': None, 'error': None}
+            if check is not None:
+                runnable.append((name, check))
+
+        rejected_by = None
+        futures = {self._start_check(name, check, order): name for name, check in runnable}
+        pending = set(futures)
+        while pending and rejected_by is None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                checks[name].update(future.result())
+                if checks[name]['blocking'] and checks[name]['status'] == FAILED and rejected_by is None:
+                    rejected_by = name
+
+        # Abandoned checks run on until their clients give up; their results are discarded
+        for future in pending:
+            checks[futures[future]]['status'] = CANCELLED if rejected_by else TIMEOUT
+
+        blocking_statuses = [check['status'] for check in checks.values() if check['blocking']]
+        if rejected_by or FAILED in blocking_statuses:
+            verdict = REJECTED
+        elif any(status in (ERROR, TIMEOUT) for status in blocking_statuses):
+            verdict = INCOMPLETE
+        else:
+            verdict = APPROVED
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Preflight verdict: {verdict} in {elapsed_ms} ms")
+
+        return {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'vm_name': order.get('vm_name'),
+            'vm_size': order.get('vm_size'),
+            'location': order.get('location'),
+            'verdict': verdict,
+            'rejected_by': rejected_by,
+            'elapsed_ms': elapsed_ms,
+            'budget_ms': round(self.budget_seconds * 1000, 1),
+            'checks': checks
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='VM provisioning preflight')
+    parser.add_argument('--vm-name', required=True, help='VM name')
+    parser.add_argument('--vm-size', required=True, help='VM size')
+    parser.add_argument('--location', required=True, help='Azure region')
+    parser.add_argument('--quantity', type=int, default=1, help='Number of VMs')
+    parser.add_argument('--subscription-id', help='Azure subscription ID (quota check is skipped without it)')
+    parser.add_argument('--tags', help='Tags as JSON object')
+    parser.add_argument('--encryption-at-host', action='store_true', help='Encryption at host enabled')
+    parser.add_argument('--backup', action='store_true', help='Azure Backup enabled')
+    parser.add_argument('--max-monthly-cost', type=float, help='Reject orders above this monthly cost (USD)')
+    parser.add_argument('--budget', type=float, default=10.0, help='Latency budget in seconds')
+    parser.add_argument('--skip-cmdb', action='store_true', help='Skip the CMDB name check')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    from cost_calculator import CostCalculator
+    from policy_evaluator import PolicyEvaluator
+
+    # Retries would outlast the budget; a single request may use all of it
+    quota_manager = None
+    if args.subscription_id:
+        from quota_manager import QuotaManager
+        quota_manager = QuotaManager(
+            args.subscription_id,
+            client_options={'retry_total': 0, 'connection_timeout': args.budget, 'read_timeout': args.budget}
+        )
+
+    servicenow_client = None
+    if not args.skip_cmdb and os.getenv('SERVICENOW_INSTANCE_URL'):
+        from servicenow_client import ServiceNowClient
+        servicenow_client = ServiceNowClient(timeout=args.budget, max_retries=0)
+
+    order = {
+        'vm_name': args.vm_name,
+        'vm_size': args.vm_size,
+        'location': args.location,
+        'quantity': args.quantity,
+        'tags': json.loads(args.tags) if args.tags else {},
+        'encryption_at_host_enabled': args.encryption_at_host,
+        'enable_backup': args.backup,
+        'cost_options': {'enable_backup': args.backup},
+        'max_monthly_cost': args.max_monthly_cost
+    }
+
+    preflight = ProvisioningPreflight(
+        cost_calculator=CostCalculator(),
+        quota_manager=quota_manager,
+        servicenow_client=servicenow_client,
+        policy_evaluator=PolicyEvaluator(),
+        budget_seconds=args.budget
+    )
+    report = preflight.run(order)
+
+    print("\n" + "="*80)
+    print("PROVISIONING PREFLIGHT")
+    print("="*80)
+    print(f"\nVM: {report['vm_name']} ({report['vm_size']} in {report['location']})")
+    print(f"\n{'Check':<10} {'Status':<10} {'Blocking':<9} {'ms':>8}")
+    for name, check in report['checks'].items():
+        elapsed = check['elapsed_ms'] if check['elapsed_ms'] is not None else '-'
+        print(f"{name:<10} {check['status']:<10} {'yes' if check['blocking'] else 'no':<9} {elapsed:>8}")
+        if check['error']:
+            print(f"           {check['error']}")
+    print(f"\nVerdict: {report['verdict'].upper()} ({report['elapsed_ms']} ms of {report['budget_ms']} ms budget)")
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        logger.info(f"Preflight report saved to: {args.output}")
+
+    return 0 if report['verdict'] == APPROVED else 1
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
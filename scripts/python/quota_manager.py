@@ -10,16 +10,7 @@ import json
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.mgmt.resource import SubscriptionClient
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -42,21 +33,33 @@ class QuotaManager:
         'Standard_F8': 'standardFSv2Family',
     }
     
-    def __init__(self, subscription_id: str):
+    def __init__(self, subscription_id: str, policy_evaluator=None, client_options: Optional[Dict] = None):
         """
         Initialize quota manager
         
         Args:
             subscription_id: Azure subscription ID
+            policy_evaluator: Optional PolicyEvaluator; VM sizes it rejects
+                fail the quota check without any ARM call
+            client_options: Extra Azure SDK client settings such as
+                retry_total, connection_timeout and read_timeout
         """
+        # Azure SDK imports are deferred to first use so that importing this
+        # module (e.g. from the unified CLI) stays cheap
+        from azure.identity import DefaultAzureCredential
+        from azure.mgmt.compute import ComputeManagementClient
+        from azure.mgmt.network import NetworkManagementClient
+
         self.subscription_id = subscription_id
+        self.policy_evaluator = policy_evaluator
         self.credential = DefaultAzureCredential()
-        self.compute_client = ComputeManagementClient(self.credential, subscription_id)
-        self.network_client = NetworkManagementClient(self.credential, subscription_id)
+        self.compute_client = ComputeManagementClient(self.credential, subscription_id, **(client_options or {}))
+        self.network_client = NetworkManagementClient(self.credential, subscription_id, **(client_options or {}))
         
         logger.info(f"Initialized quota manager for subscription: {subscription_id}")
     
-    def get_vm_family(self, vm_size: str) -> str:
+    @classmethod
+    def get_vm_family(cls, vm_size: str) -> str:
         """
         Get VM family from VM size
         
@@ -66,7 +69,7 @@ class QuotaManager:
         Returns:
             VM family name
         """
-        for prefix, family in self.VM_FAMILY_MAP.items():
+        for prefix, family in cls.VM_FAMILY_MAP.items():
             if vm_size.startswith(prefix):
                 return family
         
@@ -104,6 +107,34 @@ class QuotaManager:
             logger.error(f"Failed to get VM size details: {e}")
             return None
     
+    def get_vm_size_cores(self, location: str) -> Dict[str, int]:
+        """
+        Get vCPU counts of all VM sizes in a region with one ARM call
+        
+        Args:
+            location: Azure region
+            
+        Returns:
+            Mapping of VM size to vCPU count
+        """
+        return {size.name: size.number_of_cores for size in self.compute_client.virtual_machine_sizes.list(location)}
+    
+    def get_usage_snapshot(self, location: str) -> Dict[str, Dict]:
+        """
+        Get current compute usage and limits in a region with one ARM call
+        
+        Args:
+            location: Azure region
+            
+        Returns:
+            Mapping of quota name (e.g., 'cores', 'standardDSv3Family') to
+            {'current', 'limit'}
+        """
+        return {
+            usage.name.value: {'current': usage.current_value, 'limit': usage.limit}
+            for usage in self.compute_client.usage.list(location)
+        }
+    
     def check_compute_quota(
         self,
         location: str,
@@ -121,7 +152,17 @@ class QuotaManager:
         Returns:
             Quota check results
         """
-        logger.info(f"Checking quota for {quantity} x {vm_size} in {location}")
+        logger.info("Checking quota for %s x %s in %s", quantity, vm_size, location)
+        
+        # Non-compliant sizes would be rejected anyway; skip the ARM calls
+        if self.policy_evaluator:
+            violations = self.policy_evaluator.sku_violations(vm_size)
+            if violations:
+                return {
+                    'success': False,
+                    'error': f'VM size {vm_size} is not allowed by governance policy',
+                    'policy_violations': violations
+                }
         
         # Get VM size details
         vm_details = self.get_vm_size_details(location, vm_size)
@@ -134,8 +175,8 @@ class QuotaManager:
         cores_required = vm_details['cores'] * quantity
         memory_required = vm_details['memory_mb'] * quantity
         
-        logger.info(f"Cores required: {cores_required}")
-        logger.info(f"Memory required: {memory_required} MB")
+        logger.info("Cores required: %s", cores_required)
+        logger.info("Memory required: %s MB", memory_required)
         
         # Get usage and quotas
         try:
@@ -170,7 +211,7 @@ class QuotaManager:
                     
                     if available < cores_required:
                         quota_results['sufficient'] = False
-                        logger.warning(f"Insufficient total cores: {available} < {cores_required}")
+                        logger.warning("Insufficient total cores: %s < %s", available, cores_required)
                 
                 # Check VM family
                 vm_family = self.get_vm_family(vm_size)
@@ -186,7 +227,7 @@ class QuotaManager:
                     
                     if available < cores_required:
                         quota_results['sufficient'] = False
-                        logger.warning(f"Insufficient family cores: {available} < {cores_required}")
+                        logger.warning("Insufficient family cores: %s < %s", available, cores_required)
             
             quota_results['success'] = True
             return quota_results
@@ -265,8 +306,11 @@ class QuotaManager:
         # Check compute quota
         compute_quota = self.check_compute_quota(location, vm_size, quantity)
         
-        # Check network quota
-        network_quota = self.check_network_quota(location, quantity)
+        # Check network quota (not needed when the VM size is not allowed)
+        if compute_quota.get('policy_violations'):
+            network_quota = {'success': False, 'error': 'Skipped: VM size not allowed by governance policy'}
+        else:
+            network_quota = self.check_network_quota(location, quantity)
         
         # Build report
         report = {
@@ -324,7 +368,7 @@ class QuotaManager:
         }
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """CLI interface"""
     import argparse
     
@@ -333,12 +377,18 @@ def main():
     parser.add_argument('--location', required=True, help='Azure region')
     parser.add_argument('--vm-size', required=True, help='VM size')
     parser.add_argument('--quantity', type=int, default=1, help='Number of VMs')
+    parser.add_argument('--enforce-policies', action='store_true', help='Reject VM sizes not allowed by governance policies')
     parser.add_argument('--output', help='Output file path')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     try:
-        manager = QuotaManager(args.subscription_id)
+        policy_evaluator = None
+        if args.enforce_policies:
+            from policy_evaluator import PolicyEvaluator
+            policy_evaluator = PolicyEvaluator()
+        
+        manager = QuotaManager(args.subscription_id, policy_evaluator)
         report = manager.generate_quota_report(
             location=args.location,
             vm_size=args.vm_size,
@@ -384,4 +434,6 @@ def main():
 
 
 if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
     main()
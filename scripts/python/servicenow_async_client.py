@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Asyncio ServiceNow client for VM Automation Accelerator
+Runs many ServiceNow calls concurrently under a bounded limit for bulk
+operations such as post-release CMDB and ticket updates
+"""
+
+import asyncio
+import logging
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from servicenow_client import ServiceNowClient
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncServiceNowClient:
+    """
+    Async sibling of ServiceNowClient
+
+    Each call runs the pooled synchronous client on the client's own pool
+    of ``max_concurrency`` worker threads, gated by a semaphore so at most
+    that many requests are in flight. The loop's default executor is not
+    used because it is capped at cpu_count + 4 threads. The connection pool
+    is sized to match, so every in-flight request has a keep-alive
+    connection available.
+
+    The Batch API is reached through send_batch() and flush_batch(); a
+    ServiceNowBatch is still built with the synchronous ``client.batch()``
+    since queuing operations does no I/O.
+    """
+
+    # Bulk helpers only need the identifiers of the records they write
+    CI_RESPONSE_FIELDS = ['sys_id', 'name']
+    TICKET_RESPONSE_FIELDS = ['sys_id', 'number']
+
+    def __init__(
+        self,
+        instance_url: str = None,
+        username: str = None,
+        password: str = None,
+        api_version: str = "v1",
+        max_concurrency: int = 10,
+        client: Optional[ServiceNowClient] = None,
+        **client_options
+    ):
+        """
+        Initialize async ServiceNow client
+
+        Args:
+            instance_url: ServiceNow instance URL
+            username: ServiceNow username
+            password: ServiceNow password
+            api_version: API version (default: v1)
+            max_concurrency: Maximum concurrent requests (default: 10)
+            client: Existing ServiceNowClient to wrap instead of creating one
+            **client_options: Additional ServiceNowClient options (timeout, max_retries, ...)
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.max_concurrency = max_concurrency
+        self.client = client or ServiceNowClient(
+            instance_url=instance_url,
+            username=username,
+            password=password,
+            api_version=api_version,
+            pool_size=max_concurrency,
+            **client_options
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='snow-async')
+
+    async def close(self):
+        """Stop the worker threads and close pooled connections"""
+        # Waiting for in-flight requests must not block the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a synchronous client method under the concurrency limit
+
+        Args:
+            func: Bound ServiceNowClient method
+            *args: Positional arguments
+            **kwargs: Keyword arguments
+
+        Returns:
+            Method result
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None
+    ) -> Dict:
+        """Async variant of ServiceNowClient._make_request"""
+        return await self._call(self.client._make_request, method, endpoint, data=data, params=params)
+
+    # =========================================================================
+    # BATCH API METHODS
+    # =========================================================================
+
+    async def send_batch(self, rest_requests: List[Dict], batch_request_id: str = "1") -> Dict:
+        """Async variant of ServiceNowClient.send_batch"""
+        return await self._call(self.client.send_batch, rest_requests, batch_request_id)
+
+    async def flush_batch(self, batch) -> List:
+        """
+        Send all operations queued on a ServiceNowBatch
+
+        Args:
+            batch: ServiceNowBatch from ``self.client.batch()``
+
+        Returns:
+            The operations that were sent, each holding its result or error
+        """
+        return await self._call(batch.flush)
+
+    # =========================================================================
+    # TABLE ITERATION METHODS
+    # =========================================================================
+
+    async def iter_table(
+        self,
+        table: str,
+        query: str = "",
+        fields: Optional[List[str]] = None,
+        page_size: int = 1000,
+        **options
+    ) -> AsyncIterator[Dict]:
+        """
+        Async variant of ServiceNowClient.iter_table
+
+        The synchronous iterator is advanced one page at a time on a worker
+        thread, so memory stays bounded as in the synchronous version.
+
+        Args:
+            table: Table name (e.g., cmdb_ci_vm_instance)
+            query: Encoded query (sysparm_query)
+            fields: Fields to return (sysparm_fields), None for all
+            page_size: Records per request (default: 1000)
+            **options: Other ServiceNowClient.iter_table options (keyset, prefetch, ...)
+
+        Yields:
+            Table records
+        """
+        iterator = self.client.iter_table(table, query=query, fields=fields, page_size=page_size, **options)
+        try:
+            while True:
+                page = await self._call(_next_page, iterator, page_size)
+                if not page:
+                    return
+                for record in page:
+                    yield record
+        finally:
+            try:
+                iterator.close()
+            except ValueError:
+                # A cancelled page fetch is still advancing the iterator
+                pass
+
+    # =========================================================================
+    # REQUEST ITEM METHODS
+    # =========================================================================
+
+    async def get_request_item(self, sys_id: str) -> Dict:
+        """Async variant of ServiceNowClient.get_request_item"""
+        return await self._call(self.client.get_request_item, sys_id)
+
+    async def update_request_item(
+        self,
+        sys_id: str,
+        state: Optional[str] = None,
+        work_notes: Optional[str] = None,
+        additional_fields: Optional[Dict] = None,
+        response_fields: Optional[List[str]] = None
+    ) -> Dict:
+        """Async variant of ServiceNowClient.update_request_item"""
+        return await self._call(
+            self.client.update_request_item,
+            sys_id,
+            state=state,
+            work_notes=work_notes,
+            additional_fields=additional_fields,
+            response_fields=response_fields
+        )
+
+    async def get_request_item_by_number(self, number: str) -> Dict:
+        """Async variant of ServiceNowClient.get_request_item_by_number"""
+        return await self._call(self.client.get_request_item_by_number, number)
+
+    # =========================================================================
+    # CHANGE REQUEST METHODS
+    # =========================================================================
+
+    async def create_change_request(self, short_description: str, description: str, **kwargs) -> Dict:
+        """Async variant of ServiceNowClient.create_change_request"""
+        return await self._call(self.client.create_change_request, short_description, description, **kwargs)
+
+    async def update_change_request(
+        self,
+        sys_id: str,
+        state: Optional[str] = None,
+        work_notes: Optional[str] = None,
+        **kwargs
+    ) -> Dict:
+        """Async variant of ServiceNowClient.update_change_request"""
+        return await self._call(
+            self.client.update_change_request, sys_id, state=state, work_notes=work_notes, **kwargs
+        )
+
+    # =========================================================================
+    # INCIDENT METHODS
+    # =========================================================================
+
+    async def create_incident(self, short_description: str, description: str, **kwargs) -> Dict:
+        """Async variant of ServiceNowClient.create_incident"""
+        return await self._call(self.client.create_incident, short_description, description, **kwargs)
+
+    async def update_incident(
+        self,
+        sys_id: str,
+        state: Optional[str] = None,
+        work_notes: Optional[str] = None,
+        **kwargs
+    ) -> Dict:
+        """Async variant of ServiceNowClient.update_incident"""
+        return await self._call(
+            self.client.update_incident, sys_id, state=state, work_notes=work_notes, **kwargs
+        )
+
+    # =========================================================================
+    # CMDB METHODS
+    # =========================================================================
+
+    async def create_vm_ci(self, name: str, **kwargs) -> Dict:
+        """Async variant of ServiceNowClient.create_vm_ci"""
+        return await self._call(self.client.create_vm_ci, name, **kwargs)
+
+    async def update_vm_ci(self, sys_id: str, **kwargs) -> Dict:
+        """Async variant of ServiceNowClient.update_vm_ci"""
+        return await self._call(self.client.update_vm_ci, sys_id, **kwargs)
+
+    async def update_vm_ci_by_name(self, name: str, **kwargs) -> Dict:
+        """Async variant of ServiceNowClient.update_vm_ci_by_name"""
+        return await self._call(self.client.update_vm_ci_by_name, name, **kwargs)
+
+    async def get_vm_ci_by_name(self, name: str) -> Dict:
+        """Async variant of ServiceNowClient.get_vm_ci_by_name"""
+        return await self._call(self.client.get_vm_ci_by_name, name)
+
+    async def get_vm_cis_by_names(
+        self,
+        names: List[str],
+        fields: Optional[List[str]] = None,
+        max_workers: int = 4,
+        use_index: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        Async variant of ServiceNowClient.get_vm_cis_by_names
+
+        Takes one concurrency slot; the chunk queries run on the client's
+        own threads, up to max_workers at a time.
+        """
+        return await self._call(
+            self.client.get_vm_cis_by_names, names, fields=fields, max_workers=max_workers, use_index=use_index
+        )
+
+    # =========================================================================
+    # BULK HELPERS
+    # =========================================================================
+
+    async def run_bulk(
+        self,
+        items: Iterable[Tuple[Any, Callable[[], Any]]]
+    ) -> List[Dict]:
+        """
+        Run many calls concurrently and collect per-item outcomes
+
+        A failing item never aborts the batch; its exception is captured
+        in the item's result entry instead.
+
+        Args:
+            items: (key, zero-argument coroutine factory) pairs
+
+        Returns:
+            List of {'item', 'success', 'result', 'error'} dictionaries in input order
+        """
+        keys = []
+        tasks = []
+        for key, factory in items:
+            keys.append(key)
+            tasks.append(factory())
+
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        failed = 0
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, Exception):
+                    raise outcome
+                failed += 1
+                results.append({'item': key, 'success': False, 'result': None, 'error': str(outcome)})
+            else:
+                results.append({'item': key, 'success': True, 'result': outcome, 'error': None})
+
+        logger.info(f"Bulk operation finished: {len(results) - failed} succeeded, {failed} failed")
+        return results
+
+    async def bulk_update_vm_ci(
+        self,
+        updates: Dict[str, Dict],
+        response_fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Update many VM CIs concurrently
+
+        Args:
+            updates: Mapping of CI sys_id to fields to update
+            response_fields: Fields returned per CI (default: sys_id and name;
+                an empty list returns full records)
+
+        Returns:
+            Per-item results keyed by sys_id
+        """
+        if response_fields is None:
+            response_fields = self.CI_RESPONSE_FIELDS
+        return await self.run_bulk(
+            (sys_id, lambda s=sys_id, f=fields: self.update_vm_ci(s, response_fields=response_fields, **f))
+            for sys_id, fields in updates.items()
+        )
+
+    async def bulk_create_vm_ci(
+        self,
+        records: List[Dict],
+        response_fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Create many VM CIs concurrently
+
+        Args:
+            records: create_vm_ci keyword arguments per CI (must include 'name')
+            response_fields: Fields returned per CI (default: sys_id and name;
+                an empty list returns full records)
+
+        Returns:
+            Per-item results keyed by CI name
+        """
+        if response_fields is None:
+            response_fields = self.CI_RESPONSE_FIELDS
+        return await self.run_bulk(
+            (record['name'], lambda r=record: self.create_vm_ci(response_fields=response_fields, **r))
+            for record in records
+        )
+
+    async def bulk_update_request_items(
+        self,
+        updates: Dict[str, Dict],
+        response_fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Update many request items concurrently
+
+        Args:
+            updates: Mapping of sys_id to update_request_item keyword arguments
+            response_fields: Fields returned per record (default: sys_id and number;
+                an empty list returns full records)
+
+        Returns:
+            Per-item results keyed by sys_id
+        """
+        if response_fields is None:
+            response_fields = self.TICKET_RESPONSE_FIELDS
+        return await self.run_bulk(
+            (sys_id, lambda s=sys_id, f=fields: self.update_request_item(s, response_fields=response_fields, **f))
+            for sys_id, fields in updates.items()
+        )
+
+    async def bulk_update_change_requests(
+        self,
+        updates: Dict[str, Dict],
+        response_fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Update many change requests concurrently
+
+        Args:
+            updates: Mapping of sys_id to update_change_request keyword arguments
+            response_fields: Fields returned per record (default: sys_id and number;
+                an empty list returns full records)
+
+        Returns:
+            Per-item results keyed by sys_id
+        """
+        if response_fields is None:
+            response_fields = self.TICKET_RESPONSE_FIELDS
+        return await self.run_bulk(
+            (sys_id, lambda s=sys_id, f=fields: self.update_change_request(s, response_fields=response_fields, **f))
+            for sys_id, fields in updates.items()
+        )
+
+    async def bulk_update_incidents(
+        self,
+        updates: Dict[str, Dict],
+        response_fields: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Update many incidents concurrently
+
+        Args:
+            updates: Mapping of sys_id to update_incident keyword arguments
+            response_fields: Fields returned per record (default: sys_id and number;
+                an empty list returns full records)
+
+        Returns:
+            Per-item results keyed by sys_id
+        """
+        if response_fields is None:
+            response_fields = self.TICKET_RESPONSE_FIELDS
+        return await self.run_bulk(
+            (sys_id, lambda s=sys_id, f=fields: self.update_incident(s, response_fields=response_fields, **f))
+            for sys_id, fields in updates.items()
+        )
+
+
+def _next_page(iterator: Iterator[Dict], size: int) -> List[Dict]:
+    """Take up to size records from a synchronous iterator"""
+    return list(itertools.islice(iterator, size))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+ServiceNow Batch API support for VM Automation Accelerator
+Coalesces many table operations into /api/now/v1/batch calls and
+demultiplexes the results back to each queued operation
+"""
+
+import json
+import base64
+import logging
+import itertools
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+
+class BatchOperationError(Exception):
+    """Raised when a single sub-request of a batch fails"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: Optional[Dict] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class BatchOperation:
+    """A table operation queued for a batch call"""
+
+    def __init__(
+        self,
+        operation_id: str,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None
+    ):
+        """
+        Initialize batch operation
+
+        Args:
+            operation_id: Sub-request id, unique within the batch
+            method: HTTP method (GET, POST, PUT, PATCH, DELETE)
+            endpoint: API endpoint relative to /api/now/<version> (e.g., table/incident/<sys_id>)
+            data: Request body data
+            params: Query parameters
+        """
+        self.id = operation_id
+        self.method = method.upper()
+        self.endpoint = endpoint
+        self.data = data
+        self.params = params
+        self.status_code: Optional[int] = None
+        self._response: Optional[Dict] = None
+        self._error: Optional[BatchOperationError] = None
+        self._done = False
+
+    def done(self) -> bool:
+        """Return True once the operation has a result or error"""
+        return self._done
+
+    def succeeded(self) -> bool:
+        """Return True if the operation completed with a 2xx status"""
+        return self._done and self._error is None
+
+    def result(self) -> Dict:
+        """
+        Get the operation result
+
+        Returns:
+            The 'result' payload of the sub-request response
+
+        Raises:
+            BatchOperationError: If the sub-request failed or has not been sent yet
+        """
+        if not self._done:
+            raise BatchOperationError(f"Batch operation {self.id} has not been sent")
+        if self._error is not None:
+            raise self._error
+        return (self._response or {}).get('result', {})
+
+    @property
+    def error(self) -> Optional[BatchOperationError]:
+        """Error of a failed operation, None otherwise"""
+        return self._error
+
+    def _set_response(self, status_code: int, body: Optional[Dict]):
+        self.status_code = status_code
+        self._done = True
+        if 200 <= status_code < 300:
+            self._response = body
+        else:
+            message = ((body or {}).get('error') or {}).get('message') or f"HTTP {status_code}"
+            self._error = BatchOperationError(
+                f"{self.method} {self.endpoint} failed: {message}", status_code, body
+            )
+
+    def _set_error(self, error: Exception):
+        self._done = True
+        self._error = error if isinstance(error, BatchOperationError) else BatchOperationError(str(error))
+
+
+class ServiceNowBatch:
+    """
+    Queue of table operations sent through the ServiceNow Batch REST API
+
+    Operations are packed into batch envelopes of at most ``max_batch_size``
+    sub-requests. Each sub-request succeeds or fails on its own; a failed
+    envelope only fails the operations it carried.
+
+    Example:
+        with client.batch(max_batch_size=100) as batch:
+            ops = [batch.update_record('cmdb_ci_vm_instance', sys_id, fields)
+                   for sys_id, fields in updates.items()]
+        failed = [op for op in ops if not op.succeeded()]
+    """
+
+    def __init__(self, client, max_batch_size: int = 50, max_unserviced_retries: int = 1):
+        """
+        Initialize batch queue
+
+        Args:
+            client: ServiceNowClient used to send batch envelopes
+            max_batch_size: Maximum sub-requests per batch envelope (default: 50)
+            max_unserviced_retries: Times to resend sub-requests the instance
+                reported as unserviced (default: 1)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_unserviced_retries = max_unserviced_retries
+        self._pending: List[BatchOperation] = []
+        self._ids = itertools.count(1)
+        self._batch_ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None
+    ) -> BatchOperation:
+        """
+        Queue an operation
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint relative to /api/now/<version>
+            data: Request body data
+            params: Query parameters
+
+        Returns:
+            BatchOperation that holds the result after flush()
+        """
+        operation = BatchOperation(str(next(self._ids)), method, endpoint, data, params)
+        self._pending.append(operation)
+        return operation
+
+    def create_record(
+        self,
+        table: str,
+        fields: Dict,
+        response_fields: Optional[List[str]] = None
+    ) -> BatchOperation:
+        """Queue a record creation (POST table/<table>)"""
+        return self.add("POST", f"table/{table}", data=fields, params=self.client._write_params(response_fields))
+
+    def update_record(
+        self,
+        table: str,
+        sys_id: str,
+        fields: Dict,
+        response_fields: Optional[List[str]] = None
+    ) -> BatchOperation:
+        """Queue a record update (PATCH table/<table>/<sys_id>)"""
+        return self.add(
+            "PATCH", f"table/{table}/{sys_id}", data=fields, params=self.client._write_params(response_fields)
+        )
+
+    def get_record(self, table: str, sys_id: str, params: Optional[Dict] = None) -> BatchOperation:
+        """Queue a record read (GET table/<table>/<sys_id>)"""
+        return self.add("GET", f"table/{table}/{sys_id}", params=params)
+
+    def flush(self) -> List[BatchOperation]:
+        """
+        Send all queued operations
+
+        Returns:
+            The operations that were sent, each holding its result or error
+        """
+        operations, self._pending = self._pending, []
+        queue = list(operations)
+        attempts = 0
+
+        while queue:
+            unserviced = []
+            for start in range(0, len(queue), self.max_batch_size):
+                unserviced.extend(self._send_envelope(queue[start:start + self.max_batch_size]))
+
+            if unserviced and attempts < self.max_unserviced_retries:
+                logger.warning(f"Resending {len(unserviced)} unserviced batch operations")
+                attempts += 1
+                queue = unserviced
+                continue
+
+            for operation in unserviced:
+                operation._set_error(BatchOperationError(
+                    f"{operation.method} {operation.endpoint} was not serviced by the batch API"
+                ))
+            break
+
+        failed = sum(1 for operation in operations if not operation.succeeded())
+        logger.info(f"Batch flush: {len(operations) - failed} succeeded, {failed} failed")
+        return operations
+
+    def _build_sub_request(self, operation: BatchOperation) -> Dict:
+        """Encode an operation as a batch rest_request entry"""
+        url = f"/api/now/{self.client.api_version}/{operation.endpoint}"
+        if operation.params:
+            url += f"?{urlencode(operation.params)}"
+
+        sub_request = {
+            'id': operation.id,
+            'method': operation.method,
+            'url': url,
+            'headers': [
+                {'name': 'Content-Type', 'value': 'application/json'},
+                {'name': 'Accept', 'value': 'application/json'},
+            ],
+        }
+        if operation.data is not None:
+            sub_request['body'] = base64.b64encode(json.dumps(operation.data).encode('utf-8')).decode('ascii')
+
+        return sub_request
+
+    def _send_envelope(self, operations: List[BatchOperation]) -> List[BatchOperation]:
+        """
+        Send one batch envelope and demultiplex its results
+
+        Args:
+            operations: Operations carried by this envelope
+
+        Returns:
+            Operations the instance reported as unserviced
+        """
+        by_id = {operation.id: operation for operation in operations}
+        batch_request_id = str(next(self._batch_ids))
+
+        try:
+            response = self.client.send_batch(
+                [self._build_sub_request(operation) for operation in operations],
+                batch_request_id=batch_request_id
+            )
+        except Exception as e:
+            logger.error(f"Batch envelope {batch_request_id} failed: {e}")
+            for operation in operations:
+                operation._set_error(e)
+            return []
+
+        for serviced in response.get('serviced_requests', []):
+            operation = by_id.pop(str(serviced.get('id')), None)
+            if operation is None:
+                continue
+            operation._set_response(int(serviced.get('status_code', 0)), _decode_body(serviced.get('body')))
+
+        unserviced_ids = {str(item.get('id') if isinstance(item, dict) else item)
+                          for item in response.get('unserviced_requests', [])}
+
+        # Anything the response did not mention is treated as unserviced
+        return [operation for operation_id, operation in by_id.items()
+                if operation_id in unserviced_ids or not operation.done()]
+
+
+def _decode_body(body: Optional[str]) -> Optional[Dict]:
+    """Decode a base64-encoded JSON sub-response body"""
+    if not body:
+        return None
+    try:
+        return json.loads(base64.b64decode(body))
+    except (ValueError, TypeError):
+        return {'raw': body}
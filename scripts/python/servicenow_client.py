@@ -5,30 +5,71 @@ Provides functions to create, update, and query ServiceNow records
 """
 
 import os
+import gzip
 import json
+import time
+import random
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib.parse import quote
+from urllib3.exceptions import NewConnectionError
+
+from servicenow_metrics import Instrumentation, shared_instrumentation
+from servicenow_resilience import CircuitBreaker, RateLimiter, shared_rate_limiter
+from servicenow_stream import iter_result_records
+from ticket_resolver import TicketResolver
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
 class ServiceNowClient:
     """ServiceNow REST API client for VM automation workflows"""
     
+    # Status codes that indicate a transient condition worth retrying
+    RETRY_STATUS_CODES = {429, 502, 503, 504}
+    
+    # Status codes for which the instance rejected the request before
+    # processing it, so a POST can be retried without creating duplicates
+    POST_RETRY_STATUS_CODES = {429, 503}
+    
+    # Methods that can be repeated without changing the outcome
+    IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE'}
+    
+    # Conservative URL length budget for generated IN-queries
+    MAX_URL_LENGTH = 2048
+    
+    # Fields set on every VM CI created by the accelerator
+    VM_CI_DEFAULTS = {
+        'vcenter_name': 'Azure',
+        'managed_by': 'cloud_infrastructure_team',
+        'operational_status': '1',  # Operational
+    }
+    
     def __init__(
         self,
         instance_url: str = None,
         username: str = None,
         password: str = None,
-        api_version: str = "v1"
+        api_version: str = "v1",
+        timeout: float = 30,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        response_fields: Optional[List[str]] = None,
+        exclude_reference_link: bool = False,
+        suppress_auto_sys_field: bool = False,
+        compress_requests: bool = False,
+        compress_min_bytes: int = 1024
     ):
         """
         Initialize ServiceNow client
@@ -38,6 +79,26 @@ class ServiceNowClient:
             username: ServiceNow username
             password: ServiceNow password
             api_version: API version (default: v1)
+            timeout: Per-request timeout in seconds (default: 30)
+            pool_size: Maximum keep-alive connections kept in the pool (default: 10)
+            max_retries: Retries for transient failures, 0 to disable (default: 3)
+            backoff_factor: Base delay in seconds for exponential backoff (default: 0.5)
+            max_backoff: Upper bound for a single retry delay in seconds (default: 30)
+            rate_limiter: Token-bucket limiter, share one instance between clients
+                to limit them together (default: from SERVICENOW_RATE_LIMIT, if set)
+            circuit_breaker: Circuit breaker that fails calls fast while the
+                instance is unhealthy (default: none)
+            instrumentation: Request metrics hooks, e.g. MetricsRecorder
+                (default: from SERVICENOW_METRICS, no-op when unset)
+            response_fields: Default fields returned by create/update calls,
+                e.g. ['sys_id', 'number'] (default: full record)
+            exclude_reference_link: Return reference fields of create/update
+                responses without their link URLs (default: False)
+            suppress_auto_sys_field: Do not update sys_updated_on/sys_mod_count
+                on writes; breaks sys_updated_on watermarks such as the CMDB
+                sync index refresh (default: False)
+            compress_requests: Gzip request bodies (default: False)
+            compress_min_bytes: Smallest body that is gzipped (default: 1024)
         """
         self.instance_url = instance_url or os.getenv('SERVICENOW_INSTANCE_URL')
         self.username = username or os.getenv('SERVICENOW_USERNAME')
@@ -54,8 +115,204 @@ class ServiceNowClient:
         self.auth = HTTPBasicAuth(self.username, self.password)
         self.headers = {
             "Content-Type": "application/json",
-            "Accept": "application/json"
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip"
         }
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.circuit_breaker = circuit_breaker
+        self.instrumentation = instrumentation or shared_instrumentation()
+        self.response_fields = response_fields
+        self.exclude_reference_link = exclude_reference_link
+        self.suppress_auto_sys_field = suppress_auto_sys_field
+        self.compress_requests = compress_requests
+        self.compress_min_bytes = compress_min_bytes
+        
+        # Pooled keep-alive session: connections (and TLS sessions) are
+        # reused across calls instead of being set up for every request
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # VM CI name -> record, filled by name lookups and CI writes so later
+        # updates by name skip the lookup round trip. Names in
+        # _partial_ci_names hold projected or since-updated records, which
+        # are only good for their sys_id and the fields they carry.
+        self.ci_name_index: Dict[str, Dict] = {}
+        self._partial_ci_names: Set[str] = set()
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+    
+    @property
+    def circuit_state(self) -> str:
+        """Circuit breaker state (closed, open, half_open); closed without a breaker"""
+        return self.circuit_breaker.state if self.circuit_breaker else CircuitBreaker.CLOSED
+    
+    def _instrument(
+        self,
+        method: str,
+        endpoint: str,
+        started: float,
+        response: Optional[requests.Response],
+        body: Optional[bytes],
+        stream: bool
+    ):
+        """Report one attempt to the instrumentation hooks"""
+        latency = time.perf_counter() - started
+        request_bytes = len(body) if body else 0
+        if response is not None:
+            # Content-Length is the size on the wire, i.e. after gzip
+            content_length = response.headers.get('Content-Length')
+            if content_length:
+                response_bytes = int(content_length)
+            else:
+                response_bytes = 0 if stream else len(response.content)
+            status_code = response.status_code
+        else:
+            response_bytes = 0
+            status_code = None
+        self.instrumentation.on_request(method, endpoint, status_code, latency, request_bytes, response_bytes)
+    
+    def _record_outcome(self, status_code: Optional[int]):
+        """Feed a call outcome to the circuit breaker"""
+        if not self.circuit_breaker:
+            return
+        if status_code is None or status_code in self.RETRY_STATUS_CODES or status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+    
+    def _index_ci(self, record: Dict, complete: bool, written: Iterable[str] = ()):
+        """
+        Add a VM CI record to the name index
+        
+        Args:
+            record: Record with at least name and sys_id
+            complete: Record is the full, current CI (not a projection)
+            written: Fields just written; an earlier entry's values for them are stale
+        """
+        name = record['name']
+        if complete:
+            self.ci_name_index[name] = record
+            self._partial_ci_names.discard(name)
+            return
+        existing = self.ci_name_index.get(name)
+        if existing is not None and existing.get('sys_id') == record['sys_id']:
+            stale = set(written)
+            record = {**{key: value for key, value in existing.items() if key not in stale}, **record}
+        self.ci_name_index[name] = record
+        self._partial_ci_names.add(name)
+    
+    def _write_params(self, response_fields: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Build the query parameters that shape create/update responses
+        
+        Args:
+            response_fields: Fields to return, None for the client default
+            
+        Returns:
+            sysparm_* parameters, None if the full record is wanted
+        """
+        fields = response_fields if response_fields is not None else self.response_fields
+        params = {}
+        if fields:
+            params['sysparm_fields'] = ','.join(fields)
+        if self.exclude_reference_link:
+            params['sysparm_exclude_reference_link'] = 'true'
+        if self.suppress_auto_sys_field:
+            params['sysparm_suppress_auto_sys_field'] = 'true'
+        return params or None
+    
+    def _encode_body(self, data: Optional[Dict]) -> Tuple[Optional[bytes], Optional[Dict]]:
+        """
+        Serialize a request body, gzipped when compression applies
+        
+        Args:
+            data: Request body data
+            
+        Returns:
+            Body bytes and extra headers
+        """
+        if data is None:
+            return None, None
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body, compresslevel=6), {'Content-Encoding': 'gzip'}
+        return body, None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _should_retry(
+        self,
+        method: str,
+        status_code: Optional[int] = None,
+        connect_error: bool = False
+    ) -> bool:
+        """
+        Decide whether a failed attempt may be retried
+        
+        GET/PATCH/PUT/DELETE are retried on transient status codes and any
+        connection error. POST is only retried when the request provably did
+        not reach the instance (connect errors) or was rejected up front
+        (429/503), so retries never create duplicate records.
+        
+        Args:
+            method: HTTP method
+            status_code: Response status code, None if no response was received
+            connect_error: True if the connection could not be established
+            
+        Returns:
+            True if the request should be retried
+        """
+        method = method.upper()
+        if method in self.IDEMPOTENT_METHODS:
+            return connect_error or status_code is None or status_code in self.RETRY_STATUS_CODES
+        
+        if connect_error:
+            return True
+        return status_code in self.POST_RETRY_STATUS_CODES
+    
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """
+        Compute delay before the next attempt
+        
+        Honors a Retry-After header (seconds or HTTP date) when present,
+        otherwise uses exponential backoff with full jitter.
+        
+        Args:
+            attempt: Zero-based retry attempt number
+            response: Failed response, if any
+            
+        Returns:
+            Delay in seconds
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = retry_at.timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.max_backoff)
+        
+        ceiling = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, ceiling)
     
     def _make_request(
         self,
@@ -76,28 +333,301 @@ class ServiceNowClient:
         Returns:
             API response as dictionary
         """
+        return self._send(method, endpoint, data=data, params=params).json()
+    
+    def _stream_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        chunk_size: int = 65536
+    ) -> Iterator[Dict]:
+        """
+        Make HTTP request and decode the 'result' array incrementally
+        
+        Records are yielded as they are decoded from the socket, so memory
+        use does not grow with the size of the response.
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint
+            data: Request body data
+            params: Query parameters
+            chunk_size: Bytes read from the socket at a time (default: 64 KiB)
+            
+        Yields:
+            Records of the response 'result' array (or the single result object)
+        """
+        response = self._send(method, endpoint, data=data, params=params, stream=True)
+        try:
+            yield from iter_result_records(response.iter_content(chunk_size=chunk_size))
+        finally:
+            response.close()
+    
+    def _send(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        stream: bool = False
+    ) -> requests.Response:
+        """
+        Send HTTP request with retries
+        
+        Args:
+            method: HTTP method (GET, POST, PUT, PATCH)
+            endpoint: API endpoint
+            data: Request body data
+            params: Query parameters
+            stream: Leave the body unread for incremental decoding
+            
+        Returns:
+            Successful response
+        """
         url = f"{self.base_url}/{endpoint}"
+        body, headers = self._encode_body(data)
+        attempt = 0
+        instrumented = self.instrumentation.enabled
+        
+        while True:
+            if self.circuit_breaker:
+                self.circuit_breaker.before_call()
+            
+            response = None
+            started = 0.0
+            try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(endpoint)
+                if instrumented:
+                    started = time.perf_counter()
+                try:
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        data=body,
+                        headers=headers,
+                        params=params,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+                finally:
+                    if instrumented:
+                        self._instrument(method, endpoint, started, response, body, stream)
+                self._record_outcome(response.status_code)
+                response.raise_for_status()
+                return response
+                
+            except requests.exceptions.HTTPError as e:
+                throttled = response.status_code == 429 and self.rate_limiter is not None
+                retry = attempt < self.max_retries and self._should_retry(method, response.status_code)
+                if throttled or retry:
+                    delay = self._retry_delay(attempt, response)
+                if throttled:
+                    # Back off every caller sharing the limiter, not just this one;
+                    # the retry then waits in rate_limiter.acquire()
+                    self.rate_limiter.pause(endpoint, delay)
+                if retry:
+                    response.close()
+                    if instrumented:
+                        self.instrumentation.on_retry(method, endpoint, str(response.status_code))
+                    logger.warning(
+                        f"{method} {endpoint} returned {response.status_code}, "
+                        f"retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})"
+                    )
+                    if not throttled:
+                        time.sleep(delay)
+                    attempt += 1
+                    continue
+                logger.error(f"HTTP error: {e}")
+                logger.error(f"Response: {e.response.text}")
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record_outcome(None)
+                # Only a failed connect guarantees the request never reached the instance
+                reason = getattr(e.args[0], 'reason', None) if e.args else None
+                connect_error = (
+                    isinstance(e, requests.exceptions.ConnectTimeout)
+                    or isinstance(reason, NewConnectionError)
+                )
+                if attempt < self.max_retries and self._should_retry(method, connect_error=connect_error):
+                    delay = self._retry_delay(attempt)
+                    if instrumented:
+                        self.instrumentation.on_retry(method, endpoint, type(e).__name__)
+                    logger.warning(
+                        f"{method} {endpoint} failed ({e}), "
+                        f"retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})"
+                    )
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                logger.error(f"Request error: {e}")
+                raise
+            except requests.exceptions.RequestException as e:
+                # Truncated or undecodable bodies, redirect loops, ...: still a
+                # failed call, and a half-open probe must not stay outstanding
+                self._record_outcome(None)
+                logger.error(f"Request error: {e}")
+                raise
+            except BaseException:
+                # Raised before any outcome was recorded (rate limiter,
+                # instrumentation, interrupts); free the probe slot
+                if self.circuit_breaker:
+                    self.circuit_breaker.release_probe()
+                raise
+    
+    # =========================================================================
+    # BATCH API METHODS
+    # =========================================================================
+    
+    def send_batch(self, rest_requests: List[Dict], batch_request_id: str = "1") -> Dict:
+        """
+        Send one envelope to the ServiceNow Batch REST API
         
+        Args:
+            rest_requests: Encoded sub-requests (id, method, url, headers, base64 body)
+            batch_request_id: Identifier echoed back by the instance
+            
+        Returns:
+            Batch response with serviced_requests and unserviced_requests
+        """
+        logger.info(f"Sending batch {batch_request_id} with {len(rest_requests)} requests")
+        data = {
+            'batch_request_id': batch_request_id,
+            'rest_requests': rest_requests
+        }
+        return self._make_request("POST", "batch", data=data)
+    
+    def batch(self, max_batch_size: int = 50, max_unserviced_retries: int = 1):
+        """
+        Create a queue of table operations sent through the Batch API
+        
+        Args:
+            max_batch_size: Maximum sub-requests per batch envelope (default: 50)
+            max_unserviced_retries: Times to resend unserviced sub-requests (default: 1)
+            
+        Returns:
+            ServiceNowBatch bound to this client
+        """
+        from servicenow_batch import ServiceNowBatch
+        return ServiceNowBatch(self, max_batch_size, max_unserviced_retries)
+    
+    # =========================================================================
+    # TABLE ITERATION METHODS
+    # =========================================================================
+    
+    def _fetch_page(self, table: str, params: Dict) -> List[Dict]:
+        """
+        Fetch one page of table records
+        
+        Args:
+            table: Table name
+            params: Query parameters including paging
+            
+        Returns:
+            Records on the page
+        """
+        response = self._make_request("GET", f"table/{table}", params=params)
+        return response.get('result', [])
+    
+    def iter_table(
+        self,
+        table: str,
+        query: str = "",
+        fields: Optional[List[str]] = None,
+        page_size: int = 1000,
+        exclude_reference_link: bool = True,
+        keyset: bool = False,
+        prefetch: bool = True,
+        stream: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Stream table records page by page
+        
+        At most two pages are held in memory: the one being consumed and,
+        with prefetch enabled, the next one being fetched in the background.
+        
+        Args:
+            table: Table name (e.g., cmdb_ci_vm_instance)
+            query: Encoded query (sysparm_query)
+            fields: Fields to return (sysparm_fields), None for all
+            page_size: Records per request (default: 1000)
+            exclude_reference_link: Drop reference link objects (default: True)
+            keyset: Page on sys_id instead of sysparm_offset; stable and fast
+                for very large tables, ignores any ORDERBY in query
+            prefetch: Fetch the next page while the current one is consumed
+            stream: Decode each page incrementally from the socket instead of
+                loading it whole; allows large pages with flat memory use,
+                pages are then fetched sequentially (no prefetch)
+            
+        Yields:
+            Table records
+        """
+        logger.info(f"Iterating table {table} (query: {query or 'all'})")
+        
+        base_params = {
+            'sysparm_limit': page_size,
+            'sysparm_exclude_reference_link': str(exclude_reference_link).lower()
+        }
+        if fields:
+            if keyset and 'sys_id' not in fields:
+                fields = list(fields) + ['sys_id']
+            base_params['sysparm_fields'] = ','.join(fields)
+        
+        def page_params(offset: int, last_sys_id: Optional[str]) -> Dict:
+            params = dict(base_params)
+            if keyset:
+                clauses = [query] if query else []
+                if last_sys_id:
+                    clauses.append(f"sys_id>{last_sys_id}")
+                clauses.append("ORDERBYsys_id")
+                params['sysparm_query'] = '^'.join(clauses)
+            else:
+                if query:
+                    params['sysparm_query'] = query
+                params['sysparm_offset'] = offset
+            return params
+        
+        if stream:
+            offset = 0
+            last_sys_id = None
+            while True:
+                count = 0
+                for record in self._stream_request("GET", f"table/{table}", params=page_params(offset, last_sys_id)):
+                    count += 1
+                    last_sys_id = record.get('sys_id')
+                    yield record
+                if count < page_size:
+                    return
+                offset += count
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                auth=self.auth,
-                headers=self.headers,
-                json=data,
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+            offset = 0
+            params = page_params(offset, None)
+            pending = executor.submit(self._fetch_page, table, params) if executor else None
             
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP error: {e}")
-            logger.error(f"Response: {e.response.text}")
-            raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request error: {e}")
-            raise
+            while True:
+                page = pending.result() if executor else self._fetch_page(table, params)
+                pending = None
+                
+                more = len(page) >= page_size
+                if more:
+                    offset += len(page)
+                    params = page_params(offset, page[-1].get('sys_id'))
+                    if executor:
+                        pending = executor.submit(self._fetch_page, table, params)
+                
+                yield from page
+                
+                if not more:
+                    break
+        finally:
+            if executor:
+                if pending:
+                    pending.cancel()
+                executor.shutdown(wait=False)
     
     # =========================================================================
     # REQUEST ITEM METHODS
@@ -113,7 +643,7 @@ class ServiceNowClient:
         Returns:
             Request item record
         """
-        logger.info(f"Getting request item: {sys_id}")
+        logger.info("Getting request item: %s", sys_id)
         response = self._make_request("GET", f"table/sc_req_item/{sys_id}")
         return response.get('result', {})
     
@@ -122,7 +652,8 @@ class ServiceNowClient:
         sys_id: str,
         state: Optional[str] = None,
         work_notes: Optional[str] = None,
-        additional_fields: Optional[Dict] = None
+        additional_fields: Optional[Dict] = None,
+        response_fields: Optional[List[str]] = None
     ) -> Dict:
         """
         Update request item
@@ -132,11 +663,12 @@ class ServiceNowClient:
             state: New state (e.g., '2' for In Progress, '3' for Closed Complete)
             work_notes: Work notes to add
             additional_fields: Additional fields to update
+            response_fields: Fields to return (default: client response_fields)
             
         Returns:
             Updated request item record
         """
-        logger.info(f"Updating request item: {sys_id}")
+        logger.info("Updating request item: %s", sys_id)
         
         data = {}
         if state:
@@ -146,7 +678,9 @@ class ServiceNowClient:
         if additional_fields:
             data.update(additional_fields)
         
-        response = self._make_request("PATCH", f"table/sc_req_item/{sys_id}", data=data)
+        response = self._make_request(
+            "PATCH", f"table/sc_req_item/{sys_id}", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
     def get_request_item_by_number(self, number: str) -> Dict:
@@ -159,7 +693,7 @@ class ServiceNowClient:
         Returns:
             Request item record
         """
-        logger.info(f"Getting request item by number: {number}")
+        logger.info("Getting request item by number: %s", number)
         params = {'sysparm_query': f'number={number}', 'sysparm_limit': 1}
         response = self._make_request("GET", "table/sc_req_item", params=params)
         results = response.get('result', [])
@@ -178,6 +712,7 @@ class ServiceNowClient:
         impact: str = "3",
         priority: str = "3",
         assignment_group: str = "cloud_infrastructure_team",
+        response_fields: Optional[List[str]] = None,
         **kwargs
     ) -> Dict:
         """
@@ -191,12 +726,13 @@ class ServiceNowClient:
             impact: Impact (1=High, 2=Medium, 3=Low)
             priority: Priority (1=Critical, 2=High, 3=Moderate, 4=Low)
             assignment_group: Assignment group
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Additional fields
             
         Returns:
             Created change request record
         """
-        logger.info(f"Creating change request: {short_description}")
+        logger.info("Creating change request: %s", short_description)
         
         data = {
             'short_description': short_description,
@@ -209,7 +745,9 @@ class ServiceNowClient:
             **kwargs
         }
         
-        response = self._make_request("POST", "table/change_request", data=data)
+        response = self._make_request(
+            "POST", "table/change_request", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
     def update_change_request(
@@ -217,6 +755,7 @@ class ServiceNowClient:
         sys_id: str,
         state: Optional[str] = None,
         work_notes: Optional[str] = None,
+        response_fields: Optional[List[str]] = None,
         **kwargs
     ) -> Dict:
         """
@@ -226,12 +765,13 @@ class ServiceNowClient:
             sys_id: ServiceNow sys_id
             state: New state
             work_notes: Work notes
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Additional fields
             
         Returns:
             Updated change request record
         """
-        logger.info(f"Updating change request: {sys_id}")
+        logger.info("Updating change request: %s", sys_id)
         
         data = {}
         if state:
@@ -240,7 +780,9 @@ class ServiceNowClient:
             data['work_notes'] = work_notes
         data.update(kwargs)
         
-        response = self._make_request("PATCH", f"table/change_request/{sys_id}", data=data)
+        response = self._make_request(
+            "PATCH", f"table/change_request/{sys_id}", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
     # =========================================================================
@@ -255,6 +797,7 @@ class ServiceNowClient:
         impact: str = "3",
         priority: str = "3",
         assignment_group: str = "cloud_infrastructure_team",
+        response_fields: Optional[List[str]] = None,
         **kwargs
     ) -> Dict:
         """
@@ -267,12 +810,13 @@ class ServiceNowClient:
             impact: Impact (1=High, 2=Medium, 3=Low)
             priority: Priority (auto-calculated from urgency + impact)
             assignment_group: Assignment group
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Additional fields
             
         Returns:
             Created incident record
         """
-        logger.info(f"Creating incident: {short_description}")
+        logger.info("Creating incident: %s", short_description)
         
         data = {
             'short_description': short_description,
@@ -284,7 +828,9 @@ class ServiceNowClient:
             **kwargs
         }
         
-        response = self._make_request("POST", "table/incident", data=data)
+        response = self._make_request(
+            "POST", "table/incident", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
     def update_incident(
@@ -292,6 +838,7 @@ class ServiceNowClient:
         sys_id: str,
         state: Optional[str] = None,
         work_notes: Optional[str] = None,
+        response_fields: Optional[List[str]] = None,
         **kwargs
     ) -> Dict:
         """
@@ -301,12 +848,13 @@ class ServiceNowClient:
             sys_id: ServiceNow sys_id
             state: New state
             work_notes: Work notes
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Additional fields
             
         Returns:
             Updated incident record
         """
-        logger.info(f"Updating incident: {sys_id}")
+        logger.info("Updating incident: %s", sys_id)
         
         data = {}
         if state:
@@ -315,7 +863,9 @@ class ServiceNowClient:
             data['work_notes'] = work_notes
         data.update(kwargs)
         
-        response = self._make_request("PATCH", f"table/incident/{sys_id}", data=data)
+        response = self._make_request(
+            "PATCH", f"table/incident/{sys_id}", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
     # =========================================================================
@@ -334,6 +884,7 @@ class ServiceNowClient:
         location: str,
         cost_center: str,
         owned_by: str,
+        response_fields: Optional[List[str]] = None,
         **kwargs
     ) -> Dict:
         """
@@ -350,17 +901,17 @@ class ServiceNowClient:
             location: Azure region
             cost_center: Cost center
             owned_by: Owner user sys_id
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Additional fields
             
         Returns:
             Created CI record
         """
-        logger.info(f"Creating VM CI: {name}")
+        logger.info("Creating VM CI: %s", name)
         
         data = {
             'name': name,
             'vm_inst_id': vm_inst_id,
-            'vcenter_name': 'Azure',
             'environment': environment,
             'os': os,
             'cpu_count': cpu_count,
@@ -369,28 +920,59 @@ class ServiceNowClient:
             'location': location,
             'cost_center': cost_center,
             'owned_by': owned_by,
-            'managed_by': 'cloud_infrastructure_team',
-            'operational_status': '1',  # Operational
+            **self.VM_CI_DEFAULTS,
             **kwargs
         }
         
-        response = self._make_request("POST", "table/cmdb_ci_vm_instance", data=data)
+        response = self._make_request(
+            "POST", "table/cmdb_ci_vm_instance", data=data, params=self._write_params(response_fields)
+        )
         return response.get('result', {})
     
-    def update_vm_ci(self, sys_id: str, **kwargs) -> Dict:
+    def update_vm_ci(self, sys_id: str, response_fields: Optional[List[str]] = None, **kwargs) -> Dict:
         """
         Update VM configuration item
         
         Args:
             sys_id: CI sys_id
+            response_fields: Fields to return (default: client response_fields)
             **kwargs: Fields to update
             
         Returns:
             Updated CI record
         """
-        logger.info(f"Updating VM CI: {sys_id}")
-        response = self._make_request("PATCH", f"table/cmdb_ci_vm_instance/{sys_id}", data=kwargs)
-        return response.get('result', {})
+        logger.info("Updating VM CI: %s", sys_id)
+        response = self._make_request(
+            "PATCH", f"table/cmdb_ci_vm_instance/{sys_id}", data=kwargs,
+            params=self._write_params(response_fields)
+        )
+        result = response.get('result', {})
+        if result.get('name') and result.get('sys_id'):
+            # Only a full response is the complete CI; a projection just
+            # refreshes the fields it carries
+            projected = response_fields if response_fields is not None else self.response_fields
+            self._index_ci(result, complete=not projected, written=kwargs)
+        return result
+    
+    def update_vm_ci_by_name(self, name: str, response_fields: Optional[List[str]] = None, **kwargs) -> Dict:
+        """
+        Update VM configuration item identified by name
+        
+        Uses the CI name index when the CI was already looked up, otherwise
+        resolves the name first.
+        
+        Args:
+            name: VM name
+            response_fields: Fields to return (default: client response_fields)
+            **kwargs: Fields to update
+            
+        Returns:
+            Updated CI record, empty if no CI has that name
+        """
+        record = self.ci_name_index.get(name) or self.get_vm_ci_by_name(name)
+        if not record:
+            return {}
+        return self.update_vm_ci(record['sys_id'], response_fields=response_fields, **kwargs)
     
     def get_vm_ci_by_name(self, name: str) -> Dict:
         """
@@ -402,65 +984,276 @@ class ServiceNowClient:
         Returns:
             CI record
         """
-        logger.info(f"Getting VM CI by name: {name}")
+        logger.info("Getting VM CI by name: %s", name)
         params = {'sysparm_query': f'name={name}', 'sysparm_limit': 1}
         response = self._make_request("GET", "table/cmdb_ci_vm_instance", params=params)
         results = response.get('result', [])
+        if results:
+            self._index_ci(results[0], complete=True)
         return results[0] if results else {}
+    
+    def _chunk_names_for_query(self, names: List[str], field: str, endpoint: str) -> List[List[str]]:
+        """
+        Split names into IN-query chunks that keep the request URL under MAX_URL_LENGTH
+        
+        Args:
+            names: Values for the IN clause
+            field: Field name queried
+            endpoint: API endpoint queried
+            
+        Returns:
+            Chunks of names
+        """
+        # URL prefix plus room for the other sysparm_* parameters
+        budget = self.MAX_URL_LENGTH - len(f"{self.base_url}/{endpoint}?sysparm_query={field}IN") - 200
+        chunks, current, length = [], [], 0
+        for name in names:
+            encoded = len(quote(name, safe='')) + 3  # encoded comma separator
+            if current and length + encoded > budget:
+                chunks.append(current)
+                current, length = [], 0
+            current.append(name)
+            length += encoded
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def get_vm_cis_by_names(
+        self,
+        names: List[str],
+        fields: Optional[List[str]] = None,
+        max_workers: int = 4,
+        use_index: bool = True
+    ) -> Dict[str, Dict]:
+        """
+        Look up many VM CIs by name with chunked nameIN queries
+        
+        Chunks run concurrently and every CI found is added to the CI name
+        index, so update_vm_ci_by_name() needs no further lookup. Each chunk
+        is paged to the end, so duplicate CI names cannot crowd other names
+        out of the result; of several CIs sharing a name, the one updated
+        last (then highest sys_id) is returned.
+        
+        Args:
+            names: VM names
+            fields: Fields to return (must include name and sys_id to feed
+                the index), None for all
+            max_workers: Chunks queried concurrently (default: 4)
+            use_index: Serve names already in the index without a query when
+                the indexed record has the requested fields (all fields if None)
+            
+        Returns:
+            Mapping of VM name to CI record for the CIs that exist
+        """
+        found = {}
+        pending = []
+        for name in dict.fromkeys(names):
+            indexed = self.ci_name_index.get(name) if use_index else None
+            if indexed is not None and (
+                all(field in indexed for field in fields) if fields
+                else name not in self._partial_ci_names
+            ):
+                found[name] = indexed
+            elif ',' in name:
+                # Commas cannot be expressed inside an IN list
+                record = self.get_vm_ci_by_name(name)
+                if record:
+                    found[name] = record
+            else:
+                pending.append(name)
+        
+        if not pending:
+            return found
+        
+        endpoint = "table/cmdb_ci_vm_instance"
+        chunks = self._chunk_names_for_query(pending, 'name', endpoint)
+        logger.info(f"Looking up {len(pending)} VM CIs by name in {len(chunks)} queries")
+        
+        query_fields = None
+        if fields:
+            query_fields = list(fields) + [field for field in ('sys_id', 'sys_updated_on') if field not in fields]
+        
+        def fetch(chunk: List[str]) -> List[Dict]:
+            # One spare row keeps a chunk without duplicates to a single page
+            return list(self.iter_table(
+                "cmdb_ci_vm_instance",
+                query=f"nameIN{','.join(chunk)}",
+                fields=query_fields,
+                page_size=len(chunk) + 1,
+                exclude_reference_link=False,
+                keyset=True,
+                prefetch=False
+            ))
+        
+        def recency(record: Dict) -> Tuple[str, str]:
+            return (record.get('sys_updated_on') or '', record.get('sys_id') or '')
+        
+        requested = set(pending)
+        latest: Dict[str, Dict] = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            for records in executor.map(fetch, chunks):
+                for record in records:
+                    name = record.get('name')
+                    if name not in requested:
+                        continue
+                    if name not in latest or recency(record) > recency(latest[name]):
+                        latest[name] = record
+        
+        for name, record in latest.items():
+            if fields:
+                record = {field: value for field, value in record.items() if field in fields}
+            found[name] = record
+            if 'sys_id' in record:
+                self._index_ci(record, complete=not fields)
+        
+        return found
 
 
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
 
+def build_pipeline_work_notes(
+    pipeline_name: str,
+    status: str,
+    details: Optional[str] = None
+) -> str:
+    """
+    Build the work note text for a pipeline status update
+    
+    Args:
+        pipeline_name: Name of the pipeline
+        status: Status (Started, In Progress, Completed, Failed)
+        details: Additional details
+        
+    Returns:
+        Work note text, timestamped now
+    """
+    work_notes = f"Azure DevOps Pipeline: {pipeline_name}\nStatus: {status}"
+    if details:
+        work_notes += f"\n\nDetails:\n{details}"
+    work_notes += f"\n\nTimestamp: {datetime.utcnow().isoformat()}Z"
+    return work_notes
+
+
+def pipeline_ticket_state(ticket_number: str, status: str) -> Optional[str]:
+    """
+    Map a pipeline status to a ticket state
+    
+    Only request items change state; other tickets only receive work notes.
+    
+    Args:
+        ticket_number: ServiceNow ticket number
+        status: Pipeline status
+        
+    Returns:
+        State value, or None to leave the state unchanged
+    """
+    if not ticket_number.startswith('RITM'):
+        return None
+    if status in ['Started', 'In Progress']:
+        return '2'
+    if status == 'Completed':
+        return '3'
+    return None
+
+
+def apply_ticket_update(
+    client: ServiceNowClient,
+    resolver: TicketResolver,
+    ticket_number: str,
+    work_notes: str,
+    state: Optional[str] = None
+) -> bool:
+    """
+    Write work notes (and state) to a ticket identified by number
+    
+    Args:
+        client: ServiceNow client
+        resolver: Ticket number resolver
+        ticket_number: ServiceNow ticket number (RITM/CHG/INC)
+        work_notes: Work notes to add
+        state: New state, request items only
+        
+    Returns:
+        True if the ticket was found and updated, False if it does not exist
+    """
+    # The updated record is not used, so only its identifiers are sent back
+    fields = ['sys_id', 'number']
+    for attempt in range(2):
+        sys_id = resolver.resolve(ticket_number)
+        if not sys_id:
+            return False
+        try:
+            if ticket_number.startswith('RITM'):
+                client.update_request_item(sys_id, state=state, work_notes=work_notes, response_fields=fields)
+            elif ticket_number.startswith('CHG'):
+                client.update_change_request(sys_id, work_notes=work_notes, response_fields=fields)
+            elif ticket_number.startswith('INC'):
+                client.update_incident(sys_id, work_notes=work_notes, response_fields=fields)
+            return True
+        except requests.exceptions.HTTPError as e:
+            # A stale cached sys_id is dropped and resolved once more
+            if attempt == 0 and e.response is not None and e.response.status_code == 404:
+                resolver.invalidate(ticket_number)
+                continue
+            raise
+    return False
+
+
 def update_pipeline_status(
     ticket_number: str,
     pipeline_name: str,
     status: str,
-    details: Optional[str] = None
+    details: Optional[str] = None,
+    write_behind: bool = False
 ) -> bool:
     """
     Update ServiceNow ticket with pipeline status
     
+    Ticket sys_ids are cached; set SERVICENOW_TICKET_CACHE to a file path
+    to share the cache between pipeline-step processes.
+    
+    In write-behind mode the update is appended to the local status spool
+    (SERVICENOW_STATUS_SPOOL) and the call returns immediately; the spool
+    flusher delivers it later.
+    
     Args:
         ticket_number: ServiceNow ticket number (RITM/CHG/INC)
         pipeline_name: Name of the pipeline
         status: Status (Started, In Progress, Completed, Failed)
         details: Additional details
+        write_behind: Spool the update instead of sending it now
         
     Returns:
-        True if successful, False otherwise
+        True if successful (or spooled), False otherwise
     """
+    work_notes = build_pipeline_work_notes(pipeline_name, status, details)
+    state = pipeline_ticket_state(ticket_number, status)
+    
+    if write_behind:
+        from status_spool import StatusSpool
+        try:
+            with StatusSpool() as spool:
+                spool.append(ticket_number, work_notes, state)
+            logger.info("Spooled status %s for ticket %s", status, ticket_number)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to spool ServiceNow update: {e}")
+            return False
+    
     try:
-        client = ServiceNowClient()
-        
-        work_notes = f"Azure DevOps Pipeline: {pipeline_name}\nStatus: {status}"
-        if details:
-            work_notes += f"\n\nDetails:\n{details}"
-        work_notes += f"\n\nTimestamp: {datetime.utcnow().isoformat()}Z"
-        
-        # Determine ticket type and get record
-        if ticket_number.startswith('RITM'):
-            record = client.get_request_item_by_number(ticket_number)
-            if record:
-                state = '2' if status in ['Started', 'In Progress'] else '3' if status == 'Completed' else None
-                client.update_request_item(record['sys_id'], state=state, work_notes=work_notes)
-        elif ticket_number.startswith('CHG'):
-            # Handle change request
-            params = {'sysparm_query': f'number={ticket_number}', 'sysparm_limit': 1}
-            response = client._make_request("GET", "table/change_request", params=params)
-            results = response.get('result', [])
-            if results:
-                client.update_change_request(results[0]['sys_id'], work_notes=work_notes)
-        elif ticket_number.startswith('INC'):
-            # Handle incident
-            params = {'sysparm_query': f'number={ticket_number}', 'sysparm_limit': 1}
-            response = client._make_request("GET", "table/incident", params=params)
-            results = response.get('result', [])
-            if results:
-                client.update_incident(results[0]['sys_id'], work_notes=work_notes)
-        
-        logger.info(f"Updated ticket {ticket_number} with status: {status}")
+        # One pooled session serves both the lookup and the update
+        with ServiceNowClient() as client:
+            # Resolve the ticket number through the shared cache so repeated
+            # status updates for the same ticket skip the lookup
+            with TicketResolver(
+                client,
+                cache_path=os.getenv('SERVICENOW_TICKET_CACHE')
+            ) as resolver:
+                apply_ticket_update(client, resolver, ticket_number, work_notes, state)
+        
+        logger.info("Updated ticket %s with status: %s", ticket_number, status)
         return True
         
     except Exception as e:
@@ -468,7 +1261,7 @@ def update_pipeline_status(
         return False
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Example usage"""
     import argparse
     
@@ -477,18 +1270,26 @@ def main():
     parser.add_argument('--status', required=True, help='Status')
     parser.add_argument('--pipeline', required=True, help='Pipeline name')
     parser.add_argument('--details', help='Additional details')
+    parser.add_argument(
+        '--write-behind',
+        action='store_true',
+        help='Append the update to the local status spool and return immediately'
+    )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     success = update_pipeline_status(
         ticket_number=args.ticket,
         pipeline_name=args.pipeline,
         status=args.status,
-        details=args.details
+        details=args.details,
+        write_behind=args.write_behind
     )
     
     exit(0 if success else 1)
 
 
 if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
     main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for ServiceNowClient
+Drives CI updates through the single, pooled, async and batch client modes
+against the local stand-in (or another instance) and reports throughput and
+p50/p99 latency per mode
+"""
+
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import itertools
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ('single', 'pooled', 'async', 'batch')
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile
+
+    Args:
+        samples: Values
+        q: Percentile in [0, 100]
+
+    Returns:
+        Percentile value, None for no samples
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _report(mode: str, operations: int, elapsed: float, latencies: List[float], errors: int, requests: int) -> Dict:
+    return {
+        'mode': mode,
+        'operations': operations,
+        'errors': errors,
+        'http_requests': requests,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_ops_s': round(operations / elapsed, 1) if elapsed else None,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+
+
+def run_single(instance_url: str, sys_ids: List[str], client_options: Dict) -> Dict:
+    """One client (and connection) per operation, as before connection pooling"""
+    from servicenow_client import ServiceNowClient
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for index, sys_id in enumerate(sys_ids):
+        op_started = time.perf_counter()
+        try:
+            with ServiceNowClient(instance_url, **client_options) as client:
+                client.update_vm_ci(sys_id, comments=f'loadtest {index}')
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - op_started)
+    return _report('single', len(sys_ids), time.perf_counter() - started, latencies, errors, len(sys_ids))
+
+
+def run_pooled(instance_url: str, sys_ids: List[str], client_options: Dict) -> Dict:
+    """One pooled keep-alive client, sequential operations"""
+    from servicenow_client import ServiceNowClient
+
+    latencies, errors = [], 0
+    with ServiceNowClient(instance_url, **client_options) as client:
+        started = time.perf_counter()
+        for index, sys_id in enumerate(sys_ids):
+            op_started = time.perf_counter()
+            try:
+                client.update_vm_ci(sys_id, comments=f'loadtest {index}')
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - op_started)
+        elapsed = time.perf_counter() - started
+    return _report('pooled', len(sys_ids), elapsed, latencies, errors, len(sys_ids))
+
+
+def run_async(instance_url: str, sys_ids: List[str], client_options: Dict, concurrency: int) -> Dict:
+    """AsyncServiceNowClient with bounded concurrency"""
+    from servicenow_async_client import AsyncServiceNowClient
+
+    latencies: List[float] = []
+
+    def timed(client, index, sys_id):
+        # Timed inside the worker so latency excludes the wait for a concurrency slot
+        op_started = time.perf_counter()
+        try:
+            return client.update_vm_ci(sys_id, comments=f'loadtest {index}')
+        finally:
+            latencies.append(time.perf_counter() - op_started)
+
+    async def run():
+        async with AsyncServiceNowClient(
+            instance_url, max_concurrency=concurrency, **client_options
+        ) as client:
+            return await client.run_bulk(
+                (sys_id, lambda i=index, s=sys_id: client._call(timed, client.client, i, s))
+                for index, sys_id in enumerate(sys_ids)
+            )
+
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for result in results if not result['success'])
+    return _report('async', len(sys_ids), elapsed, latencies, errors, len(sys_ids))
+
+
+def run_batch(instance_url: str, sys_ids: List[str], client_options: Dict, batch_size: int) -> Dict:
+    """Batch API envelopes of batch_size sub-requests"""
+    from servicenow_client import ServiceNowClient
+
+    latencies, errors, envelopes = [], 0, 0
+    with ServiceNowClient(instance_url, **client_options) as client:
+        started = time.perf_counter()
+        for start in range(0, len(sys_ids), batch_size):
+            chunk = sys_ids[start:start + batch_size]
+            batch = client.batch(max_batch_size=batch_size)
+            operations = [
+                batch.update_record('cmdb_ci_vm_instance', sys_id, {'comments': f'loadtest {start + offset}'})
+                for offset, sys_id in enumerate(chunk)
+            ]
+            envelope_started = time.perf_counter()
+            batch.flush()
+            envelope_latency = time.perf_counter() - envelope_started
+            envelopes += 1
+            # Every operation in the envelope completes when the envelope does
+            latencies.extend([envelope_latency] * len(chunk))
+            errors += sum(1 for operation in operations if not operation.succeeded())
+        elapsed = time.perf_counter() - started
+    return _report('batch', len(sys_ids), elapsed, latencies, errors, envelopes)
+
+
+def run_load_test(
+    modes: List[str] = MODES,
+    operations: int = 500,
+    concurrency: int = 16,
+    batch_size: int = 50,
+    instance_url: Optional[str] = None,
+    server_options: Optional[Dict] = None,
+    client_options: Optional[Dict] = None
+) -> List[Dict]:
+    """
+    Run the load test in each mode
+
+    Args:
+        modes: Client modes to run (single, pooled, async, batch)
+        operations: CI updates per mode
+        concurrency: Concurrent requests for async mode
+        batch_size: Sub-requests per envelope for batch mode
+        instance_url: Existing instance or stand-in URL; None starts a local stand-in
+        server_options: StandInServer fault/latency options for the local stand-in
+        client_options: Extra ServiceNowClient options (max_retries, timeout,
+            response_fields, compress_requests, ...); against an existing
+            instance, credentials come from these or the environment
+
+    Returns:
+        One report per mode
+    """
+    from servicenow_client import ServiceNowClient
+    from servicenow_metrics import MetricsRecorder
+
+    server = None
+    client_options = dict(client_options or {})
+    if instance_url is None:
+        from servicenow_standin import StandInServer
+        server = StandInServer(**(server_options or {})).start()
+        instance_url = server.url
+        # The stand-in accepts any credentials
+        client_options.setdefault('username', 'loadtest')
+        client_options.setdefault('password', 'loadtest')
+        sys_ids = [record['sys_id'] for record in server.seed('cmdb_ci_vm_instance', operations)]
+    else:
+        credentials = {key: client_options[key] for key in ('username', 'password') if key in client_options}
+        with ServiceNowClient(instance_url, **credentials) as client:
+            records = client.iter_table('cmdb_ci_vm_instance', fields=['sys_id'], page_size=operations)
+            sys_ids = [record['sys_id'] for record in itertools.islice(records, operations)]
+
+    reports = []
+    try:
+        for mode in modes:
+            logger.info(f"Running {mode} mode: {len(sys_ids)} operations")
+            # Fresh recorder per mode to total the bytes each mode moves
+            recorder = MetricsRecorder()
+            options = {**client_options, 'instrumentation': recorder}
+            if mode == 'single':
+                report = run_single(instance_url, sys_ids, options)
+            elif mode == 'pooled':
+                report = run_pooled(instance_url, sys_ids, options)
+            elif mode == 'async':
+                report = run_async(instance_url, sys_ids, options, concurrency)
+            elif mode == 'batch':
+                report = run_batch(instance_url, sys_ids, options, batch_size)
+            else:
+                raise ValueError(f"Unknown mode: {mode}")
+            series = recorder.summary().values()
+            report['request_bytes'] = sum(entry['request_bytes'] for entry in series)
+            report['response_bytes'] = sum(entry['response_bytes'] for entry in series)
+            reports.append(report)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    return reports
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ServiceNowClient load test')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes')
+    parser.add_argument('--operations', type=int, default=500, help='CI updates per mode')
+    parser.add_argument('--concurrency', type=int, default=16, help='Async mode concurrency')
+    parser.add_argument('--batch-size', type=int, default=50, help='Batch mode envelope size')
+    parser.add_argument('--instance-url', help='Target URL instead of a local stand-in (credentials from env)')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Stand-in latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='Stand-in random extra latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='Stand-in fraction of 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='Stand-in fraction of 429 responses')
+    parser.add_argument('--response-fields', help='Comma-separated fields returned by writes (default: all)')
+    parser.add_argument('--exclude-reference-link', action='store_true', help='Drop reference links from write responses')
+    parser.add_argument('--compress', action='store_true', help='Gzip request bodies')
+    parser.add_argument('--output', help='Output file path')
+
+    args = parser.parse_args(argv)
+
+    reports = run_load_test(
+        modes=[mode.strip() for mode in args.modes.split(',') if mode.strip()],
+        operations=args.operations,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        instance_url=args.instance_url,
+        server_options={
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'throttle_rate': args.throttle_rate,
+            'retry_after': 0.1
+        },
+        client_options={
+            'backoff_factor': 0.05,
+            'response_fields': args.response_fields.split(',') if args.response_fields else None,
+            'exclude_reference_link': args.exclude_reference_link,
+            'compress_requests': args.compress
+        }
+    )
+
+    print("\n" + "="*80)
+    print("SERVICENOW CLIENT LOAD TEST")
+    print("="*80)
+    print(
+        f"\n{'Mode':<8} {'Ops':>6} {'Errors':>7} {'HTTP':>6} {'Elapsed s':>10} {'Ops/s':>9} "
+        f"{'p50 ms':>9} {'p99 ms':>9} {'KB sent':>9} {'KB recv':>9}"
+    )
+    for report in reports:
+        print(
+            f"{report['mode']:<8} {report['operations']:>6} {report['errors']:>7} {report['http_requests']:>6} "
+            f"{report['elapsed_s']:>10} {report['throughput_ops_s']:>9} "
+            f"{report['latency_p50_ms']:>9} {report['latency_p99_ms']:>9} "
+            f"{report['request_bytes'] / 1024:>9.1f} {report['response_bytes'] / 1024:>9.1f}"
+        )
+    print("="*80 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        logger.info(f"Load test report saved to: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint instrumentation for ServiceNowClient
+Records latency histograms, payload sizes, status codes and retries per
+table and method, exported as Prometheus text or a JSON summary
+"""
+
+import os
+import json
+import atexit
+import bisect
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from servicenow_resilience import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Instrumentation:
+    """
+    No-op instrumentation hooks
+
+    ServiceNowClient skips all measurement work when ``enabled`` is False,
+    so the default costs one attribute check per request.
+    """
+
+    enabled = False
+
+    def on_request(
+        self,
+        method: str,
+        endpoint: str,
+        status_code: Optional[int],
+        latency: float,
+        request_bytes: int,
+        response_bytes: int
+    ):
+        """
+        Called after every HTTP attempt
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint
+            status_code: Response status code, None on connection errors/timeouts
+            latency: Seconds from send to response headers
+            request_bytes: Request body size as sent (after gzip)
+            response_bytes: Response body size on the wire (Content-Length when
+                present, decoded size otherwise)
+        """
+
+    def on_retry(self, method: str, endpoint: str, reason: str):
+        """
+        Called before an attempt is retried
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint
+            reason: Status code or error class that triggered the retry
+        """
+
+
+NULL_INSTRUMENTATION = Instrumentation()
+
+
+class _Series:
+    """Metrics for one (table, method) pair"""
+
+    __slots__ = ('count', 'latency_sum', 'buckets', 'request_bytes', 'response_bytes', 'status_codes', 'retries')
+
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_codes: Dict[str, int] = {}
+        self.retries = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a latency quantile from the histogram (bucket upper bound)
+
+        Returns None when there are no samples or the quantile falls in the
+        overflow bucket above the last bound, which has no finite estimate.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+        return None
+
+
+class MetricsRecorder(Instrumentation):
+    """Thread-safe in-memory recorder of per-table/method request metrics"""
+
+    enabled = True
+
+    def __init__(self):
+        """Initialize recorder"""
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, method: str, endpoint: str) -> _Series:
+        key = (RateLimiter.key_for(endpoint), method.upper())
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, _Series())
+        return series
+
+    def on_request(self, method, endpoint, status_code, latency, request_bytes, response_bytes):
+        status = str(status_code) if status_code is not None else 'error'
+        with self._lock:
+            series = self._get(method, endpoint)
+            series.count += 1
+            series.latency_sum += latency
+            series.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+            series.status_codes[status] = series.status_codes.get(status, 0) + 1
+
+    def on_retry(self, method, endpoint, reason):
+        with self._lock:
+            self._get(method, endpoint).retries += 1
+
+    def summary(self) -> Dict:
+        """
+        Summarize recorded metrics
+
+        Returns:
+            Per 'table METHOD' entry with counts, latency, bytes, status codes and retries
+        """
+        with self._lock:
+            items = sorted(self._series.items())
+            return {
+                f"{table} {method}": {
+                    'requests': series.count,
+                    'latency_avg_ms': round(series.latency_sum / series.count * 1000, 2) if series.count else None,
+                    'latency_p50_ms': _ms(series.quantile(0.5)),
+                    'latency_p99_ms': _ms(series.quantile(0.99)),
+                    'request_bytes': series.request_bytes,
+                    'response_bytes': series.response_bytes,
+                    'status_codes': dict(series.status_codes),
+                    'retries': series.retries
+                }
+                for (table, method), series in items
+            }
+
+    def prometheus_text(self) -> str:
+        """
+        Render metrics in Prometheus text exposition format
+
+        Returns:
+            Exposition text
+        """
+        lines = [
+            '# HELP servicenow_request_duration_seconds ServiceNow request latency',
+            '# TYPE servicenow_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+
+            for (table, method), series in items:
+                labels = f'table="{table}",method="{method}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS, series.buckets):
+                    cumulative += bucket_count
+                    lines.append(f'servicenow_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'servicenow_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f'servicenow_request_duration_seconds_sum{{{labels}}} {series.latency_sum:.6f}')
+                lines.append(f'servicenow_request_duration_seconds_count{{{labels}}} {series.count}')
+
+            for name, attribute, help_text in (
+                ('servicenow_request_bytes_total', 'request_bytes', 'Request body bytes sent'),
+                ('servicenow_response_bytes_total', 'response_bytes', 'Response body bytes received'),
+                ('servicenow_retries_total', 'retries', 'Retried attempts'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (table, method), series in items:
+                    lines.append(f'{name}{{table="{table}",method="{method}"}} {getattr(series, attribute)}')
+
+            lines.append('# HELP servicenow_responses_total Responses by status code')
+            lines.append('# TYPE servicenow_responses_total counter')
+            for (table, method), series in items:
+                for status, count in sorted(series.status_codes.items()):
+                    lines.append(
+                        f'servicenow_responses_total{{table="{table}",method="{method}",code="{status}"}} {count}'
+                    )
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str, format: str = 'json'):
+        """
+        Write metrics to a file
+
+        Args:
+            path: Output file path
+            format: 'json' or 'prometheus'
+        """
+        content = self.prometheus_text() if format == 'prometheus' else json.dumps(self.summary(), indent=2)
+        with open(path, 'w') as f:
+            f.write(content)
+        logger.info(f"ServiceNow metrics exported to: {path}")
+
+    def export_at_exit(self, path: Optional[str] = None, format: str = 'json'):
+        """
+        Export metrics when the process exits
+
+        Args:
+            path: Output file path, None to log the summary instead
+            format: 'json' or 'prometheus'
+        """
+        def report():
+            if not self._series:
+                return
+            if path:
+                self.export(path, format)
+            else:
+                logger.info(f"ServiceNow metrics: {json.dumps(self.summary())}")
+
+        atexit.register(report)
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None:
+        return seconds
+    return round(seconds * 1000, 2)
+
+
+_shared_instrumentation: Optional[Instrumentation] = None
+_shared_lock = threading.Lock()
+
+
+def shared_instrumentation() -> Instrumentation:
+    """
+    Process-wide instrumentation configured from the environment
+
+    SERVICENOW_METRICS=json|prometheus enables a MetricsRecorder that is
+    exported at exit to SERVICENOW_METRICS_FILE (or logged when unset).
+
+    Returns:
+        Shared MetricsRecorder, or the no-op instrumentation when disabled
+    """
+    global _shared_instrumentation
+
+    metrics_format = os.getenv('SERVICENOW_METRICS')
+    if not metrics_format:
+        return NULL_INSTRUMENTATION
+
+    with _shared_lock:
+        if _shared_instrumentation is None:
+            recorder = MetricsRecorder()
+            recorder.export_at_exit(os.getenv('SERVICENOW_METRICS_FILE'), metrics_format)
+            _shared_instrumentation = recorder
+        return _shared_instrumentation
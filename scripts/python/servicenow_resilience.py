@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting and circuit breaking for ServiceNow calls
+Token buckets keep parallel pipelines under the instance's per-user rate
+limits; the circuit breaker fails fast while the instance is unhealthy
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Blocking acquire() is for threads; acquire_async() waits with
+    asyncio.sleep so it never blocks the event loop. Both draw from the
+    same bucket, so threads and tasks are limited together.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (default: max(1, rate))
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """
+        Take tokens if available
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens without waiting"""
+        return self._reserve(tokens) == 0.0
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Take tokens, sleeping until they are available
+
+        Args:
+            tokens: Tokens to take
+            timeout: Maximum seconds to wait, None to wait indefinitely
+
+        Returns:
+            True if acquired, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Async variant of acquire()"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for a while (e.g., after a 429 with Retry-After)
+
+        Args:
+            seconds: Pause duration
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class RateLimiter:
+    """
+    Global plus per-table/endpoint token buckets
+
+    Every call takes a token from the global bucket (the instance's per-user
+    limit) and, if one is configured, from the bucket for its table or
+    endpoint.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, limits: Optional[Dict[str, float]] = None):
+        """
+        Initialize limiter
+
+        Args:
+            rate: Global requests per second
+            burst: Global burst size (default: max(1, rate))
+            limits: Optional per-key requests per second, keyed by table
+                name (e.g., 'cmdb_ci_vm_instance') or endpoint (e.g., 'batch')
+        """
+        self.global_bucket = TokenBucket(rate, burst)
+        self.buckets: Dict[str, TokenBucket] = {}
+        for key, key_rate in (limits or {}).items():
+            self.configure(key, key_rate)
+
+    def configure(self, key: str, rate: float, burst: Optional[float] = None):
+        """
+        Set the limit for a table or endpoint
+
+        Args:
+            key: Table name or endpoint
+            rate: Requests per second
+            burst: Burst size
+        """
+        self.buckets[key] = TokenBucket(rate, burst)
+
+    @staticmethod
+    def key_for(endpoint: str) -> str:
+        """
+        Map an endpoint to its limiter key
+
+        table/<name>[/<sys_id>] maps to the table name, anything else to
+        its first path segment.
+        """
+        parts = endpoint.strip('/').split('/')
+        if parts[0] == 'table' and len(parts) > 1:
+            return parts[1]
+        return parts[0]
+
+    def _buckets_for(self, endpoint: str) -> List[TokenBucket]:
+        bucket = self.buckets.get(self.key_for(endpoint))
+        return [self.global_bucket, bucket] if bucket else [self.global_bucket]
+
+    def acquire(self, endpoint: str):
+        """Block until the call to endpoint is allowed"""
+        for bucket in self._buckets_for(endpoint):
+            bucket.acquire()
+
+    async def acquire_async(self, endpoint: str):
+        """Wait without blocking the event loop until the call to endpoint is allowed"""
+        for bucket in self._buckets_for(endpoint):
+            await bucket.acquire_async()
+
+    def pause(self, endpoint: str, seconds: float):
+        """Pause the buckets used by endpoint (429 back-pressure)"""
+        for bucket in self._buckets_for(endpoint):
+            bucket.pause(seconds)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for the ServiceNow instance
+
+    closed: calls flow; consecutive failures are counted.
+    open: calls fail fast with CircuitOpenError until recovery_timeout passes.
+    half_open: a limited number of probe calls are let through; a success
+    closes the circuit, a failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit (default: 5)
+            recovery_timeout: Seconds to stay open before probing (default: 30)
+            half_open_max_calls: Concurrent probe calls while half open (default: 1)
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    @property
+    def state(self) -> str:
+        """Current state (closed, open or half_open)"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected; callers can spool instead of blocking"""
+        return self.state == self.OPEN
+
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """
+        Register a state change callback
+
+        Args:
+            listener: Called with (old_state, new_state)
+        """
+        self._listeners.append(listener)
+
+    def _transition(self, new_state: str):
+        old_state = self._state
+        if old_state == new_state:
+            return
+        self._state = new_state
+        logger.warning(f"ServiceNow circuit breaker: {old_state} -> {new_state}")
+        for listener in self._listeners:
+            try:
+                listener(old_state, new_state)
+            except Exception as e:
+                logger.error(f"Circuit breaker listener failed: {e}")
+
+    def before_call(self):
+        """
+        Admit or reject a call
+
+        Raises:
+            CircuitOpenError: If the circuit is open or the probe quota is used up
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"ServiceNow circuit is open, retry in {remaining:.1f}s"
+                    )
+                self._transition(self.HALF_OPEN)
+                self._probes = 0
+
+            if self._state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError("ServiceNow circuit is half open, probe in progress")
+                self._probes += 1
+
+    def record_success(self):
+        """Record a healthy response"""
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def release_probe(self):
+        """Give back a half-open probe slot taken by a call that recorded no outcome"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self):
+        """Record a failed call (timeout, connection error, 429 or 5xx)"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+
+_shared_rate_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> Optional[RateLimiter]:
+    """
+    Process-wide rate limiter configured from the environment
+
+    SERVICENOW_RATE_LIMIT sets the global requests per second and
+    SERVICENOW_RATE_BURST the burst size. Returns None when unset.
+
+    Returns:
+        Shared RateLimiter or None
+    """
+    global _shared_rate_limiter
+
+    rate = os.getenv('SERVICENOW_RATE_LIMIT')
+    if not rate:
+        return None
+
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            burst = os.getenv('SERVICENOW_RATE_BURST')
+            _shared_rate_limiter = RateLimiter(float(rate), float(burst) if burst else None)
+        return _shared_rate_limiter
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Local ServiceNow Table API stand-in for VM Automation Accelerator
+Implements the subset of the Table and Batch APIs used by ServiceNowClient
+with in-memory tables and configurable latency, error and 429 injection,
+for benchmarks and load tests that must not touch a real instance
+"""
+
+import re
+import sys
+import json
+import time
+import gzip
+import uuid
+import base64
+import random
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Table -> ticket number prefix
+TABLES = {
+    'sc_req_item': 'RITM',
+    'change_request': 'CHG',
+    'incident': 'INC',
+    'cmdb_ci_vm_instance': None,
+}
+
+# Reference fields rendered as {link, value} unless sysparm_exclude_reference_link is set
+REFERENCE_FIELDS = {
+    'assignment_group': 'sys_user_group',
+    'cost_center': 'cmn_cost_center',
+    'location': 'cmn_location',
+    'opened_by': 'sys_user',
+    'owned_by': 'sys_user',
+}
+LINK_BASE = 'https://instance.service-now.com/api/now/table'
+
+# Responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = 1024
+
+_CLAUSE = re.compile(r'^(?P<field>[A-Za-z0-9_.]+?)(?P<op>IN|!=|>=|<=|=|>|<)(?P<value>.*)$')
+
+
+class TableStore:
+    """Thread-safe in-memory tables with ServiceNow-style string fields"""
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, Dict]] = {table: {} for table in TABLES}
+        self._counters = {table: 10000 for table in TABLES}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+    def insert(self, table: str, fields: Dict) -> Dict:
+        """Create a record, assigning sys_id, number and timestamps"""
+        with self._lock:
+            record = {key: '' if value is None else str(value) for key, value in fields.items()}
+            record['sys_id'] = uuid.uuid4().hex
+            prefix = TABLES.get(table)
+            if prefix and not record.get('number'):
+                self._counters[table] += 1
+                record['number'] = f"{prefix}{self._counters[table]:07d}"
+            record['sys_created_on'] = record['sys_updated_on'] = self._now()
+            record['sys_created_by'] = record['sys_updated_by'] = 'admin'
+            record['sys_mod_count'] = '0'
+            record['sys_class_name'] = table
+            self.tables[table][record['sys_id']] = record
+            return dict(record)
+
+    def update(self, table: str, sys_id: str, fields: Dict, suppress_auto_sys_field: bool = False) -> Optional[Dict]:
+        """Patch a record; None if it does not exist"""
+        with self._lock:
+            record = self.tables[table].get(sys_id)
+            if record is None:
+                return None
+            record.update({key: '' if value is None else str(value) for key, value in fields.items()})
+            if not suppress_auto_sys_field:
+                record['sys_updated_on'] = self._now()
+                record['sys_mod_count'] = str(int(record.get('sys_mod_count') or 0) + 1)
+            return dict(record)
+
+    def get(self, table: str, sys_id: str) -> Optional[Dict]:
+        """Read a record by sys_id"""
+        with self._lock:
+            record = self.tables[table].get(sys_id)
+            return dict(record) if record else None
+
+    def query(self, table: str, query: str, offset: int, limit: int) -> List[Dict]:
+        """
+        Run an encoded query
+
+        Supports ^-joined clauses of the form field=, !=, >, >=, <, <=, IN
+        and ORDERBY/ORDERBYDESC.
+        """
+        filters = []
+        order_by: List[Tuple[str, bool]] = []
+        for clause in filter(None, query.split('^')):
+            if clause.startswith('ORDERBYDESC'):
+                order_by.append((clause[len('ORDERBYDESC'):], True))
+                continue
+            if clause.startswith('ORDERBY'):
+                order_by.append((clause[len('ORDERBY'):], False))
+                continue
+            match = _CLAUSE.match(clause)
+            if not match:
+                raise ValueError(f"Unsupported query clause: {clause}")
+            filters.append((match['field'], match['op'], match['value']))
+
+        with self._lock:
+            rows = [record for record in self.tables[table].values() if _matches(record, filters)]
+            for field, descending in reversed(order_by):
+                rows.sort(key=lambda record: record.get(field, ''), reverse=descending)
+            return [dict(record) for record in rows[offset:offset + limit]]
+
+
+def _matches(record: Dict, filters: List[Tuple[str, str, str]]) -> bool:
+    for field, op, value in filters:
+        actual = record.get(field, '')
+        if op == 'IN':
+            if actual not in value.split(','):
+                return False
+        elif op == '=' and actual != value:
+            return False
+        elif op == '!=' and actual == value:
+            return False
+        elif op == '>' and not actual > value:
+            return False
+        elif op == '>=' and not actual >= value:
+            return False
+        elif op == '<' and not actual < value:
+            return False
+        elif op == '<=' and not actual <= value:
+            return False
+    return True
+
+
+def _project(record: Dict, fields: Optional[str], exclude_reference_link: bool = False) -> Dict:
+    if fields:
+        record = {field: record.get(field, '') for field in fields.split(',')}
+    if exclude_reference_link:
+        return record
+    return {
+        field: {'link': f"{LINK_BASE}/{REFERENCE_FIELDS[field]}/{value}", 'value': value}
+        if value and field in REFERENCE_FIELDS else value
+        for field, value in record.items()
+    }
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the stand-in state and fault settings"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ('127.0.0.1', 0),
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        retry_after: float = 1
+    ):
+        """
+        Initialize server
+
+        Args:
+            address: (host, port) to bind, port 0 picks a free port
+            latency_ms: Added latency per request
+            jitter_ms: Uniform random extra latency per request
+            error_rate: Fraction of requests answered with 500
+            throttle_rate: Fraction of requests answered with 429
+            retry_after: Retry-After seconds sent with 429 responses
+        """
+        super().__init__(address, StandInHandler)
+        self.store = TableStore()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """Instance URL to pass to ServiceNowClient"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        """Serve on a daemon thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def seed(self, table: str, count: int, factory=None) -> List[Dict]:
+        """
+        Insert generated records
+
+        Args:
+            table: Table name
+            count: Number of records
+            factory: Callable(index) -> fields, defaults to VM CI fields for
+                cmdb_ci_vm_instance and a short description otherwise
+
+        Returns:
+            Created records
+        """
+        if factory is None:
+            if table == 'cmdb_ci_vm_instance':
+                factory = lambda i: {
+                    'name': f'vm-{i:06d}', 'vcenter_name': 'Azure', 'environment': 'dev',
+                    'cpu_count': 2, 'ram': 8192, 'disk_space': 128, 'location': 'westeurope',
+                    'os': 'Ubuntu 22.04', 'cost_center': 'CC-1000', 'owned_by': 'a1b2c3d4e5f60718293a4b5c6d7e8f90',
+                    'managed_by': 'cloud_infrastructure_team', 'operational_status': '1',
+                    'vm_inst_id': f'/subscriptions/0000/resourceGroups/rg-dev/providers/'
+                                  f'Microsoft.Compute/virtualMachines/vm-{i:06d}'
+                }
+            else:
+                factory = lambda i: {
+                    'short_description': f'Seeded record {i}', 'state': '1', 'priority': '3',
+                    'assignment_group': 'cloud_infrastructure_team', 'opened_by': 'a1b2c3d4e5f60718293a4b5c6d7e8f90'
+                }
+        return [self.store.insert(table, factory(i)) for i in range(count)]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Table and Batch API request handler"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without TCP_NODELAY keep-alive
+    # clients would see delayed-ACK stalls that a real instance does not have
+    disable_nagle_algorithm = True
+    server: StandInServer
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+        payload = json.dumps(body).encode('utf-8')
+        compress = len(payload) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compress:
+            payload = gzip.compress(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> Optional[Dict]:
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if raw and self.headers.get('Content-Encoding') == 'gzip':
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else None
+
+    def _dispatch(self):
+        server = self.server
+        with server._count_lock:
+            server.request_count += 1
+
+        body = self._read_body()
+
+        delay = server.latency_ms + (random.uniform(0, server.jitter_ms) if server.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < server.throttle_rate:
+            self._send_json(429, {'error': {'message': 'Too many requests'}},
+                            {'Retry-After': str(server.retry_after)})
+            return
+        if roll < server.throttle_rate + server.error_rate:
+            self._send_json(500, {'error': {'message': 'Injected server error'}})
+            return
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        status, response = handle_api_call(server.store, self.command, url.path, params, body)
+        self._send_json(status, response)
+
+    do_GET = do_POST = do_PATCH = do_PUT = _dispatch
+
+
+def handle_api_call(store: TableStore, method: str, path: str, params: Dict, body: Optional[Dict]) -> Tuple[int, Dict]:
+    """
+    Execute one Table or Batch API call against the store
+
+    Args:
+        store: Table store
+        method: HTTP method
+        path: URL path (/api/now/<version>/...)
+        params: Query parameters
+        body: Decoded JSON body
+
+    Returns:
+        (status code, response body)
+    """
+    parts = path.strip('/').split('/')
+    if len(parts) < 4 or parts[:2] != ['api', 'now']:
+        return 404, {'error': {'message': f'Unknown path {path}'}}
+
+    resource = parts[3:]
+    if resource == ['batch'] and method == 'POST':
+        return 200, _handle_batch(store, body or {})
+
+    if resource[0] != 'table' or len(resource) < 2 or resource[1] not in store.tables:
+        return 400, {'error': {'message': f'Invalid table {"/".join(resource)}'}}
+
+    table = resource[1]
+    sys_id = resource[2] if len(resource) > 2 else None
+    fields = params.get('sysparm_fields')
+    exclude_links = params.get('sysparm_exclude_reference_link') == 'true'
+
+    if method == 'GET' and sys_id is None:
+        try:
+            records = store.query(
+                table,
+                params.get('sysparm_query', ''),
+                int(params.get('sysparm_offset', 0)),
+                int(params.get('sysparm_limit', 10000))
+            )
+        except ValueError as e:
+            return 400, {'error': {'message': str(e)}}
+        return 200, {'result': [_project(record, fields, exclude_links) for record in records]}
+
+    if method == 'GET':
+        record = store.get(table, sys_id)
+    elif method == 'POST' and sys_id is None:
+        return 201, {'result': _project(store.insert(table, body or {}), fields, exclude_links)}
+    elif method in ('PATCH', 'PUT') and sys_id:
+        suppress = params.get('sysparm_suppress_auto_sys_field') == 'true'
+        record = store.update(table, sys_id, body or {}, suppress)
+    else:
+        return 405, {'error': {'message': f'{method} not supported on {path}'}}
+
+    if record is None:
+        return 404, {'error': {'message': 'No Record found'}}
+    return 200, {'result': _project(record, fields, exclude_links)}
+
+
+def _handle_batch(store: TableStore, envelope: Dict) -> Dict:
+    serviced = []
+    for sub_request in envelope.get('rest_requests', []):
+        url = urlparse(sub_request.get('url', ''))
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = json.loads(base64.b64decode(sub_request['body'])) if sub_request.get('body') else None
+        status, response = handle_api_call(store, sub_request.get('method', 'GET'), url.path, params, body)
+        serviced.append({
+            'id': sub_request.get('id'),
+            'status_code': status,
+            'body': base64.b64encode(json.dumps(response).encode('utf-8')).decode('ascii'),
+        })
+    return {
+        'batch_request_id': envelope.get('batch_request_id'),
+        'serviced_requests': serviced,
+        'unserviced_requests': [],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local ServiceNow Table API stand-in')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8080, help='Port')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency per request')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of 500 responses')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='Fraction of 429 responses')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds for 429')
+    parser.add_argument('--seed-cis', type=int, default=0, help='VM CIs to pre-create')
+    parser.add_argument('--seed-tickets', type=int, default=0, help='Tickets to pre-create per ticket table')
+
+    args = parser.parse_args(argv)
+
+    server = StandInServer(
+        (args.host, args.port),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after
+    )
+    if args.seed_cis:
+        server.seed('cmdb_ci_vm_instance', args.seed_cis)
+    for table, prefix in TABLES.items():
+        if prefix and args.seed_tickets:
+            server.seed(table, args.seed_tickets)
+
+    print(f"ServiceNow stand-in listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON decoding for ServiceNow Table API responses
+Decodes the top-level 'result' array record by record from a byte stream,
+so large table reads never materialize the whole response body
+"""
+
+import json
+import codecs
+from typing import Any, Dict, Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+
+# Drop consumed text from the buffer once this many characters are behind the cursor
+_COMPACT_THRESHOLD = 65536
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _TextStream:
+    """Incrementally decoded text buffer over a byte-chunk iterator"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Append the next chunk to the buffer; False at end of stream"""
+        if self.eof:
+            return False
+
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            text = self._decoder.decode(chunk)
+            if not text:
+                continue
+            if self.pos >= _COMPACT_THRESHOLD:
+                self.buffer = self.buffer[self.pos:]
+                self.pos = 0
+            self.buffer += text
+            return True
+
+        self.buffer += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character ('' at end of stream)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def expect(self, char: str):
+        """Consume the given structural character"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{found or 'end of stream'}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode one complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+            # A bare number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not isinstance(value, (dict, list, str)) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_result_records(chunks: Iterable[bytes], key: str = 'result') -> Iterator[Dict]:
+    """
+    Yield records from a ServiceNow JSON response as they arrive
+
+    Handles both list responses ({"result": [...]}) and single-record
+    responses ({"result": {...}}). Other top-level keys are skipped.
+
+    Args:
+        chunks: Response body as byte chunks (e.g., response.iter_content())
+        key: Top-level key holding the records (default: result)
+
+    Yields:
+        Decoded records
+    """
+    stream = _TextStream(chunks)
+    stream.expect('{')
+
+    if stream.peek() == '}':
+        return
+
+    while True:
+        name = stream.value()
+        stream.expect(':')
+
+        if name == key and stream.peek() == '[':
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    separator = stream.peek()
+                    stream.pos += 1
+                    if separator == ']':
+                        break
+                    if separator != ',':
+                        raise ValueError(f"Malformed '{key}' array at offset {stream.pos - 1}")
+        elif name == key:
+            yield stream.value()
+        else:
+            stream.value()
+
+        separator = stream.peek()
+        stream.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            raise ValueError(f"Malformed response object at offset {stream.pos - 1}")
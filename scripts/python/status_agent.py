@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Local ServiceNow status agent for VM Automation Accelerator
+Keeps a warm ServiceNowClient (pooled TLS connections, resolved ticket
+sys_ids) listening on a local Unix socket so pipeline steps can forward
+status updates without paying interpreter, import and TLS startup each time
+
+Usage:
+    python status_agent.py serve &
+    python status_agent.py send --ticket RITM0010001 --status Started --pipeline vm-deploy
+    python status_agent.py stop
+
+The send command only needs the standard library. When the agent is not
+running it falls back to updating ServiceNow directly.
+"""
+
+import os
+import sys
+import json
+import socket
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'servicenow_agent.sock')
+
+# Seconds to wait for the agent's answer. Above its worst case: resolving and
+# updating a ticket are two calls of up to 4 attempts x 30 s plus backoff
+DEFAULT_AGENT_TIMEOUT = 600
+
+
+def default_socket_path() -> str:
+    """Socket path from SERVICENOW_AGENT_SOCKET or the temp-dir default"""
+    return os.getenv('SERVICENOW_AGENT_SOCKET') or DEFAULT_SOCKET_PATH
+
+
+# =============================================================================
+# CLIENT
+# =============================================================================
+
+def default_agent_timeout() -> float:
+    """Response timeout from SERVICENOW_AGENT_TIMEOUT or DEFAULT_AGENT_TIMEOUT"""
+    return float(os.getenv('SERVICENOW_AGENT_TIMEOUT') or DEFAULT_AGENT_TIMEOUT)
+
+
+def call_agent(
+    request: Dict,
+    socket_path: Optional[str] = None,
+    timeout: Optional[float] = None,
+    connect_timeout: float = 5
+) -> Optional[Dict]:
+    """
+    Send one request to the agent
+
+    Args:
+        request: Request message
+        socket_path: Agent socket path
+        timeout: Seconds to wait for the response (default: SERVICENOW_AGENT_TIMEOUT or 600)
+        connect_timeout: Seconds to wait for the connection
+
+    Returns:
+        Agent response, None if no agent accepted the connection, or
+        {'ok': False, 'agent_failed': True, 'error'} if the exchange broke
+        off after the request was sent (the update may have been applied)
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(connect_timeout)
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except OSError:
+            # Missing socket, refused, permission denied, timed out
+            return None
+
+        sock.settimeout(timeout if timeout is not None else default_agent_timeout())
+        try:
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+            if not line:
+                raise ConnectionResetError("agent closed the connection without a response")
+            return json.loads(line)
+        except (OSError, ValueError) as e:
+            return {'ok': False, 'agent_failed': True, 'error': f"Status agent failed: {e}"}
+    finally:
+        sock.close()
+
+
+def send_status(
+    ticket_number: str,
+    pipeline_name: str,
+    status: str,
+    details: Optional[str] = None,
+    socket_path: Optional[str] = None,
+    fallback: bool = True,
+    timeout: Optional[float] = None
+) -> bool:
+    """
+    Forward a pipeline status update to the agent
+
+    Args:
+        ticket_number: ServiceNow ticket number (RITM/CHG/INC)
+        pipeline_name: Name of the pipeline
+        status: Status (Started, In Progress, Completed, Failed)
+        details: Additional details
+        socket_path: Agent socket path
+        fallback: Update ServiceNow directly when the agent is not running
+        timeout: Seconds to wait for the agent (default: SERVICENOW_AGENT_TIMEOUT or 600)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    response = call_agent(
+        {
+            'action': 'status',
+            'ticket': ticket_number,
+            'pipeline': pipeline_name,
+            'status': status,
+            'details': details
+        },
+        socket_path,
+        timeout
+    )
+
+    # An agent that failed mid-request may still have updated the ticket, so
+    # only a missing agent falls back to a direct update
+    if response is not None:
+        if not response.get('ok'):
+            print(f"Status agent error: {response.get('error')}", file=sys.stderr)
+        return bool(response.get('ok'))
+
+    if not fallback:
+        print("Status agent is not running", file=sys.stderr)
+        return False
+
+    from servicenow_client import update_pipeline_status
+    return update_pipeline_status(ticket_number, pipeline_name, status, details)
+
+
+# =============================================================================
+# AGENT
+# =============================================================================
+
+class StatusAgent:
+    """Long-lived agent serving status updates over a Unix socket"""
+
+    def __init__(self, socket_path: Optional[str] = None, idle_timeout: float = 0, spool_interval: float = 60):
+        """
+        Initialize agent
+
+        Args:
+            socket_path: Socket path to listen on
+            idle_timeout: Exit after this many idle seconds, 0 to run until stopped
+            spool_interval: Seconds between checks for spooled updates to deliver, 0 to
+                only deliver them when the circuit closes
+        """
+        from servicenow_client import ServiceNowClient
+        from servicenow_resilience import CircuitBreaker
+        from ticket_resolver import TicketResolver
+
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.spool_interval = spool_interval
+        # While the instance is unhealthy updates go to the write-behind
+        # spool instead of holding pipeline steps for the full retry budget;
+        # they are delivered once the circuit closes again
+        self.client = ServiceNowClient(circuit_breaker=CircuitBreaker())
+        self.client.circuit_breaker.add_listener(self._on_circuit_change)
+        self._draining = threading.Lock()
+        # Updates queue behind anything still spooled (including rows left by
+        # an earlier run) so tickets see them in order
+        self._spool_lock = threading.Lock()
+        self._backlog = True
+        # The agent outlives many pipeline steps, so its in-memory cache is
+        # already shared between them; no on-disk store is needed
+        self.resolver = TicketResolver(self.client)
+        self.server = None
+
+    def handle(self, request: Dict) -> Dict:
+        """
+        Process one request message
+
+        Args:
+            request: Request message with an 'action' key
+
+        Returns:
+            Response message
+        """
+        from servicenow_client import (
+            apply_ticket_update,
+            build_pipeline_work_notes,
+            pipeline_ticket_state
+        )
+
+        action = request.get('action')
+        if action == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if action == 'shutdown':
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {'ok': True}
+        if action != 'status':
+            return {'ok': False, 'error': f'Unknown action: {action}'}
+
+        ticket_number = request['ticket']
+        try:
+            work_notes = build_pipeline_work_notes(request['pipeline'], request['status'], request.get('details'))
+            state = pipeline_ticket_state(ticket_number, request['status'])
+            circuit_open = self.client.circuit_breaker.is_open()
+            with self._spool_lock:
+                spooled = circuit_open or self._backlog
+                if spooled:
+                    from status_spool import StatusSpool
+                    with StatusSpool() as spool:
+                        spool.append(ticket_number, work_notes, state)
+                    self._backlog = True
+            if spooled:
+                if circuit_open:
+                    logger.warning(f"ServiceNow unavailable, spooled status for ticket {ticket_number}")
+                else:
+                    self._start_drain()
+                return {'ok': True, 'spooled': True}
+            apply_ticket_update(self.client, self.resolver, ticket_number, work_notes, state)
+            logger.info(f"Updated ticket {ticket_number} with status: {request['status']}")
+            return {'ok': True}
+        except Exception as e:
+            logger.error(f"Failed to update ServiceNow ticket: {e}")
+            return {'ok': False, 'error': str(e)}
+
+    def _on_circuit_change(self, old_state: str, new_state: str):
+        from servicenow_resilience import CircuitBreaker
+
+        # Listeners run under the breaker's lock; flush on another thread
+        if new_state == CircuitBreaker.CLOSED:
+            self._start_drain()
+
+    def _start_drain(self):
+        threading.Thread(target=self.drain_spool, daemon=True).start()
+
+    def drain_spool(self) -> Optional[Dict]:
+        """
+        Deliver updates spooled while the circuit was open
+
+        Returns:
+            Flush summary, or None if a drain is already running or the circuit is open
+        """
+        from status_spool import StatusSpool
+
+        if self.client.circuit_breaker.is_open() or not self._draining.acquire(blocking=False):
+            return None
+        try:
+            with StatusSpool() as spool:
+                while True:
+                    summary = spool.flush(self.client, self.resolver)
+                    if summary['failed'] or summary['skipped']:
+                        return summary
+                    # Deliver updates spooled during the flush before going direct again
+                    with self._spool_lock:
+                        if not spool.pending():
+                            self._backlog = False
+                            return summary
+        except Exception as e:
+            logger.error(f"Failed to flush status spool: {e}")
+            return None
+        finally:
+            self._draining.release()
+
+    def serve(self):
+        """Listen on the socket until stopped or idle"""
+        import time
+        import socketserver
+
+        if call_agent({'action': 'ping'}, self.socket_path, timeout=2) is not None:
+            raise RuntimeError(f"A status agent is already listening on {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        agent = self
+        last_activity = [time.monotonic()]
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return
+                last_activity[0] = time.monotonic()
+                try:
+                    response = agent.handle(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    response = {'ok': False, 'error': f'Invalid request: {e}'}
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                last_activity[0] = time.monotonic()
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        self.server = Server(self.socket_path, Handler)
+        os.chmod(self.socket_path, 0o600)
+
+        if self.idle_timeout:
+            def watch_idle():
+                while True:
+                    time.sleep(min(self.idle_timeout, 5))
+                    if time.monotonic() - last_activity[0] >= self.idle_timeout:
+                        self.server.shutdown()
+                        return
+            threading.Thread(target=watch_idle, daemon=True).start()
+
+        if self.spool_interval:
+            # Also picks up updates left in the spool by earlier runs
+            def watch_spool():
+                while True:
+                    self.drain_spool()
+                    time.sleep(self.spool_interval)
+            threading.Thread(target=watch_spool, daemon=True).start()
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.client.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local ServiceNow status agent')
+    parser.add_argument('action', choices=['serve', 'send', 'stop', 'ping'], help='Agent action')
+    parser.add_argument('--socket', help='Socket path (default: SERVICENOW_AGENT_SOCKET or temp dir)')
+    parser.add_argument('--idle-timeout', type=float, default=0, help='serve: exit after N idle seconds')
+    parser.add_argument('--spool-interval', type=float, default=60, help='serve: seconds between spool delivery checks')
+    parser.add_argument('--ticket', help='send: ticket number')
+    parser.add_argument('--status', help='send: status')
+    parser.add_argument('--pipeline', help='send: pipeline name')
+    parser.add_argument('--details', help='send: additional details')
+    parser.add_argument('--no-fallback', action='store_true', help='send: fail instead of updating directly')
+    parser.add_argument('--timeout', type=float, help='send: seconds to wait for the agent (default: SERVICENOW_AGENT_TIMEOUT or 600)')
+
+    args = parser.parse_args(argv)
+
+    if args.action == 'serve':
+        StatusAgent(args.socket, args.idle_timeout, args.spool_interval).serve()
+        return 0
+
+    if args.action == 'send':
+        if not all([args.ticket, args.status, args.pipeline]):
+            parser.error('send requires --ticket, --status and --pipeline')
+        success = send_status(
+            args.ticket,
+            args.pipeline,
+            args.status,
+            args.details,
+            socket_path=args.socket,
+            fallback=not args.no_fallback,
+            timeout=args.timeout
+        )
+        return 0 if success else 1
+
+    response = call_agent({'action': 'shutdown' if args.action == 'stop' else 'ping'}, args.socket)
+    if response is None:
+        print("Status agent is not running")
+        return 1
+    print(json.dumps(response))
+    return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
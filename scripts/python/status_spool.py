@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Durable write-behind spool for ServiceNow pipeline status updates
+Pipeline steps append status updates to a local SQLite spool and return
+immediately; a flusher drains the spool in order, merging consecutive notes
+for the same ticket into a single PATCH
+"""
+
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_PATH = os.path.join(tempfile.gettempdir(), 'servicenow_status_spool.db')
+
+# Separator between merged work notes in one PATCH
+NOTE_SEPARATOR = "\n\n----------------------------------------\n\n"
+
+# Permanent failures after which an update moves to the dead-letter table
+DEFAULT_MAX_ATTEMPTS = 20
+
+# Client errors that are worth retrying later rather than counting as permanent
+TRANSIENT_STATUS_CODES = {408, 429}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Tell whether a delivery error is likely to clear up on its own
+
+    Connection errors, timeouts, 5xx, 408, 429 and an open circuit are
+    transient; other 4xx responses and anything unexpected are permanent.
+
+    Args:
+        error: Exception raised while delivering an update
+
+    Returns:
+        True if the update should be retried without counting an attempt
+    """
+    import requests
+    from servicenow_resilience import CircuitOpenError
+
+    if isinstance(error, CircuitOpenError):
+        return True
+    if isinstance(error, requests.exceptions.RequestException):
+        response = getattr(error, 'response', None)
+        if response is None:
+            return True
+        return response.status_code >= 500 or response.status_code in TRANSIENT_STATUS_CODES
+    return False
+
+
+class StatusSpool:
+    """
+    Append-only SQLite spool of pending ticket updates
+
+    Rows are committed before append() returns, so spooled updates survive
+    process crashes. Only one flusher drains the spool at a time; it holds
+    a lease row that expires if the flusher dies. Updates that ServiceNow
+    keeps rejecting are moved to a dead-letter table instead of being
+    retried forever; outages only delay delivery.
+    """
+
+    def __init__(self, path: Optional[str] = None, lease_seconds: float = 300):
+        """
+        Initialize spool
+
+        Args:
+            path: SQLite file path (default: SERVICENOW_STATUS_SPOOL or a temp-dir file)
+            lease_seconds: How long a flusher lease stays valid (default: 300)
+        """
+        self.path = path or os.getenv('SERVICENOW_STATUS_SPOOL') or DEFAULT_SPOOL_PATH
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS status_updates ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ticket_number TEXT NOT NULL,"
+            " work_notes TEXT NOT NULL,"
+            " state TEXT,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " id INTEGER PRIMARY KEY,"
+            " ticket_number TEXT NOT NULL,"
+            " work_notes TEXT NOT NULL,"
+            " state TEXT,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " last_error TEXT,"
+            " dead_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS flusher_lease ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " owner TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, ticket_number: str, work_notes: str, state: Optional[str] = None) -> int:
+        """
+        Durably append a status update
+
+        Args:
+            ticket_number: ServiceNow ticket number (RITM/CHG/INC)
+            work_notes: Work notes to add
+            state: New state, request items only
+
+        Returns:
+            Spool row id
+        """
+        cursor = self.conn.execute(
+            "INSERT INTO status_updates (ticket_number, work_notes, state, created_at) VALUES (?, ?, ?, ?)",
+            (ticket_number, work_notes, state, time.time())
+        )
+        return cursor.lastrowid
+
+    def pending(self) -> List[Dict]:
+        """
+        List pending updates in append order
+
+        Returns:
+            Spooled rows
+        """
+        rows = self.conn.execute(
+            "SELECT id, ticket_number, work_notes, state, attempts, last_error"
+            " FROM status_updates ORDER BY id"
+        )
+        return [
+            {
+                'id': row[0],
+                'ticket_number': row[1],
+                'work_notes': row[2],
+                'state': row[3],
+                'attempts': row[4],
+                'last_error': row[5]
+            }
+            for row in rows
+        ]
+
+    def dead_letters(self) -> List[Dict]:
+        """
+        List updates that were given up on
+
+        Returns:
+            Dead-letter rows in append order
+        """
+        rows = self.conn.execute(
+            "SELECT id, ticket_number, work_notes, state, attempts, last_error"
+            " FROM dead_letters ORDER BY id"
+        )
+        return [
+            {
+                'id': row[0],
+                'ticket_number': row[1],
+                'work_notes': row[2],
+                'state': row[3],
+                'attempts': row[4],
+                'last_error': row[5]
+            }
+            for row in rows
+        ]
+
+    def _acquire_lease(self) -> bool:
+        """Take or renew the flusher lease"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT owner, expires_at FROM flusher_lease WHERE id = 1").fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                self.conn.execute("ROLLBACK")
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO flusher_lease (id, owner, expires_at) VALUES (1, ?, ?)",
+                (self.owner, now + self.lease_seconds)
+            )
+            self.conn.execute("COMMIT")
+            return True
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _release_lease(self):
+        self.conn.execute("DELETE FROM flusher_lease WHERE id = 1 AND owner = ?", (self.owner,))
+
+    def _dead_letter(self, ids: List[int], max_attempts: int) -> int:
+        """Move rows that reached max_attempts to dead_letters; returns how many moved"""
+        placeholders = ','.join('?' * len(ids))
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "INSERT INTO dead_letters"
+                " (id, ticket_number, work_notes, state, created_at, attempts, last_error, dead_at)"
+                " SELECT id, ticket_number, work_notes, state, created_at, attempts, last_error, ?"
+                f" FROM status_updates WHERE id IN ({placeholders}) AND attempts >= ?",
+                [time.time(), *ids, max_attempts]
+            )
+            moved = self.conn.execute(
+                f"DELETE FROM status_updates WHERE id IN ({placeholders}) AND attempts >= ?",
+                [*ids, max_attempts]
+            ).rowcount
+            self.conn.execute("COMMIT")
+            return moved
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def coalesce(rows: List[Dict]) -> List[Dict]:
+        """
+        Merge pending updates per ticket
+
+        Tickets are replayed in order of their oldest pending update. All
+        notes for a ticket are merged in append order and the last state
+        set wins, which matches applying them one by one.
+
+        Args:
+            rows: Pending rows in append order
+
+        Returns:
+            One merged update per ticket with the row ids it covers
+        """
+        merged: Dict[str, Dict] = {}
+        for row in rows:
+            update = merged.get(row['ticket_number'])
+            if update is None:
+                update = merged[row['ticket_number']] = {
+                    'ticket_number': row['ticket_number'],
+                    'notes': [],
+                    'state': None,
+                    'ids': []
+                }
+            update['notes'].append(row['work_notes'])
+            update['ids'].append(row['id'])
+            if row['state'] is not None:
+                update['state'] = row['state']
+
+        return [
+            {
+                'ticket_number': update['ticket_number'],
+                'work_notes': NOTE_SEPARATOR.join(update['notes']),
+                'state': update['state'],
+                'ids': update['ids']
+            }
+            for update in merged.values()
+        ]
+
+    def flush(self, client=None, resolver=None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Dict:
+        """
+        Drain the spool into ServiceNow
+
+        Updates that fail stay in the spool with their error and are
+        retried on the next flush. Only permanent failures (see
+        is_transient_error) count as attempts, until max_attempts moves
+        the updates to the dead-letter table. A transient failure stops the
+        flush, leaving later tickets untouched, as they would fail the same
+        way. Tickets that do not exist are dropped. The lease is renewed
+        before every ticket; if another flusher has taken it over, this
+        flush stops.
+
+        Args:
+            client: ServiceNowClient (created from environment if omitted)
+            resolver: TicketResolver (created from environment if omitted)
+            max_attempts: Dead-letter updates after this many permanent
+                failures, 0 to keep retrying forever (default: DEFAULT_MAX_ATTEMPTS)
+
+        Returns:
+            Counts of delivered, failed, deferred (not tried after a
+            transient failure), dropped, dead-lettered and merged updates
+        """
+        from servicenow_client import ServiceNowClient, apply_ticket_update
+        from ticket_resolver import TicketResolver
+
+        summary = {
+            'delivered': 0, 'failed': 0, 'deferred': 0, 'dropped': 0, 'dead_lettered': 0,
+            'requests': 0, 'skipped': False
+        }
+
+        if not self._acquire_lease():
+            logger.info("Another flusher holds the spool lease, skipping")
+            summary['skipped'] = True
+            return summary
+
+        own_client = client is None
+        own_resolver = resolver is None
+        try:
+            rows = self.pending()
+            if not rows:
+                return summary
+
+            if own_client:
+                client = ServiceNowClient()
+            if own_resolver:
+                resolver = TicketResolver(client, cache_path=os.getenv('SERVICENOW_TICKET_CACHE'))
+
+            updates = self.coalesce(rows)
+            for position, update in enumerate(updates):
+                # A run of slow failures can outlast the lease; never send
+                # rows another flusher may already be sending
+                if not self._acquire_lease():
+                    logger.warning("Lost the spool lease to another flusher, stopping")
+                    summary['skipped'] = True
+                    break
+                ids = update['ids']
+                placeholders = ','.join('?' * len(ids))
+                summary['requests'] += 1
+                try:
+                    found = apply_ticket_update(
+                        client, resolver, update['ticket_number'], update['work_notes'], update['state']
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to deliver spooled updates for {update['ticket_number']}: {e}")
+                    if is_transient_error(e):
+                        self.conn.execute(
+                            f"UPDATE status_updates SET last_error = ? WHERE id IN ({placeholders})",
+                            [str(e), *ids]
+                        )
+                        summary['failed'] += len(ids)
+                        summary['deferred'] = sum(len(later['ids']) for later in updates[position + 1:])
+                        logger.info(f"ServiceNow unavailable, deferring {summary['deferred']} spooled updates")
+                        break
+                    self.conn.execute(
+                        f"UPDATE status_updates SET attempts = attempts + 1, last_error = ?"
+                        f" WHERE id IN ({placeholders})",
+                        [str(e), *ids]
+                    )
+                    dead = self._dead_letter(ids, max_attempts) if max_attempts else 0
+                    if dead:
+                        logger.error(
+                            f"Giving up on {dead} spooled updates for {update['ticket_number']} "
+                            f"after {max_attempts} attempts, moved to dead letters"
+                        )
+                    summary['dead_lettered'] += dead
+                    summary['failed'] += len(ids) - dead
+                    continue
+
+                if not found:
+                    logger.warning(f"Ticket {update['ticket_number']} not found, dropping spooled updates")
+                    summary['dropped'] += len(ids)
+                else:
+                    summary['delivered'] += len(ids)
+                self.conn.execute(f"DELETE FROM status_updates WHERE id IN ({placeholders})", ids)
+
+            logger.info(
+                f"Spool flush: {summary['delivered']} delivered in {summary['requests']} requests, "
+                f"{summary['failed']} failed, {summary['deferred']} deferred, {summary['dropped']} dropped, "
+                f"{summary['dead_lettered']} dead-lettered"
+            )
+            return summary
+
+        finally:
+            if own_resolver and resolver is not None:
+                resolver.close()
+            if own_client and client is not None:
+                client.close()
+            self._release_lease()
+
+
+def main(argv: Optional[List[str]] = None):
+    """CLI interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ServiceNow status spool')
+    parser.add_argument('action', choices=['flush', 'status'], help='Drain the spool or list pending updates')
+    parser.add_argument('--spool', help='Spool file path (default: SERVICENOW_STATUS_SPOOL or temp dir)')
+    parser.add_argument('--follow', action='store_true', help='Keep flushing until interrupted')
+    parser.add_argument('--interval', type=float, default=10, help='Seconds between flushes with --follow')
+    parser.add_argument(
+        '--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+        help=f'Move updates to dead letters after N permanent failures, 0 to retry forever (default: {DEFAULT_MAX_ATTEMPTS})'
+    )
+
+    args = parser.parse_args(argv)
+
+    with StatusSpool(args.spool) as spool:
+        if args.action == 'status':
+            rows = spool.pending()
+            print(f"{len(rows)} pending updates in {spool.path}")
+            for row in rows:
+                error = f" (attempts: {row['attempts']}, last error: {row['last_error']})" if row['last_error'] else ''
+                print(f"  #{row['id']} {row['ticket_number']}{error}")
+            dead = spool.dead_letters()
+            if dead:
+                print(f"{len(dead)} dead-lettered updates")
+                for row in dead:
+                    print(f"  #{row['id']} {row['ticket_number']} (attempts: {row['attempts']}, last error: {row['last_error']})")
+            return 0
+
+        while True:
+            summary = spool.flush(max_attempts=args.max_attempts)
+            if not args.follow:
+                return 1 if summary['failed'] else 0
+            try:
+                time.sleep(args.interval)
+            except KeyboardInterrupt:
+                return 0
+
+
+if __name__ == '__main__':
+    from automation_logging import configure_logging
+    configure_logging()
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Shared pytest fixtures for the automation scripts
+The scripts are flat modules, so their directory is put on sys.path
+"""
+
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+@pytest.fixture
+def standin():
+    """Running ServiceNow stand-in server, shut down after the test"""
+    from servicenow_standin import StandInServer
+
+    server = StandInServer().start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,48 @@
+"""
+Startup checks for the unified CLI: --help and a cost estimate must not
+pay for the Azure SDK, requests or numpy imports
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from conftest import SCRIPTS_DIR
+
+CLI = os.path.join(SCRIPTS_DIR, 'automation_cli.py')
+
+HEAVY_PACKAGES = ('azure', 'requests', 'urllib3', 'numpy')
+
+# Generous wall-clock bound for --help; it normally starts in tens of ms
+HELP_STARTUP_BUDGET_SECONDS = 1.0
+
+
+def _imported_packages(*args):
+    """Top-level packages imported by a CLI run, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', CLI, *args], cwd=SCRIPTS_DIR, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    packages = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            packages.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return packages
+
+
+def test_help_skips_heavy_imports():
+    assert not _imported_packages('--help') & set(HEAVY_PACKAGES)
+
+
+def test_cost_estimate_skips_heavy_imports():
+    assert not _imported_packages('cost', '--vm-size', 'Standard_D2s_v3') & set(HEAVY_PACKAGES)
+
+
+def test_help_starts_within_budget():
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, CLI, '--help'], cwd=SCRIPTS_DIR, capture_output=True, check=True)
+        timings.append(time.perf_counter() - started)
+    assert min(timings) < HELP_STARTUP_BUDGET_SECONDS
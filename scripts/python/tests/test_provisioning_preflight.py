@@ -0,0 +1,57 @@
+"""
+Tests for ProvisioningPreflight budget handling
+"""
+
+import subprocess
+import sys
+import textwrap
+import time
+
+from conftest import SCRIPTS_DIR
+
+# A quota check that blocks far beyond the budget next to a failing policy check
+SLOW_PREFLIGHT = textwrap.dedent('''
+    import time
+    from provisioning_preflight import ProvisioningPreflight
+
+    class SlowQuota:
+        def check_compute_quota(self, location, vm_size, quantity):
+            time.sleep(30)
+
+    class Rejecting:
+        def evaluate(self, order):
+            time.sleep(0.2)
+            return {'compliant': False}
+
+    preflight = ProvisioningPreflight(quota_manager=SlowQuota(), policy_evaluator=Rejecting(), budget_seconds=0.5)
+    report = preflight.run({'vm_name': 'vm-a', 'vm_size': 'Standard_D2s_v3', 'location': 'westeurope'})
+    print(report['verdict'], report['checks']['quota']['status'])
+''')
+
+
+def test_abandoned_checks_do_not_delay_process_exit():
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', SLOW_PREFLIGHT], cwd=SCRIPTS_DIR, capture_output=True, text=True, timeout=20
+    )
+    elapsed = time.perf_counter() - started
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ['rejected', 'cancelled']
+    assert elapsed < 5
+
+
+def test_budget_times_out_slow_checks():
+    from provisioning_preflight import ProvisioningPreflight
+
+    class SlowPolicy:
+        def evaluate(self, order):
+            time.sleep(2)
+            return {'compliant': True}
+
+    preflight = ProvisioningPreflight(policy_evaluator=SlowPolicy(), budget_seconds=0.2)
+    report = preflight.run({'vm_name': 'vm-a', 'vm_size': 'Standard_D2s_v3', 'location': 'westeurope'})
+
+    assert report['verdict'] == 'incomplete'
+    assert report['checks']['policy']['status'] == 'timeout'
+    assert report['elapsed_ms'] < 1000
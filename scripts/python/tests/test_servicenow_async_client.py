@@ -0,0 +1,60 @@
+"""
+Tests for AsyncServiceNowClient against the stand-in server
+"""
+
+import asyncio
+import time
+
+from servicenow_async_client import AsyncServiceNowClient
+
+CI_TABLE = 'cmdb_ci_vm_instance'
+
+
+def _client(standin):
+    return AsyncServiceNowClient(standin.url, username='test', password='test', max_concurrency=4)
+
+
+def test_iter_table_and_bulk_lookup(standin):
+    standin.seed(CI_TABLE, 25)
+
+    async def run():
+        async with _client(standin) as client:
+            records = [record async for record in client.iter_table(CI_TABLE, fields=['name'], page_size=10)]
+            found = await client.get_vm_cis_by_names(['vm-000003', 'vm-000024', 'vm-missing'])
+        return records, found
+
+    records, found = asyncio.run(run())
+
+    assert len(records) == 25
+    assert sorted(found) == ['vm-000003', 'vm-000024']
+
+
+def test_close_does_not_block_the_event_loop(standin):
+    standin.latency_ms = 500
+
+    async def run():
+        client = _client(standin)
+        request = asyncio.ensure_future(client.get_vm_ci_by_name('vm-missing'))
+        await asyncio.sleep(0.1)
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        started = time.perf_counter()
+        await client.close()
+        elapsed = time.perf_counter() - started
+        ticker.cancel()
+        await request
+        return elapsed, ticks
+
+    elapsed, ticks = asyncio.run(run())
+
+    # close() waited for the in-flight request while the loop kept running
+    assert elapsed > 0.2
+    assert ticks > 10
@@ -0,0 +1,36 @@
+"""
+Tests for ServiceNowClient bulk CI lookups against the stand-in server
+"""
+
+from servicenow_client import ServiceNowClient
+
+CI_TABLE = 'cmdb_ci_vm_instance'
+
+
+def _client(standin):
+    return ServiceNowClient(standin.url, username='test', password='test')
+
+
+def test_get_vm_cis_by_names_duplicate_names_do_not_hide_others(standin):
+    older, newer, other = standin.seed(
+        CI_TABLE, 3, lambda i: {'name': ('vm-a', 'vm-a', 'vm-b')[i], 'vcenter_name': 'Azure'}
+    )
+    standin.store.tables[CI_TABLE][older['sys_id']]['sys_updated_on'] = '2026-01-01 00:00:00'
+    standin.store.tables[CI_TABLE][newer['sys_id']]['sys_updated_on'] = '2026-02-01 00:00:00'
+
+    with _client(standin) as client:
+        found = client.get_vm_cis_by_names(['vm-a', 'vm-b'], use_index=False)
+
+    assert set(found) == {'vm-a', 'vm-b'}
+    assert found['vm-a']['sys_id'] == newer['sys_id']
+    assert found['vm-b']['sys_id'] == other['sys_id']
+
+
+def test_get_vm_cis_by_names_projection_keeps_requested_fields(standin):
+    standin.seed(CI_TABLE, 2, lambda i: {'name': 'vm-a', 'vcenter_name': 'Azure', 'os': f'os-{i}'})
+
+    with _client(standin) as client:
+        found = client.get_vm_cis_by_names(['vm-a', 'vm-missing'], fields=['name', 'sys_id', 'os'])
+
+    assert list(found) == ['vm-a']
+    assert set(found['vm-a']) == {'name', 'sys_id', 'os'}
@@ -0,0 +1,73 @@
+"""
+Tests for StatusSpool flush failure handling
+"""
+
+import requests
+
+from servicenow_resilience import CircuitOpenError
+from status_spool import StatusSpool
+
+
+class FakeResolver:
+    def resolve(self, ticket_number):
+        return f"sys-{ticket_number}"
+
+    def invalidate(self, ticket_number):
+        pass
+
+
+class FailingClient:
+    """Client whose ticket updates raise the given error"""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def update_request_item(self, sys_id, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(f"{status_code} error", response=response)
+
+
+def _spool(tmp_path):
+    spool = StatusSpool(str(tmp_path / 'spool.db'))
+    for ticket in ('RITM0000001', 'RITM0000002', 'RITM0000003'):
+        spool.append(ticket, 'note')
+    return spool
+
+
+def test_transient_errors_stop_the_flush_without_counting_attempts(tmp_path):
+    errors = (requests.exceptions.ConnectionError('down'), _http_error(503),
+              _http_error(429), CircuitOpenError('open'))
+    for index, error in enumerate(errors):
+        directory = tmp_path / str(index)
+        directory.mkdir()
+        with _spool(directory) as spool:
+            client = FailingClient(error)
+            for _ in range(5):
+                summary = spool.flush(client, FakeResolver(), max_attempts=2)
+
+            assert client.calls == 5
+            assert summary['failed'] == 1
+            assert summary['deferred'] == 2
+            assert summary['dead_lettered'] == 0
+            assert [row['attempts'] for row in spool.pending()] == [0, 0, 0]
+            assert spool.dead_letters() == []
+
+
+def test_permanent_errors_count_and_dead_letter(tmp_path):
+    with _spool(tmp_path) as spool:
+        client = FailingClient(_http_error(400))
+        first = spool.flush(client, FakeResolver(), max_attempts=2)
+        second = spool.flush(client, FakeResolver(), max_attempts=2)
+
+        assert client.calls == 6
+        assert first['failed'] == 3
+        assert second['dead_lettered'] == 3
+        assert spool.pending() == []
+        assert len(spool.dead_letters()) == 3
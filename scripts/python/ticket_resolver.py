@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Ticket number resolution cache for VM Automation Accelerator
+Maps ServiceNow ticket numbers (RITM/CHG/INC) to sys_ids with a TTL and an
+optional SQLite store shared by separate pipeline-step processes
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ticket number prefix -> ServiceNow table
+TICKET_TABLES = {
+    'RITM': 'sc_req_item',
+    'CHG': 'change_request',
+    'INC': 'incident',
+}
+
+
+def ticket_table(ticket_number: str) -> Optional[str]:
+    """
+    Get the ServiceNow table for a ticket number
+
+    Args:
+        ticket_number: Ticket number (e.g., RITM0010001)
+
+    Returns:
+        Table name, or None for an unknown prefix
+    """
+    for prefix, table in TICKET_TABLES.items():
+        if ticket_number.startswith(prefix):
+            return table
+    return None
+
+
+class SQLiteTicketStore:
+    """On-disk ticket resolution store safe for concurrent processes"""
+
+    def __init__(self, path: str):
+        """
+        Initialize store
+
+        Args:
+            path: SQLite database file path
+        """
+        import sqlite3
+
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            " number TEXT PRIMARY KEY,"
+            " table_name TEXT NOT NULL,"
+            " sys_id TEXT NOT NULL,"
+            " resolved_at REAL NOT NULL)"
+        )
+
+    def get_many(self, numbers: List[str]) -> Dict[str, Tuple[str, float]]:
+        """
+        Read cached entries
+
+        Args:
+            numbers: Ticket numbers
+
+        Returns:
+            Mapping of number to (sys_id, resolved_at)
+        """
+        entries = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(numbers), 500):
+            chunk = numbers[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT number, sys_id, resolved_at FROM tickets WHERE number IN ({placeholders})",
+                chunk
+            )
+            for number, sys_id, resolved_at in rows:
+                entries[number] = (sys_id, resolved_at)
+        return entries
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, float]]):
+        """
+        Write entries
+
+        Args:
+            entries: (number, table_name, sys_id, resolved_at) tuples
+        """
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tickets (number, table_name, sys_id, resolved_at) VALUES (?, ?, ?, ?)",
+            list(entries)
+        )
+
+    def delete(self, number: str):
+        """Remove an entry"""
+        self.conn.execute("DELETE FROM tickets WHERE number = ?", (number,))
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+class TicketResolver:
+    """
+    Ticket number -> sys_id resolver with TTL caching
+
+    Lookups hit the in-memory cache first, then the optional SQLite store,
+    and only then ServiceNow. Misses are resolved in bulk with one
+    numberIN query per table.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds: float = 3600,
+        cache_path: Optional[str] = None,
+        query_chunk_size: int = 100
+    ):
+        """
+        Initialize resolver
+
+        Args:
+            client: ServiceNowClient used for lookups
+            ttl_seconds: How long a resolution stays valid (default: 3600)
+            cache_path: Optional SQLite file shared across processes
+            query_chunk_size: Maximum numbers per numberIN query (default: 100)
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.query_chunk_size = query_chunk_size
+        self._memory: Dict[str, Tuple[str, float]] = {}
+        self.store = SQLiteTicketStore(cache_path) if cache_path else None
+
+    def close(self):
+        """Close the on-disk store"""
+        if self.store:
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fresh(self, resolved_at: float, now: float) -> bool:
+        return now - resolved_at < self.ttl_seconds
+
+    def resolve(self, ticket_number: str) -> Optional[str]:
+        """
+        Resolve one ticket number
+
+        Args:
+            ticket_number: Ticket number (RITM/CHG/INC)
+
+        Returns:
+            sys_id, or None if the ticket does not exist
+        """
+        return self.resolve_many([ticket_number]).get(ticket_number)
+
+    def resolve_many(self, ticket_numbers: Iterable[str]) -> Dict[str, str]:
+        """
+        Resolve many ticket numbers
+
+        Args:
+            ticket_numbers: Ticket numbers (RITM/CHG/INC, may be mixed)
+
+        Returns:
+            Mapping of ticket number to sys_id for tickets that exist
+        """
+        now = time.time()
+        resolved = {}
+        missing = []
+
+        for number in dict.fromkeys(ticket_numbers):
+            entry = self._memory.get(number)
+            if entry and self._fresh(entry[1], now):
+                resolved[number] = entry[0]
+            else:
+                missing.append(number)
+
+        if missing and self.store:
+            for number, (sys_id, resolved_at) in self.store.get_many(missing).items():
+                if self._fresh(resolved_at, now):
+                    self._memory[number] = (sys_id, resolved_at)
+                    resolved[number] = sys_id
+            missing = [number for number in missing if number not in resolved]
+
+        if missing:
+            fetched = self._fetch(missing)
+            resolved.update({number: sys_id for number, (_, sys_id) in fetched.items()})
+
+        return resolved
+
+    def invalidate(self, ticket_number: str):
+        """
+        Drop a cached resolution (e.g., after the record returned 404)
+
+        Args:
+            ticket_number: Ticket number
+        """
+        self._memory.pop(ticket_number, None)
+        if self.store:
+            self.store.delete(ticket_number)
+
+    def _fetch(self, ticket_numbers: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Resolve numbers against ServiceNow with numberIN queries
+
+        Args:
+            ticket_numbers: Uncached ticket numbers
+
+        Returns:
+            Mapping of ticket number to (table, sys_id)
+        """
+        by_table: Dict[str, List[str]] = {}
+        for number in ticket_numbers:
+            table = ticket_table(number)
+            if table is None:
+                logger.warning(f"Unknown ticket type: {number}")
+                continue
+            by_table.setdefault(table, []).append(number)
+
+        fetched = {}
+        for table, numbers in by_table.items():
+            for start in range(0, len(numbers), self.query_chunk_size):
+                chunk = numbers[start:start + self.query_chunk_size]
+                logger.info(f"Resolving {len(chunk)} ticket numbers in {table}")
+                params = {
+                    'sysparm_query': f"numberIN{','.join(chunk)}",
+                    'sysparm_fields': 'number,sys_id',
+                    'sysparm_limit': len(chunk)
+                }
+                response = self.client._make_request("GET", f"table/{table}", params=params)
+                for record in response.get('result', []):
+                    fetched[record['number']] = (table, record['sys_id'])
+
+        now = time.time()
+        for number, (_, sys_id) in fetched.items():
+            self._memory[number] = (sys_id, now)
+        if self.store and fetched:
+            self.store.put_many(
+                (number, table, sys_id, now) for number, (table, sys_id) in fetched.items()
+            )
+
+        return fetched